@@ -27,7 +27,14 @@ def load_app_config():
                 "DB_SERVER": "server", 
                 "DB_DRIVER": "ODBC Driver 18 for SQL Server",
                 "PR_COUNT": 8,
-                "AC_COUNT": 1
+                "AC_COUNT": 1,
+                "DB_POOL_MIN": 1,
+                "DB_POOL_MAX": 8,
+                "DB_POOL_IDLE_TIMEOUT": 300,
+                "DB_STATEMENT_TIMEOUT": 0,
+                "DB_SLOW_QUERY_MS": 500,
+                "DB_QUERY_LOG_ALL": False,
+                "DB_REFERENCE_CACHE_TTL": 300
             }
             save_app_config(default_config)
             return default_config
@@ -93,6 +100,29 @@ def unset_config(key):
 # Тип базы данных (mssql/postgres)
 DB_TYPE = get_config("DB_TYPE", "mssql").lower()
 
+# Настройки пула соединений (DB_POOL_MAX = 0 отключает пул)
+# DB_STATEMENT_TIMEOUT - предельное время запроса на сервере в секундах (0 - без ограничения)
+def get_pool_config():
+    return {
+        "pool_min_size": int(get_config("DB_POOL_MIN", 1)),
+        "pool_max_size": int(get_config("DB_POOL_MAX", 8)),
+        "pool_idle_timeout": float(get_config("DB_POOL_IDLE_TIMEOUT", 300)),
+        "statement_timeout": float(get_config("DB_STATEMENT_TIMEOUT", 0)),
+    }
+
+# Настройки журнала запросов (db_queries.log в каталоге логов)
+def get_query_log_config():
+    return {
+        "slow_query_ms": float(get_config("DB_SLOW_QUERY_MS", 500)),
+        "query_log_all": bool(get_config("DB_QUERY_LOG_ALL", False)),
+    }
+
+# Кэш справочных таблиц: время жизни записи в секундах (0 - только сброс при записи)
+def get_cache_config():
+    return {
+        "reference_cache_ttl": float(get_config("DB_REFERENCE_CACHE_TTL", 300)),
+    }
+
 # Конфигурация для разных БД
 def get_db_config():
     db_type = get_config("DB_TYPE", "mssql").lower()
@@ -104,7 +134,10 @@ def get_db_config():
             "database": get_config("DB_NAME"),
             "user": get_config("DB_USER"),
             "password": get_config("DB_PASSWORD"),
-            "db_type": "postgres"
+            "db_type": "postgres",
+            **get_pool_config(),
+            **get_query_log_config(),
+            **get_cache_config()
         }
     else:  # MSSQL по умолчанию
         return {
@@ -114,7 +147,10 @@ def get_db_config():
             "user": get_config("DB_USER"),
             "password": get_config("DB_PASSWORD"),
             "driver": get_config("DB_DRIVER", "ODBC Driver 17 for SQL Server"),
-            "db_type": "mssql"
+            "db_type": "mssql",
+            **get_pool_config(),
+            **get_query_log_config(),
+            **get_cache_config()
         }
 
 # Получаем конфигурацию БД
@@ -130,6 +166,7 @@ def get_db_settings():
 
         query = "SELECT ac_nmb, pr_nmb FROM SET00"
         result = db.fetch_one(query)
+        db.close()
 
         if result:
             return {
@@ -0,0 +1,80 @@
+# database/cancellation.py
+import itertools
+import threading
+from contextlib import contextmanager
+
+
+class QueryCancelledError(Exception):
+    """Запрос (или задача) был отменён пользователем"""
+
+
+class CancelScope:
+    """
+    Область отмены запросов.
+
+    Пока область активна в потоке (см. cancel_scope), Database регистрирует
+    в ней каждый выполняющийся запрос. cancel() можно вызвать из любого
+    потока: он прерывает запросы на сервере, а новые запросы области
+    сразу завершаются QueryCancelledError.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._statements = {}
+        self._ids = itertools.count(1)
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancelled
+
+    def raise_if_cancelled(self):
+        """Прерывает выполнение, если отмена уже запрошена"""
+        if self._cancelled:
+            raise QueryCancelledError("Операция отменена")
+
+    def cancel(self):
+        """Запрашивает отмену и прерывает все выполняющиеся запросы области"""
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            cancels = list(self._statements.values())
+
+        for cancel_statement in cancels:
+            try:
+                cancel_statement()
+            except Exception as e:
+                print(f"Ошибка отмены запроса: {e}")
+
+    def register(self, cancel_statement):
+        """Регистрирует выполняющийся запрос; возвращает ключ для unregister()"""
+        with self._lock:
+            if self._cancelled:
+                raise QueryCancelledError("Операция отменена")
+            key = next(self._ids)
+            self._statements[key] = cancel_statement
+            return key
+
+    def unregister(self, key):
+        with self._lock:
+            self._statements.pop(key, None)
+
+
+_local = threading.local()
+
+
+@contextmanager
+def cancel_scope(scope):
+    """Делает scope текущей областью отмены для запросов этого потока"""
+    previous = getattr(_local, "scope", None)
+    _local.scope = scope
+    try:
+        yield scope
+    finally:
+        _local.scope = previous
+
+
+def current_scope():
+    """Текущая область отмены потока (None, если запрос не отменяемый)"""
+    return getattr(_local, "scope", None)
@@ -0,0 +1,121 @@
+# database/columnar.py
+import datetime
+from decimal import Decimal
+
+import numpy as np
+
+
+def column_to_array(values):
+    """
+    Преобразует столбец значений из БД в типизированный массив NumPy.
+
+    Возвращает (массив, маска NULL). Целые столбцы -> int64, числовые -> float64
+    (NULL = NaN), дата/время -> datetime64 (NULL = NaT), остальное -> object.
+    """
+    count = len(values)
+    mask = np.fromiter((v is None for v in values), dtype=bool, count=count)
+    kinds = {type(v) for v in values if v is not None}
+
+    if not kinds:
+        return np.full(count, np.nan), mask
+
+    if kinds == {bool}:
+        return np.array([bool(v) for v in values], dtype=bool), mask
+
+    if all(issubclass(k, int) and not issubclass(k, bool) for k in kinds):
+        if mask.any():
+            return np.array([0 if v is None else v for v in values], dtype=np.int64), mask
+        return np.array(values, dtype=np.int64), mask
+
+    if all(issubclass(k, (int, float, Decimal)) for k in kinds):
+        return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64), mask
+
+    if all(issubclass(k, datetime.datetime) for k in kinds):
+        converted = [
+            None if v is None
+            else (v.astimezone(datetime.timezone.utc).replace(tzinfo=None) if v.tzinfo else v)
+            for v in values
+        ]
+        return np.array(converted, dtype="datetime64[us]"), mask
+
+    if all(issubclass(k, datetime.date) for k in kinds):
+        return np.array(values, dtype="datetime64[D]"), mask
+
+    array = np.empty(count, dtype=object)
+    array[:] = values
+    return array, mask
+
+
+class ColumnarResult:
+    """Результат запроса по столбцам: массивы NumPy и маски NULL"""
+
+    def __init__(self, columns, arrays, masks, row_count):
+        self.columns = list(columns)
+        self.arrays = arrays
+        self.masks = masks
+        self.row_count = row_count
+
+    @classmethod
+    def from_columns(cls, columns, values):
+        """Строит результат из имён столбцов и списков значений"""
+        arrays, masks = {}, {}
+        row_count = len(values[0]) if values else 0
+        for name, column in zip(columns, values):
+            arrays[name], masks[name] = column_to_array(column)
+        return cls(columns, arrays, masks, row_count)
+
+    def __len__(self):
+        return self.row_count
+
+    def __contains__(self, name):
+        return name in self.arrays
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def get(self, name, default=None):
+        return self.arrays.get(name, default)
+
+    def is_null(self, name):
+        """Маска NULL для столбца (True - значение отсутствует)"""
+        return self.masks[name]
+
+    def filled(self, name, value=0.0):
+        """Столбец как float64, NULL заменены на value"""
+        array = np.asarray(self.arrays[name], dtype=np.float64)
+        mask = self.masks[name]
+        if mask.any():
+            array = array.copy()
+            array[mask] = value
+        return array
+
+    def take(self, indices):
+        """Подвыборка строк по индексам или булевой маске"""
+        arrays = {name: array[indices] for name, array in self.arrays.items()}
+        masks = {name: mask[indices] for name, mask in self.masks.items()}
+        row_count = len(next(iter(masks.values()))) if masks else 0
+        return ColumnarResult(self.columns, arrays, masks, row_count)
+
+    def concat(self, other):
+        """Объединяет два результата с одинаковым набором столбцов"""
+        if not self.columns:
+            return other
+        if not other.columns:
+            return self
+        arrays = {name: np.concatenate([self.arrays[name], other.arrays[name]]) for name in self.columns}
+        masks = {name: np.concatenate([self.masks[name], other.masks[name]]) for name in self.columns}
+        return ColumnarResult(self.columns, arrays, masks, self.row_count + other.row_count)
+
+    def to_records(self):
+        """Преобразует обратно в list[dict] (NULL -> None)"""
+        records = []
+        for i in range(self.row_count):
+            record = {}
+            for name in self.columns:
+                value = self.arrays[name][i]
+                if self.masks[name][i]:
+                    record[name] = None
+                else:
+                    record[name] = value.item() if isinstance(value, np.generic) else value
+            records.append(record)
+        return records
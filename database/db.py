@@ -1,7 +1,347 @@
 import pyodbc
 import psycopg2
+import psycopg2.extensions
+from psycopg2.extras import execute_batch, execute_values
 from contextlib import contextmanager
 import re
+import threading
+import time
+import uuid
+from database.cancellation import QueryCancelledError, current_scope
+from database.columnar import ColumnarResult
+from database.instrumentation import QueryMonitor, find_caller
+from database.reference_cache import ReferenceCache, written_table
+from utils.path_manager import path_manager
+
+
+# INSERT ... VALUES (?, ?, ...) с единственным кортежем значений в конце запроса
+_INSERT_VALUES_RE = re.compile(r"^(\s*INSERT\b.*\bVALUES\s*)(\([^()]*\))\s*;?\s*$", re.IGNORECASE | re.DOTALL)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _fast_executemany_rows(param_rows):
+    """
+    Подготавливает наборы параметров к pyodbc fast_executemany.
+
+    pyodbc определяет типы параметров по первой строке, поэтому числовой
+    столбец, в котором встречаются int и float, приводится к float (иначе
+    дробная часть усекается). Если в первой строке NULL в столбце, где
+    дальше есть значения, тип не определить - такой пакет выполняется
+    обычным executemany. Возвращает (строки, можно ли fast_executemany).
+    """
+    columns = list(zip(*param_rows))
+    float_columns = {
+        i for i, values in enumerate(columns)
+        if any(isinstance(value, float) for value in values)
+        and all(value is None or _is_number(value) for value in values)
+    }
+    if float_columns:
+        param_rows = [
+            tuple(float(value) if i in float_columns and value is not None else value
+                  for i, value in enumerate(row))
+            for row in param_rows
+        ]
+    fast = not any(
+        param_rows[0][i] is None and any(value is not None for value in values)
+        for i, values in enumerate(columns)
+    )
+    return param_rows, fast
+
+
+class PoolTimeoutError(Exception):
+    """Не удалось получить соединение из пула за отведённое время"""
+
+
+class ConnectionPool:
+    """
+    Пул соединений с БД.
+
+    Соединения выдаются в монопольное пользование и возвращаются в пул
+    после использования. При выдаче предпочтение отдаётся соединению,
+    которое последним использовал текущий поток. Простаивающие дольше
+    idle_timeout соединения закрываются (сверх min_size), а давно не
+    использованные перед выдачей проверяются запросом SELECT 1.
+    """
+
+    def __init__(self, factory, min_size=1, max_size=8, idle_timeout=300.0,
+                 checkout_timeout=30.0, health_check_interval=30.0):
+        self._factory = factory
+        self.min_size = max(0, int(min_size))
+        self.max_size = max(1, int(max_size), self.min_size)
+        self.idle_timeout = float(idle_timeout)
+        self.checkout_timeout = float(checkout_timeout)
+        self.health_check_interval = float(health_check_interval)
+
+        self._cond = threading.Condition()
+        self._idle = []  # [conn, время возврата, id потока]
+        self._owners = {}  # id(conn) -> id потока, которому выдано соединение
+        self._size = 0
+        self._closed = False
+
+        self._checkouts = 0
+        self._reused = 0
+        self._created = 0
+        self._discarded = 0
+        self._health_failures = 0
+        self._timeouts = 0
+        self._checkout_time_total = 0.0
+        self._checkout_time_max = 0.0
+
+    def acquire(self):
+        """Выдаёт соединение из пула, при необходимости создавая новое"""
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.checkout_timeout
+        thread_id = threading.get_ident()
+
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeoutError("Пул соединений закрыт")
+
+                self._reap_idle()
+                entry = self._take_idle(thread_id)
+
+                if entry is None:
+                    if self._size < self.max_size:
+                        # Резервируем место, само подключение - вне блокировки
+                        self._size += 1
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._timeouts += 1
+                            raise PoolTimeoutError(
+                                f"Нет свободных соединений в пуле (max_size={self.max_size})"
+                            )
+                        self._cond.wait(remaining)
+                        continue
+
+            if entry is not None:
+                conn, returned_at, _ = entry
+                if time.monotonic() - returned_at >= self.health_check_interval and not self._ping(conn):
+                    with self._cond:
+                        self._health_failures += 1
+                        self._drop(conn)
+                    continue
+                reused = True
+            else:
+                try:
+                    conn = self._factory()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                reused = False
+
+            with self._cond:
+                elapsed = time.perf_counter() - started
+                self._checkouts += 1
+                self._created += 0 if reused else 1
+                self._reused += 1 if reused else 0
+                self._checkout_time_total += elapsed
+                self._checkout_time_max = max(self._checkout_time_max, elapsed)
+                self._owners[id(conn)] = thread_id
+            return conn
+
+    def release(self, conn, discard=False):
+        """Возвращает соединение в пул (или закрывает его при discard=True)"""
+        if not discard:
+            try:
+                # Завершаем незакрытую транзакцию, чтобы не отдать её другому потоку
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            thread_id = self._owners.pop(id(conn), None)
+            if discard or self._closed:
+                self._drop(conn)
+            else:
+                self._idle.append([conn, time.monotonic(), thread_id])
+            self._cond.notify()
+
+    def close_all(self):
+        """Закрывает все простаивающие соединения и запрещает новые выдачи"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _, _ = self._idle.pop()
+                self._drop(conn)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        """Статистика пула: размер, задержка выдачи, доля повторного использования"""
+        with self._cond:
+            checkouts = self._checkouts
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.max_size,
+                "checkouts": checkouts,
+                "created": self._created,
+                "reused": self._reused,
+                "discarded": self._discarded,
+                "health_check_failures": self._health_failures,
+                "timeouts": self._timeouts,
+                "avg_checkout_ms": (self._checkout_time_total / checkouts * 1000) if checkouts else 0.0,
+                "max_checkout_ms": self._checkout_time_max * 1000,
+                "reuse_ratio": (self._reused / checkouts) if checkouts else 0.0,
+            }
+
+    def _take_idle(self, thread_id):
+        """Забирает простаивающее соединение, предпочитая соединение текущего потока"""
+        if not self._idle:
+            return None
+        for index in range(len(self._idle) - 1, -1, -1):
+            if self._idle[index][2] == thread_id:
+                return self._idle.pop(index)
+        # LIFO: самое "тёплое" соединение
+        return self._idle.pop()
+
+    def _reap_idle(self):
+        """Закрывает соединения, простаивающие дольше idle_timeout (сверх min_size)"""
+        if self.idle_timeout <= 0:
+            return
+        now = time.monotonic()
+        # Самые старые - в начале списка
+        while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.idle_timeout:
+            conn, _, _ = self._idle.pop(0)
+            self._drop(conn)
+
+    def _drop(self, conn):
+        """Закрывает соединение и уменьшает размер пула (вызывать под блокировкой)"""
+        self._size -= 1
+        self._discarded += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _ping(conn) -> bool:
+        """Проверка живости соединения"""
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+
+class DatabaseSession:
+    """
+    Набор операций, выполняемых на одном соединении.
+
+    Сессия не фиксирует изменения сама: commit/rollback выполняет
+    Database.transaction() при выходе из контекста.
+    """
+
+    def __init__(self, db, conn):
+        self.db = db
+        self.conn = conn
+        # Время получения соединения учитывается в первом запросе сессии
+        self._connect_time = db._take_connect_time()
+        # Изменённые таблицы: после commit их кэш справочников сбрасывается
+        self.written_tables = set()
+
+    def _track_write(self, query):
+        table = written_table(query)
+        if table:
+            self.written_tables.add(table)
+
+    def _run(self, query, params, fetch):
+        """Выполняет запрос, забирает результат через fetch(cursor) и регистрирует времена"""
+        cursor = self.conn.cursor()
+        prepared_query, prepared_params = self.db._prepare_query_and_params(query, params)
+
+        started = time.perf_counter()
+        executed = None
+        try:
+            with self.db._cancellable(self.conn, cursor):
+                cursor.execute(prepared_query, prepared_params or ())
+                executed = time.perf_counter()
+                result, row_count = fetch(cursor)
+        except Exception as e:
+            finished = time.perf_counter()
+            self._record(query, len(params or ()), started, executed or finished, finished, -1, e)
+            raise
+
+        self._record(query, len(params or ()), started, executed, time.perf_counter(), row_count)
+        return result
+
+    def _record(self, query, params_count, started, executed, finished, row_count, error=None):
+        """Передаёт измерения запроса в журнал Database.monitor"""
+        if self.db.monitor is None:
+            return
+        self.db.monitor.record(
+            query, params_count, self._connect_time,
+            executed - started, finished - executed, row_count,
+            caller=find_caller(), error=error
+        )
+        self._connect_time = 0.0
+
+    def fetch_all(self, query, params=None):
+        def fetch(cursor):
+            columns = [desc[0] for desc in cursor.description]
+            rows = cursor.fetchall()
+            return [dict(zip(columns, row)) for row in rows], len(rows)
+
+        return self._run(query, params, fetch)
+
+    def fetch_one(self, query, params=None):
+        def fetch(cursor):
+            row = cursor.fetchone()
+            if row:
+                columns = [desc[0] for desc in cursor.description]
+                return dict(zip(columns, row)), 1
+            return None, 0
+
+        return self._run(query, params, fetch)
+
+    def fetch_columns(self, query, params=None):
+        """Результат по столбцам: {имя столбца: кортеж значений}"""
+        def fetch(cursor):
+            columns = [desc[0] for desc in cursor.description]
+            rows = cursor.fetchall()
+            # Транспонирование строк в столбцы выполняется на уровне C
+            values = list(zip(*rows)) if rows else [() for _ in columns]
+            return dict(zip(columns, values)), len(rows)
+
+        return self._run(query, params, fetch)
+
+    def execute(self, query, params=None):
+        """Выполняет запрос без фиксации, возвращает количество затронутых строк"""
+        self._track_write(query)
+        return self._run(query, params, lambda cursor: (cursor.rowcount, cursor.rowcount))
+
+    def execute_many(self, query, param_rows, page_size=500):
+        """Пакетное выполнение запроса без фиксации, возвращает количество наборов параметров"""
+        param_rows = [tuple(params) for params in param_rows]
+        if not param_rows:
+            return 0
+        self._track_write(query)
+
+        started = time.perf_counter()
+        cursor = self.conn.cursor()
+        try:
+            with self.db._cancellable(self.conn, cursor):
+                self.db._execute_many_on_cursor(cursor, query, param_rows, page_size)
+        except Exception as e:
+            finished = time.perf_counter()
+            self._record(query, len(param_rows[0]), started, finished, finished, -1, e)
+            raise
+
+        finished = time.perf_counter()
+        self._record(query, len(param_rows[0]), started, finished, finished, len(param_rows))
+        return len(param_rows)
+
 
 class Database:
     def __init__(self, db_config):
@@ -9,6 +349,33 @@ class Database:
         self.db_type = db_config.get('db_type', 'mssql')
         self.database_name = db_config['database']
 
+        # Пул соединений (pool_max_size = 0 - подключение на каждый запрос, как раньше)
+        self.pool = None
+        pool_max_size = int(db_config.get('pool_max_size', 0) or 0)
+        if pool_max_size > 0:
+            self.pool = ConnectionPool(
+                self._create_connection,
+                min_size=db_config.get('pool_min_size', 1),
+                max_size=pool_max_size,
+                idle_timeout=db_config.get('pool_idle_timeout', 300),
+                checkout_timeout=db_config.get('pool_checkout_timeout', 30),
+                health_check_interval=db_config.get('pool_health_check_interval', 30),
+            )
+
+        # Журнал запросов: кольцевой буфер + ротируемый файл в каталоге логов
+        self._local = threading.local()
+        self.monitor = None
+        if db_config.get('query_monitor', True):
+            self.monitor = QueryMonitor(
+                log_dir=db_config.get('query_log_dir') or path_manager.get_logs_path(),
+                slow_query_ms=db_config.get('slow_query_ms', 500),
+                buffer_size=db_config.get('query_buffer_size', 1000),
+                log_all=db_config.get('query_log_all', False),
+            )
+
+        # Кэш справочных таблиц, сбрасывается при записи через execute/transaction
+        self.reference = ReferenceCache(self, max_age=db_config.get('reference_cache_ttl', 300))
+
     def _prepare_query_and_params(self, query, params):
         """Подготавливает запрос и параметры для конкретной СУБД"""
         if params is None:
@@ -23,79 +390,292 @@ class Database:
         else:
             return query, params
 
+    def _create_connection(self):
+        """Открывает новое физическое соединение с БД"""
+        # Ограничение времени выполнения запроса на сервере (0 - без ограничения)
+        statement_timeout = float(self.db_config.get('statement_timeout', 0) or 0)
+
+        if self.db_type == 'postgres':
+            options = {}
+            if statement_timeout > 0:
+                options['options'] = f"-c statement_timeout={int(statement_timeout * 1000)}"
+            return psycopg2.connect(
+                host=self.db_config['host'],
+                port=self.db_config['port'],
+                database=self.db_config['database'],
+                user=self.db_config['user'],
+                password=self.db_config['password'],
+                **options
+            )
+
+        connection_string = (
+            f"DRIVER={{{self.db_config['driver']}}};"
+            f"SERVER={self.db_config['server']},{self.db_config.get('port', '1433')};"
+            f"DATABASE={self.db_config['database']};"
+            f"UID={self.db_config['user']};"
+            f"PWD={self.db_config['password']};"
+            f"Encrypt=no;"
+            f"TrustServerCertificate=yes;"
+        )
+        conn = pyodbc.connect(connection_string)
+        if statement_timeout > 0:
+            conn.timeout = max(1, int(statement_timeout))
+        return conn
+
+    @staticmethod
+    def _is_connection_lost(error) -> bool:
+        """Ошибка означает, что соединение больше нельзя использовать"""
+        if isinstance(error, psycopg2.extensions.QueryCanceledError):
+            # Отмена или statement_timeout: соединение остаётся рабочим
+            return False
+        if isinstance(error, pyodbc.OperationalError) and error.args and error.args[0] in ('HY008', 'HYT00'):
+            return False
+        return isinstance(error, (psycopg2.OperationalError, psycopg2.InterfaceError,
+                                  pyodbc.OperationalError, pyodbc.InterfaceError))
+
+    def _cancel_statement(self, conn, cursor):
+        """Прерывает выполняющийся на сервере запрос (вызывается из другого потока)"""
+        if self.db_type == 'postgres':
+            conn.cancel()
+        else:
+            cursor.cancel()
+
+    @contextmanager
+    def _cancellable(self, conn, cursor):
+        """
+        Регистрирует запрос в текущей области отмены потока (если она есть).
+        Ошибка, возникшая после запроса отмены, превращается в QueryCancelledError.
+        """
+        scope = current_scope()
+        if scope is None:
+            yield None
+            return
+
+        key = scope.register(lambda: self._cancel_statement(conn, cursor))
+        try:
+            yield scope
+        except QueryCancelledError:
+            raise
+        except Exception as e:
+            if scope.is_cancelled:
+                raise QueryCancelledError("Запрос отменён") from e
+            raise
+        finally:
+            scope.unregister(key)
+
     @contextmanager
     def connect(self):
         conn = None
+        broken = False
         try:
-            if self.db_type == 'postgres':
-                conn = psycopg2.connect(
-                    host=self.db_config['host'],
-                    port=self.db_config['port'],
-                    database=self.db_config['database'],
-                    user=self.db_config['user'],
-                    password=self.db_config['password']
-                )
+            started = time.perf_counter()
+            if self.pool is not None:
+                conn = self.pool.acquire()
             else:
-                connection_string = (
-                    f"DRIVER={{{self.db_config['driver']}}};"
-                    f"SERVER={self.db_config['server']},{self.db_config.get('port', '1433')};"
-                    f"DATABASE={self.db_config['database']};"
-                    f"UID={self.db_config['user']};"
-                    f"PWD={self.db_config['password']};"
-                    f"Encrypt=no;"
-                    f"TrustServerCertificate=yes;"
-                )
-                conn = pyodbc.connect(connection_string)
+                conn = self._create_connection()
+            self._local.connect_time = time.perf_counter() - started
 
             yield conn
+        except QueryCancelledError:
+            raise
         except Exception as e:
+            broken = self._is_connection_lost(e)
             print(f"Ошибка подключения к БД ({self.db_type}): {e}")
             raise
         finally:
             if conn:
-                conn.close()
+                if self.pool is not None:
+                    self.pool.release(conn, discard=broken)
+                else:
+                    conn.close()
+
+    def _take_connect_time(self) -> float:
+        """Время последнего получения соединения в текущем потоке (однократно)"""
+        connect_time = getattr(self._local, 'connect_time', 0.0)
+        self._local.connect_time = 0.0
+        return connect_time
+
+    def pool_stats(self) -> dict:
+        """Статистика пула соединений (пустой словарь, если пул отключён)"""
+        return self.pool.stats() if self.pool is not None else {}
+
+    def log_stats(self):
+        """Пишет статистику пула соединений и кэша справочников в журнал запросов"""
+        if self.monitor is None:
+            return
+        self.monitor.log_stats("pool", self.pool_stats())
+        for table, counters in self.reference.stats().items():
+            self.monitor.log_stats(f"reference[{table}]", counters)
+
+    def close(self):
+        """Закрывает все соединения пула"""
+        if self.pool is not None:
+            self.pool.close_all()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Единица работы: все операции сессии выполняются на одном соединении
+        и фиксируются одним commit; при любой ошибке изменения откатываются.
+
+            with db.transaction() as session:
+                session.execute(...)
+                session.execute_many(...)
+        """
+        with self.connect() as conn:
+            session = DatabaseSession(self, conn)
+            try:
+                yield session
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            self.reference.invalidate_tables(session.written_tables)
 
     def fetch_all(self, query, params=None):
         with self.connect() as conn:
-            cursor = conn.cursor()
-            prepared_query, prepared_params = self._prepare_query_and_params(query, params)
+            return DatabaseSession(self, conn).fetch_all(query, params)
+
+    def fetch_columns(self, query, params=None):
+        """Возвращает результат по столбцам: {имя столбца: кортеж значений}"""
+        with self.connect() as conn:
+            return DatabaseSession(self, conn).fetch_columns(query, params)
+
+    def fetch_numpy(self, query, params=None) -> ColumnarResult:
+        """
+        Возвращает результат в виде типизированных массивов NumPy.
+
+        Вместо списка словарей строится по одному массиву на столбец
+        (float64/int64/datetime64) и маска NULL для каждого столбца.
+        """
+        columns = self.fetch_columns(query, params)
+        return ColumnarResult.from_columns(list(columns), list(columns.values()))
+
+    def iter_batches(self, query, params=None, batch_size=5000, as_numpy=False):
+        """
+        Потоково выдаёт результат запроса пачками по batch_size строк.
 
-            cursor.execute(prepared_query, prepared_params or ())
+        Для PostgreSQL используется именованный (серверный) курсор, для MSSQL -
+        fetchmany, поэтому в памяти одновременно находится только одна пачка.
+        Пачка - list[dict] или ColumnarResult при as_numpy=True. Соединение
+        занято, пока генератор не исчерпан или не закрыт.
+        """
+        batch_size = max(1, int(batch_size))
+
+        with self.connect() as conn:
+            session = DatabaseSession(self, conn)
+            prepared_query, prepared_params = self._prepare_query_and_params(query, params)
 
             if self.db_type == 'postgres':
-                columns = [desc[0] for desc in cursor.description]
-                rows = cursor.fetchall()
-                return [dict(zip(columns, row)) for row in rows]
+                cursor = conn.cursor(name=f"stream_{uuid.uuid4().hex}")
+                cursor.itersize = batch_size
             else:
-                rows = cursor.fetchall()
-                columns = [column[0] for column in cursor.description]
-                return [dict(zip(columns, row)) for row in rows]
+                cursor = conn.cursor()
+
+            started = time.perf_counter()
+            executed = None
+            fetch_time = 0.0
+            row_count = 0
+            error = None
+            try:
+                with self._cancellable(conn, cursor) as scope:
+                    cursor.execute(prepared_query, prepared_params or ())
+                    executed = time.perf_counter()
+                    columns = None
+
+                    while True:
+                        # Отмена между пачками: серверный курсор закрывается в finally
+                        if scope is not None:
+                            scope.raise_if_cancelled()
+                        fetch_started = time.perf_counter()
+                        rows = cursor.fetchmany(batch_size)
+                        fetch_time += time.perf_counter() - fetch_started
+                        if not rows:
+                            break
+                        row_count += len(rows)
+
+                        # У серверного курсора description появляется после первой выборки
+                        if columns is None:
+                            columns = [desc[0] for desc in cursor.description]
+
+                        if as_numpy:
+                            yield ColumnarResult.from_columns(columns, list(zip(*rows)))
+                        else:
+                            yield [dict(zip(columns, row)) for row in rows]
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+                # Время выборки - только ожидание пачек, без обработки у потребителя
+                executed = executed or time.perf_counter()
+                session._record(query, len(params or ()), started, executed, executed + fetch_time,
+                                row_count if error is None else -1, error)
+
+    def iter_rows(self, query, params=None, batch_size=5000):
+        """Потоково выдаёт строки результата (dict) без загрузки всего результата в память"""
+        for batch in self.iter_batches(query, params, batch_size):
+            yield from batch
 
     def fetch_one(self, query, params=None):
         with self.connect() as conn:
-            cursor = conn.cursor()
-            prepared_query, prepared_params = self._prepare_query_and_params(query, params)
-            cursor.execute(prepared_query, prepared_params or ())
-            row = cursor.fetchone()
-
-            if row:
-                if self.db_type == 'postgres':
-                    columns = [desc[0] for desc in cursor.description]
-                    return dict(zip(columns, row))
-                else:
-                    columns = [column[0] for column in cursor.description]
-                    return dict(zip(columns, row))
-            return None
+            return DatabaseSession(self, conn).fetch_one(query, params)
 
     def execute(self, query, params=None):
         with self.connect() as conn:
-            cursor = conn.cursor()
-            prepared_query, prepared_params = self._prepare_query_and_params(query, params)
-
             try:
-                cursor.execute(prepared_query, prepared_params or ())
+                session = DatabaseSession(self, conn)
+                rowcount = session.execute(query, params)
                 conn.commit()
-                return cursor.rowcount
+                self.reference.invalidate_tables(session.written_tables)
+                return rowcount
+            except QueryCancelledError:
+                conn.rollback()
+                raise
             except Exception as e:
                 conn.rollback()
                 raise Exception(f"Ошибка выполнения запроса: {e}")
+
+    def execute_many(self, query, param_rows, page_size=500):
+        """
+        Выполняет запрос для каждого набора параметров одной транзакцией.
+
+        Для MSSQL используется pyodbc fast_executemany (если типы столбцов
+        определяются по первой строке, см. _fast_executemany_rows), для PostgreSQL -
+        execute_values (INSERT ... VALUES) или execute_batch, поэтому сотни
+        строк уходят на сервер за несколько обращений вместо сотен.
+        Возвращает количество обработанных наборов параметров.
+        """
+        with self.connect() as conn:
+            try:
+                session = DatabaseSession(self, conn)
+                processed = session.execute_many(query, param_rows, page_size)
+                conn.commit()
+                self.reference.invalidate_tables(session.written_tables)
+                return processed
+            except QueryCancelledError:
+                conn.rollback()
+                raise
+            except Exception as e:
+                conn.rollback()
+                raise Exception(f"Ошибка пакетного выполнения запроса: {e}")
+
+    def _execute_many_on_cursor(self, cursor, query, param_rows, page_size=500):
+        """Пакетное выполнение запроса на уже открытом курсоре (без commit)"""
+        prepared_query, _ = self._prepare_query_and_params(query, param_rows[0])
+
+        if self.db_type == 'postgres':
+            match = _INSERT_VALUES_RE.match(prepared_query)
+            if match:
+                # Многострочный INSERT: одна команда на page_size строк
+                execute_values(cursor, match.group(1) + "%s", param_rows,
+                               template=match.group(2), page_size=page_size)
+            else:
+                execute_batch(cursor, prepared_query, param_rows, page_size=page_size)
+        else:
+            param_rows, fast = _fast_executemany_rows(param_rows)
+            cursor.fast_executemany = fast
+            cursor.executemany(prepared_query, param_rows)
@@ -0,0 +1,149 @@
+# database/instrumentation.py
+import hashlib
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_DATABASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def fingerprint_query(query: str) -> str:
+    """Нормализует текст запроса: литералы заменяются на ?, пробелы схлопываются"""
+    normalized = _STRING_LITERAL_RE.sub("?", query)
+    normalized = _NUMBER_LITERAL_RE.sub("?", normalized)
+    return _WHITESPACE_RE.sub(" ", normalized).strip()
+
+
+def find_caller() -> str:
+    """Возвращает первый вызов вне пакета database (модуль:функция) - страница-инициатор"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if not filename.startswith(_DATABASE_DIR) and "contextlib" not in filename:
+            name = getattr(frame.f_code, "co_qualname", frame.f_code.co_name)
+            return f"{os.path.splitext(os.path.basename(filename))[0]}:{name}"
+        frame = frame.f_back
+    return "-"
+
+
+class QueryMonitor:
+    """
+    Журнал выполнения запросов.
+
+    Для каждого запроса хранит отпечаток текста, число параметров, время
+    получения соединения, выполнения и выборки, число строк и инициатора.
+    Последние записи держатся в кольцевом буфере, медленные запросы (и все,
+    если включено log_all) пишутся в ротируемый файл журнала.
+    """
+
+    def __init__(self, log_dir=None, slow_query_ms=500.0, buffer_size=1000, log_all=False):
+        self.slow_query_ms = float(slow_query_ms)
+        self.log_all = bool(log_all)
+        self._records = deque(maxlen=int(buffer_size))
+        self._lock = threading.Lock()
+        self._logger = None
+
+        if log_dir is not None:
+            try:
+                os.makedirs(log_dir, exist_ok=True)
+                self._logger = logging.getLogger(f"database.queries.{id(self)}")
+                self._logger.setLevel(logging.INFO)
+                self._logger.propagate = False
+                handler = RotatingFileHandler(
+                    os.path.join(log_dir, "db_queries.log"),
+                    maxBytes=5 * 1024 * 1024, backupCount=5, encoding="utf-8"
+                )
+                handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+                self._logger.addHandler(handler)
+            except Exception as e:
+                print(f"Не удалось открыть журнал запросов: {e}")
+                self._logger = None
+
+    def record(self, query, params_count, connect_time, execute_time, fetch_time,
+               row_count, caller="-", error=None):
+        """Регистрирует выполненный запрос (времена - в секундах)"""
+        fingerprint = fingerprint_query(query)
+        record = {
+            "timestamp": time.time(),
+            "fingerprint": fingerprint,
+            "fingerprint_id": hashlib.md5(fingerprint.encode("utf-8")).hexdigest()[:8],
+            "caller": caller,
+            "params_count": params_count,
+            "connect_ms": connect_time * 1000,
+            "execute_ms": execute_time * 1000,
+            "fetch_ms": fetch_time * 1000,
+            "total_ms": (connect_time + execute_time + fetch_time) * 1000,
+            "row_count": row_count,
+            "error": str(error) if error is not None else None,
+        }
+
+        with self._lock:
+            self._records.append(record)
+
+        is_slow = record["total_ms"] >= self.slow_query_ms
+        if self._logger is not None and (is_slow or self.log_all or error is not None):
+            level = logging.WARNING if (is_slow or error is not None) else logging.INFO
+            self._logger.log(
+                level,
+                "%s [%s] %s total=%.1fms connect=%.1fms execute=%.1fms fetch=%.1fms "
+                "rows=%s params=%s%s | %s",
+                "SLOW" if is_slow else "QUERY", record["fingerprint_id"], caller,
+                record["total_ms"], record["connect_ms"], record["execute_ms"], record["fetch_ms"],
+                row_count, params_count, f" error={record['error']}" if error is not None else "",
+                fingerprint,
+            )
+        return record
+
+    def log_stats(self, name, stats):
+        """Пишет в файл журнала строку счётчиков stats ({имя: значение}) с меткой name"""
+        if self._logger is None or not stats:
+            return
+        values = " ".join(
+            f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+            for key, value in stats.items()
+        )
+        self._logger.info("STATS %s %s", name, values)
+
+    def recent(self, limit=None) -> list:
+        """Последние записи буфера (новые в конце)"""
+        with self._lock:
+            records = list(self._records)
+        return records[-limit:] if limit else records
+
+    def slow_queries(self) -> list:
+        """Записи буфера, превысившие порог медленного запроса"""
+        return [r for r in self.recent() if r["total_ms"] >= self.slow_query_ms]
+
+    def summary(self, key="fingerprint") -> list:
+        """
+        Агрегаты по буферу, сгруппированные по отпечатку запроса или
+        по инициатору (key="caller"); отсортированы по суммарному времени.
+        """
+        groups = {}
+        for record in self.recent():
+            group = groups.setdefault(record[key], {
+                key: record[key], "count": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "errors": 0
+            })
+            group["count"] += 1
+            group["total_ms"] += record["total_ms"]
+            group["max_ms"] = max(group["max_ms"], record["total_ms"])
+            group["rows"] += max(record["row_count"], 0)
+            group["errors"] += 1 if record["error"] else 0
+
+        result = sorted(groups.values(), key=lambda g: g["total_ms"], reverse=True)
+        for group in result:
+            group["avg_ms"] = group["total_ms"] / group["count"]
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
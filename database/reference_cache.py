@@ -0,0 +1,134 @@
+# database/reference_cache.py
+import re
+import threading
+import time
+
+# Таблица, в которую пишет запрос: UPDATE t / INSERT INTO t / DELETE FROM t / MERGE INTO t / TRUNCATE TABLE t
+_WRITE_TARGET_RE = re.compile(
+    r"^\s*(?:UPDATE|INSERT\s+INTO|DELETE\s+FROM|DELETE|MERGE(?:\s+INTO)?|TRUNCATE\s+TABLE)\s+([\w\[\]\".]+)",
+    re.IGNORECASE
+)
+
+
+def written_table(query: str):
+    """Имя таблицы (в нижнем регистре, без схемы и скобок), изменяемой запросом, или None"""
+    match = _WRITE_TARGET_RE.match(query)
+    if not match:
+        return None
+    name = match.group(1).replace("[", "").replace("]", "").replace('"', "")
+    return name.split(".")[-1].lower() or None
+
+
+class ReferenceCache:
+    """
+    Кэш справочных таблиц (SET/CFG, PR_SET и т.п.).
+
+    Таблица загружается целиком одним запросом, выборка по условиям
+    выполняется в памяти. Записи сбрасываются, когда через Database.execute,
+    execute_many или transaction() изменяется соответствующая таблица,
+    а также по истечении max_age секунд (изменения из других программ).
+    """
+
+    def __init__(self, db, max_age=300.0):
+        self._db = db
+        self.max_age = float(max_age)
+        self._lock = threading.Lock()
+        self._entries = {}  # (таблица, запрос) -> (время загрузки, строки)
+        self._generations = {}  # таблица -> номер поколения (растёт при сбросе)
+        self._stats = {}
+        self._derived = {}  # (таблица, запрос, имя) -> (строки записи, производное значение)
+
+    def rows(self, table, columns=None, order_by=None) -> list:
+        """Все строки таблицы (копии словарей)"""
+        return [dict(row) for row in self._get(table.lower(), self._query(table, columns, order_by))]
+
+    def where(self, table, columns=None, order_by=None, **filters) -> list:
+        """Строки таблицы, у которых значения столбцов равны filters (копируются только они)"""
+        return [
+            dict(row) for row in self._get(table.lower(), self._query(table, columns, order_by))
+            if all(row.get(name) == value for name, value in filters.items())
+        ]
+
+    def first(self, table, columns=None, order_by=None, **filters):
+        """Первая подходящая строка (копия) или None"""
+        for row in self._get(table.lower(), self._query(table, columns, order_by)):
+            if all(row.get(name) == value for name, value in filters.items()):
+                return dict(row)
+        return None
+
+    def derived(self, table, name, build, columns=None, order_by=None):
+        """
+        Значение build(строки), построенное по строкам таблицы, например индекс
+        по ключу. Запоминается вместе с записью кэша: build вызывается снова,
+        только когда запись загружена заново (истёк max_age или сброс).
+        build получает сами кэшированные строки и не должен их изменять.
+        """
+        query = self._query(table, columns, order_by)
+        rows = self._get(table.lower(), query)
+        key = (table.lower(), query, name)
+        with self._lock:
+            memo = self._derived.get(key)
+            if memo is not None and memo[0] is rows:
+                return memo[1]
+
+        value = build(rows)
+        with self._lock:
+            self._derived[key] = (rows, value)
+        return value
+
+    def invalidate(self, table=None):
+        """Сбрасывает кэш таблицы (или всех таблиц при table=None)"""
+        with self._lock:
+            tables = {table.lower()} if table else {key[0] for key in self._entries}
+            for name in tables:
+                self._generations[name] = self._generations.get(name, 0) + 1
+                self._table_stats(name)["invalidations"] += 1
+            self._entries = {key: entry for key, entry in self._entries.items() if key[0] not in tables}
+            self._derived = {key: memo for key, memo in self._derived.items() if key[0] not in tables}
+
+    def invalidate_tables(self, tables):
+        for table in tables:
+            self.invalidate(table)
+
+    def stats(self) -> dict:
+        """Счётчики попаданий/промахов по таблицам"""
+        with self._lock:
+            result = {}
+            for table, counters in self._stats.items():
+                requests = counters["hits"] + counters["misses"]
+                result[table] = {
+                    **counters,
+                    "entries": sum(1 for key in self._entries if key[0] == table),
+                    "hit_ratio": counters["hits"] / requests if requests else 0.0,
+                }
+            return result
+
+    def _table_stats(self, table):
+        return self._stats.setdefault(table, {"hits": 0, "misses": 0, "invalidations": 0})
+
+    @staticmethod
+    def _query(table, columns, order_by):
+        select_list = ", ".join(columns) if columns else "*"
+        query = f"SELECT {select_list} FROM {table}"
+        if order_by:
+            query += f" ORDER BY {order_by}"
+        return query
+
+    def _get(self, table, query):
+        key = (table, query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.max_age <= 0 or time.monotonic() - entry[0] < self.max_age):
+                self._table_stats(table)["hits"] += 1
+                return entry[1]
+            self._table_stats(table)["misses"] += 1
+            generation = self._generations.get(table, 0)
+
+        # Запрос выполняется вне блокировки
+        rows = self._db.fetch_all(query)
+
+        with self._lock:
+            # Таблица могла измениться во время загрузки - такой результат не кэшируем
+            if self._generations.get(table, 0) == generation:
+                self._entries[key] = (time.monotonic(), rows)
+        return rows
@@ -1,10 +1,11 @@
 # main3.py
 import sys
+import multiprocessing
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QTreeWidget, QTreeWidgetItem,
     QStackedWidget, QWidget, QSplitter
 )
-from PySide6.QtCore import Qt#, QCoreApplication
+from PySide6.QtCore import Qt, QTimer#, QCoreApplication
 
 # Импортируем конфиг БД
 from config import DB_CONFIG
@@ -22,10 +23,16 @@ from config import DB_CONFIG
 #QCoreApplication.setAttribute(Qt.AA_EnableHighDpiScaling)
 #QCoreApplication.setAttribute(Qt.AA_UseHighDpiPixmaps)
 
-app = QApplication(sys.argv)
+# Процессы пула автоподбора членов уравнения импортируют этот модуль
+# как __mp_main__ - приложение Qt создаётся только в основном процессе
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    app = QApplication(sys.argv)
 
 # Импорты страниц (только классы, без создания экземпляров)
 from database.db import Database
+from utils.helpers import set_database_instance
+from utils.term_search import shutdown_process_pool
 from views.dashboard import DashboardPage
 from views.measurement.lines import LinesPage
 from views.measurement.ranges import RangesPage
@@ -64,6 +71,12 @@ class MainWindow(QMainWindow):
 
         # Подключение к БД
         self.db = Database(DB_CONFIG)
+        set_database_instance(self.db)
+
+        # Статистика пула соединений и кэша справочников - периодически в журнал запросов
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.db.log_stats)
+        self.stats_timer.start(DB_CONFIG.get('stats_log_interval', 600) * 1000)
 
         # Запускаем в работу AlarmManager
         #self.alarm_manager = AlarmManager(self.db, alarms)
@@ -238,6 +251,10 @@ class MainWindow(QMainWindow):
 
     def closeEvent(self, event):
         #self.plc_worker.stop()
+        self.stats_timer.stop()
+        self.db.log_stats()
+        self.db.close()
+        shutdown_process_pool()
         event.accept()
 
 # Запуск приложения
@@ -0,0 +1,55 @@
+# tests/test_db_execute_many.py
+import unittest
+
+from database.db import Database, _fast_executemany_rows
+
+
+class FakeCursor:
+    """Курсор pyodbc: запоминает режим fast_executemany и переданные строки"""
+
+    def __init__(self):
+        self.fast_executemany = None
+        self.calls = []
+
+    def executemany(self, query, param_rows):
+        self.calls.append((query, self.fast_executemany, list(param_rows)))
+
+
+class ExecuteManyMssqlTest(unittest.TestCase):
+    def setUp(self):
+        self.db = Database({"db_type": "mssql", "database": "test", "query_monitor": False})
+
+    def test_none_in_first_row_falls_back_to_executemany(self):
+        # Пустой коэффициент в первой строке UPDATE pr_set
+        rows = [(None, 1.5, 7), (0.25, 2.0, 8)]
+        cursor = FakeCursor()
+        self.db._execute_many_on_cursor(cursor, "UPDATE pr_set SET k_01 = ?, k_02 = ? WHERE id = ?", rows)
+
+        query, fast, sent = cursor.calls[0]
+        self.assertFalse(fast)
+        self.assertEqual(sent, rows)
+
+    def test_mixed_int_and_float_column_is_sent_as_float(self):
+        cursor = FakeCursor()
+        self.db._execute_many_on_cursor(cursor, "UPDATE pr_set SET k_01 = ? WHERE id = ?", [(1, 7), (0.5, 8)])
+
+        _, fast, sent = cursor.calls[0]
+        self.assertTrue(fast)
+        self.assertEqual(sent, [(1.0, 7), (0.5, 8)])
+        self.assertIsInstance(sent[0][0], float)
+        self.assertIsInstance(sent[0][1], int)
+
+    def test_null_only_column_keeps_fast_executemany(self):
+        rows, fast = _fast_executemany_rows([(None, "a"), (None, "b")])
+        self.assertTrue(fast)
+        self.assertEqual(rows, [(None, "a"), (None, "b")])
+
+    def test_bool_and_text_columns_are_not_converted(self):
+        rows, fast = _fast_executemany_rows([(True, "1", 2.5), (False, "x", 3)])
+        self.assertTrue(fast)
+        self.assertEqual(rows, [(True, "1", 2.5), (False, "x", 3.0)])
+        self.assertIs(rows[0][0], True)
+
+
+if __name__ == "__main__":
+    unittest.main()
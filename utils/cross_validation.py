@@ -0,0 +1,174 @@
+# utils/cross_validation.py
+import numpy as np
+
+KFOLD_FOLDS = 10
+TIME_FOLDS = 5
+STUDENTIZED_LIMIT = 3.0  # |t| выше - выброс
+
+
+def kfold_assignment(n: int, folds: int = KFOLD_FOLDS, seed: int = 0) -> np.ndarray:
+    """
+    Номер блока для каждой пробы при случайном разбиении на folds частей.
+    Разбиение фиксировано (seed), чтобы метрики не «прыгали» при смене членов.
+    """
+    folds = max(1, min(folds, n))
+    assignment = np.empty(n, dtype=np.intp)
+    assignment[np.random.default_rng(seed).permutation(n)] = np.arange(n) % folds
+    return assignment
+
+
+def time_block_assignment(timestamps, folds: int = TIME_FOLDS) -> np.ndarray:
+    """Номер блока для каждой пробы: folds последовательных по времени отрезков (None - в конце)"""
+    n = len(timestamps)
+    folds = max(1, min(folds, n))
+    order = sorted(range(n), key=lambda i: (timestamps[i] is None, timestamps[i] or 0))
+    assignment = np.empty(n, dtype=np.intp)
+    assignment[order] = (np.arange(n) * folds) // max(n, 1)
+    return assignment
+
+
+def _design(terms, y):
+    """
+    Центрированная матрица [1, T - T̄] и y - ȳ.
+    Модель со свободным членом от сдвига не меняется, а обусловленность
+    XᵀX становится лучше. Столбцы без разброса (пустые члены) отбрасываются.
+    """
+    terms = np.asarray(terms, dtype=np.float64).reshape(len(y), -1)
+    centered = terms - terms.mean(axis=0)
+    centered = centered[:, np.any(centered != 0, axis=0)]
+    return np.column_stack([np.ones(len(y)), centered]), y - y.mean()
+
+
+def _projection_basis(X) -> np.ndarray:
+    """
+    Ортонормированный базис пространства столбцов X (сингулярные векторы
+    ранга X): H = U·Uᵀ верна и для вырожденного набора членов.
+    """
+    u, s, vt = np.linalg.svd(X, full_matrices=False)
+    rank = int(np.sum(s > s[0] * max(X.shape) * np.finfo(float).eps)) if len(s) else 0
+    return u[:, :rank]
+
+
+def loo_residuals(X, y) -> np.ndarray:
+    """
+    Ошибки прогноза с исключением одной пробы e / (1 - h) без n переобучений,
+    h - диагональ матрицы проекции. NaN - проба с h = 1.
+    """
+    u = _projection_basis(X)
+    residuals = y - u @ (u.T @ y)
+    leverage = np.einsum("ij,ij->i", u, u)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = residuals / (1.0 - leverage)
+    result[leverage >= 1.0 - 1e-12] = np.nan
+    return result
+
+
+def fold_residuals(X, y, assignment) -> np.ndarray:
+    """
+    Ошибки прогноза для каждой пробы моделью, обученной без её блока.
+
+    XᵀX и Xᵀy обучающих частей получаются вычитанием вклада блока
+    из полных сумм, все блоки решаются одним пакетным pinv.
+    """
+    folds = int(assignment.max()) + 1 if len(assignment) else 0
+    p = X.shape[1]
+    gram, xty = X.T @ X, X.T @ y
+    fold_gram = np.empty((folds, p, p))
+    fold_xty = np.empty((folds, p))
+    for fold in range(folds):
+        mask = assignment == fold
+        fold_gram[fold] = X[mask].T @ X[mask]
+        fold_xty[fold] = X[mask].T @ y[mask]
+
+    beta = np.einsum("fij,fj->fi", np.linalg.pinv(gram - fold_gram), xty - fold_xty)
+    return y - np.einsum("ij,ij->i", X, beta[assignment])
+
+
+def _rmse(errors) -> float:
+    errors = errors[np.isfinite(errors)]
+    return float(np.sqrt(np.mean(errors ** 2))) if len(errors) else float("nan")
+
+
+def cross_validation(terms, y, kfold=None, time_folds=None) -> dict:
+    """
+    Метрики скользящего контроля модели y = A0 + Σ Ai·Ti.
+
+    terms - значения членов (пробы × члены, без столбца единиц),
+    kfold / time_folds - номера блоков (kfold_assignment, time_block_assignment).
+    Возвращает press, rmse_loo, q2 (R² прогноза), rmse_kfold, rmse_time;
+    метрики, которые нельзя посчитать, равны NaN.
+    """
+    nan = float("nan")
+    result = {"press": nan, "rmse_loo": nan, "q2": nan, "rmse_kfold": nan, "rmse_time": nan}
+    y = np.asarray(y, dtype=np.float64)
+    if len(y) < 3:
+        return result
+
+    X, y_centered = _design(terms, y)
+    if len(y) <= X.shape[1]:
+        return result
+
+    loo = loo_residuals(X, y_centered)
+    if np.all(np.isfinite(loo)):
+        result["press"] = float(loo @ loo)
+        result["rmse_loo"] = float(np.sqrt(result["press"] / len(y)))
+        syy = float(y_centered @ y_centered)
+        if syy > 0:
+            result["q2"] = 1.0 - result["press"] / syy
+
+    if kfold is not None and kfold.max() > 0:
+        result["rmse_kfold"] = _rmse(fold_residuals(X, y_centered, kfold))
+    if time_folds is not None and time_folds.max() > 0:
+        result["rmse_time"] = _rmse(fold_residuals(X, y_centered, time_folds))
+    return result
+
+
+def influence_diagnostics(terms, y):
+    """
+    Диагностика влияния проб на модель y = A0 + Σ Ai·Ti (по обычному МНК).
+
+    Возвращает dict массивов по пробам: leverage (диагональ H), cooks (D Кука),
+    dffits, studentized (внешне стьюдентизированные остатки), флаги
+    high_leverage (h > 2p/n), high_cooks (D > 4/n), high_dffits (|DFFITS| > 2√(p/n)),
+    outlier (|t| > STUDENTIZED_LIMIT) и flagged - влиятельные пробы
+    (выброс, либо D > 4/n при |t| > 2). None - проб слишком мало.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n < 3:
+        return None
+
+    X, y_centered = _design(terms, y)
+    u = _projection_basis(X)
+    p = u.shape[1]
+    dof = n - p
+    if dof < 2:
+        return None
+
+    residuals = y_centered - u @ (u.T @ y_centered)
+    leverage = np.einsum("ij,ij->i", u, u)
+    one_minus_h = np.maximum(1.0 - leverage, 1e-12)
+    s2 = float(residuals @ residuals) / dof
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        internal = residuals / np.sqrt(s2 * one_minus_h)
+        studentized = internal * np.sqrt((dof - 1) / np.maximum(dof - internal ** 2, 1e-12))
+        cooks = internal ** 2 * leverage / (p * one_minus_h)
+        dffits = studentized * np.sqrt(leverage / one_minus_h)
+    for values in (studentized, cooks, dffits):
+        # Точная подгонка (s² = 0) - влиятельных проб нет
+        values[~np.isfinite(values)] = 0.0
+
+    high_cooks = cooks > 4.0 / n
+    outlier = np.abs(studentized) > STUDENTIZED_LIMIT
+    return {
+        "leverage": leverage,
+        "cooks": cooks,
+        "dffits": dffits,
+        "studentized": studentized,
+        "high_leverage": leverage > 2.0 * p / n,
+        "high_cooks": high_cooks,
+        "high_dffits": np.abs(dffits) > 2.0 * np.sqrt(p / n),
+        "outlier": outlier,
+        "flagged": outlier | (high_cooks & (np.abs(studentized) > 2.0)),
+    }
@@ -0,0 +1,349 @@
+# utils/feature_engine.py
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.path_manager import get_config_path
+
+# Разобранные файлы членов уравнений: путь -> (mtime, данные JSON)
+_terms_cache = {}
+_terms_lock = threading.Lock()
+
+
+def _load_interactions_json(json_file: str):
+    """Читает файл членов уравнений; повторно разбирает его только после изменения"""
+    json_path = get_config_path() / json_file
+    try:
+        mtime = os.path.getmtime(json_path)
+    except OSError:
+        return None
+
+    with _terms_lock:
+        cached = _terms_cache.get(json_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    with _terms_lock:
+        _terms_cache[json_path] = (mtime, data)
+    return data
+
+
+def load_interaction_terms(meas_type: int, el_nmb) -> list:
+    """
+    Члены уравнения для типа градуировки и элемента.
+
+    meas_type = 0 - по интенсивностям (lines_math_interactions.json, общий список),
+    meas_type = 1 - по концентрациям (math_interactions.json, список элемента).
+    Возвращает list[dict] с ключами description, x1, x2, op (пустые описания пропускаются).
+    """
+    json_file = "lines_math_interactions.json" if meas_type == 0 else "math_interactions.json"
+    data = _load_interactions_json(json_file)
+    if not data:
+        return []
+
+    if meas_type == 0:
+        interactions = data.get("interactions", [])
+    else:
+        interactions = []
+        for group in data.get("interactions", []):
+            if group.get("element_original_number") == el_nmb:
+                interactions = group.get("interactions", [])
+                break
+
+    return [
+        {"description": term["description"], "x1": term.get("x1", 0),
+         "x2": term.get("x2", 0), "op": term.get("op", 0)}
+        for term in interactions
+        if term.get("description") and term["description"].strip()
+    ]
+
+
+def feature_columns(meas_type: int) -> list:
+    """Столбцы PR_MEAS, из которых строятся признаки"""
+    if meas_type == 0:
+        return [f"i_00_{i:02d}" for i in range(20)]
+    return [f"c_{i:02d}" for i in range(1, 9)]
+
+
+def _safe_divide(numerator, denominator):
+    """Деление с нулём там, где знаменатель равен нулю"""
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator != 0)
+
+
+class FeatureEngine:
+    """
+    Вычисление членов уравнения (x1, x2, op) по столбцам выборки.
+
+    Столбцы хранятся как массивы float64 (NULL -> NaN), член вычисляется
+    одним выражением NumPy для всей выборки. Деление на ноль и NULL
+    в операндах дают 0.0, как и в хранимой процедуре расчёта.
+
+    Операнды нумеруются как в PR_SET: по интенсивностям N - столбец i_00_NN,
+    по концентрациям N - концентрация элемента N+1 (c_01..c_08).
+
+    Коды операций: 0 - 0, 1 - X1, 2 - X1*X2, 3 - X1/X2, 4 - X1², 5 - 1/X1,
+    6 - X1/X2², 7 - 1/X1².
+    """
+
+    def __init__(self, meas_type: int, columns: dict, row_count: int):
+        self.meas_type = meas_type
+        self.row_count = row_count
+        self._columns = {name: np.asarray(values, dtype=np.float64) for name, values in columns.items()}
+        self._ones = np.ones(row_count)
+        self._zeros = np.zeros(row_count)
+        self._fingerprint = None
+
+    @classmethod
+    def from_records(cls, records: list, meas_type: int):
+        """Строит движок из буфера list[dict] (строки PR_MEAS)"""
+        row_count = len(records)
+        columns = {}
+        for name in feature_columns(meas_type):
+            columns[name] = np.fromiter(
+                (np.nan if value is None else float(value)
+                 for value in (record.get(name, 0.0) for record in records)),
+                dtype=np.float64, count=row_count
+            )
+        return cls(meas_type, columns, row_count)
+
+    @classmethod
+    def from_columns(cls, columns: dict, meas_type: int, row_count: int):
+        """Строит движок из результата по столбцам ({имя: значения}, NULL -> NaN)"""
+        return cls(meas_type, {
+            name: np.array(columns[name], dtype=np.float64) if name in columns else np.zeros(row_count)
+            for name in feature_columns(meas_type)
+        }, row_count)
+
+    @classmethod
+    def from_columnar(cls, result, meas_type: int):
+        """Строит движок из ColumnarResult (NULL -> NaN, в том числе в целых столбцах)"""
+        return cls(meas_type, {
+            name: result.filled(name, np.nan) if name in result else np.zeros(len(result))
+            for name in feature_columns(meas_type)
+        }, len(result))
+
+    def fingerprint(self) -> str:
+        """Отпечаток содержимого столбцов: одинаковые данные - одинаковый отпечаток"""
+        if self._fingerprint is None:
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(f"{self.meas_type}:{self.row_count}".encode("utf-8"))
+            for name in sorted(self._columns):
+                digest.update(name.encode("utf-8"))
+                digest.update(self._columns[name].tobytes())
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def take(self, rows):
+        """Движок для подмножества строк (индексы или булева маска)"""
+        columns = {name: values[rows] for name, values in self._columns.items()}
+        row_count = len(next(iter(columns.values()))) if columns else int(np.count_nonzero(rows))
+        return FeatureEngine(self.meas_type, columns, row_count)
+
+    def _operand(self, index: int):
+        """Массив операнда с номером index (нумерация PR_SET)"""
+        name = f"i_00_{index:02d}" if self.meas_type == 0 else f"c_{index + 1:02d}"
+        return self._columns.get(name, self._zeros)
+
+    def evaluate(self, x1: int, x2: int, op: int) -> np.ndarray:
+        """Значения члена (x1, x2, op) для всех строк выборки"""
+        if op not in (1, 2, 3, 4, 5, 6, 7):
+            return np.zeros(self.row_count)
+
+        val1 = self._operand(x1)
+        val2 = self._operand(x2)
+
+        with np.errstate(over="ignore", invalid="ignore"):
+            if op == 1:
+                result = val1.copy()
+            elif op == 2:
+                result = val1 * val2
+            elif op == 3:
+                result = _safe_divide(val1, val2)
+            elif op == 4:
+                result = val1 * val1
+            elif op == 5:
+                result = _safe_divide(self._ones, val1)
+            elif op == 6:
+                result = _safe_divide(val1, val2 * val2)
+            else:
+                result = _safe_divide(self._ones, val1 * val1)
+
+        # NULL в операндах
+        result[np.isnan(result)] = 0.0
+        return result
+
+    def evaluate_term(self, term: dict) -> np.ndarray:
+        return self.evaluate(term["x1"], term["x2"], term["op"])
+
+
+def _to_float(value) -> float:
+    """Число из поля PR_SET; NULL и нечисловые значения - 0.0"""
+    try:
+        return 0.0 if value is None else float(value)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _to_int(value) -> int:
+    try:
+        return 0 if value is None else int(value)
+    except (ValueError, TypeError):
+        return 0
+
+
+class CompiledEquation:
+    """
+    Уравнение градуировки, подготовленное для расчёта по столбцам выборки.
+
+    c = A0 + A1·член1 + ... + A5·член5, c_cor = k_klin00 + k_klin01·c.
+    Поля строки PR_SET разбираются один раз; расчёт для всей выборки -
+    пять выражений FeatureEngine и одно матричное умножение.
+    """
+
+    def __init__(self, meas_type: int, coefficients, terms, k_klin00=0.0, k_klin01=1.0):
+        self.meas_type = meas_type
+        self.coefficients = np.asarray(coefficients, dtype=np.float64)  # A0..A5
+        self.terms = [tuple(term) for term in terms]  # (x1, x2, op) для A1..A5
+        self.k_klin00 = float(k_klin00)
+        self.k_klin01 = float(k_klin01)
+
+    @classmethod
+    def from_pr_set(cls, row: dict):
+        """Уравнение из строки PR_SET (поля k_i_*/operand_i_* или k_c_*/operand_c_* по meas_type)"""
+        meas_type = 0 if _to_int(row.get("meas_type")) == 0 else 1
+        suffix = "i" if meas_type == 0 else "c"
+        coefficients = [_to_float(row.get(f"k_{suffix}_alin{i:02d}")) for i in range(6)]
+        terms = [
+            (_to_int(row.get(f"operand_{suffix}_01_{i:02d}")),
+             _to_int(row.get(f"operand_{suffix}_02_{i:02d}")),
+             _to_int(row.get(f"operator_{suffix}_{i:02d}")))
+            for i in range(1, 6)
+        ]
+        return cls(meas_type, coefficients, terms,
+                   _to_float(row.get(f"k_{suffix}_klin00")), _to_float(row.get(f"k_{suffix}_klin01")))
+
+    def features(self, engine: FeatureEngine) -> np.ndarray:
+        """Значения членов A1..A5: матрица строки × 5"""
+        features = np.empty((engine.row_count, len(self.terms)))
+        for i, term in enumerate(self.terms):
+            features[:, i] = engine.evaluate(*term)
+        return features
+
+    def evaluate(self, engine: FeatureEngine, features=None) -> np.ndarray:
+        """c для всех строк выборки"""
+        if features is None:
+            features = self.features(engine)
+        return self.coefficients[0] + features @ self.coefficients[1:]
+
+    def evaluate_corrected(self, engine: FeatureEngine, features=None) -> np.ndarray:
+        """c_cor = k_klin00 + k_klin01·c для всех строк выборки"""
+        return self.k_klin00 + self.k_klin01 * self.evaluate(engine, features)
+
+
+class TermMatrix:
+    """
+    Значения всех членов-кандидатов для выборки: матрица строки × члены.
+
+    Матрица хранится по столбцам (order="F"), поэтому выбор члена - это
+    срез без копирования. Матрица только для чтения.
+    """
+
+    def __init__(self, descriptions: list, matrix: np.ndarray):
+        self.descriptions = list(descriptions)
+        self.matrix = matrix
+        self.matrix.flags.writeable = False
+        self._index = {description.strip(): i for i, description in enumerate(self.descriptions)}
+
+    @classmethod
+    def build(cls, engine: FeatureEngine, terms: list):
+        """Вычисляет все члены terms на выборке движка"""
+        descriptions = []
+        matrix = np.empty((engine.row_count, len(terms)), dtype=np.float64, order="F")
+        for i, term in enumerate(terms):
+            matrix[:, i] = engine.evaluate_term(term)
+            descriptions.append(term["description"])
+        return cls(descriptions, matrix)
+
+    def take(self, rows):
+        """Матрица для подмножества строк выборки без пересчёта членов"""
+        return TermMatrix(self.descriptions, np.asfortranarray(self.matrix[rows]))
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes
+
+    def __contains__(self, description):
+        return description.strip() in self._index
+
+    def index_of(self, description):
+        """Номер столбца члена или None, если такого члена нет"""
+        return self._index.get(description.strip())
+
+    def column(self, description):
+        """Столбец члена (представление) или None, если такого члена нет"""
+        index = self.index_of(description)
+        return None if index is None else self.matrix[:, index]
+
+
+class TermMatrixCache:
+    """
+    LRU-кэш матриц членов по ключу (тип градуировки, элемент, отпечаток выборки).
+
+    Суммарный объём матриц ограничен max_bytes: при превышении вытесняются
+    давно не использованные. Матрица больше бюджета не кэшируется.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = int(max_bytes)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get_or_build(self, key, build) -> TermMatrix:
+        """Возвращает матрицу по ключу, при промахе строит её через build()"""
+        with self._lock:
+            term_matrix = self._entries.get(key)
+            if term_matrix is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return term_matrix
+            self._misses += 1
+
+        # Построение - вне блокировки
+        term_matrix = build()
+
+        with self._lock:
+            if key not in self._entries and term_matrix.nbytes <= self.max_bytes:
+                self._entries[key] = term_matrix
+                self._bytes += term_matrix.nbytes
+                while self._bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= evicted.nbytes
+                    self._evictions += 1
+        return term_matrix
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
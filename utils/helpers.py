@@ -1,15 +1,52 @@
 # utils/helpers.py
-from typing import Dict, Optional
+import time
+from typing import Dict, Iterable, Optional
 from database.db import Database
 
-# Глобальный кэш для оптимизации
-_ln_name_cache: Dict[int, str] = {}
+# Время неудачной загрузки имён линий: повторная попытка - по истечении max_age кэша справочников
+_ln_name_error_at: Optional[float] = None
 _db_instance: Optional[Database] = None
 
 def set_database_instance(db: Database):
     """Устанавливает экземпляр БД для использования в функциях"""
     global _db_instance
     _db_instance = db
+    clear_ln_name_cache()
+
+def _get_ln_name_index() -> Dict[int, str]:
+    """
+    Индекс имён линий (ln_nmb -> ln_name) по строкам SET01 из кэша справочников.
+
+    Индекс запоминается вместе с записью SET01 и строится заново только
+    при её перезагрузке (срок хранения или сброс после записи в SET01).
+    Ошибка загрузки запоминается на тот же срок, чтобы не повторять запрос
+    и сообщение при каждом вызове.
+    """
+    global _ln_name_error_at
+
+    # Проверяем наличие БД
+    if _db_instance is None:
+        return {}
+
+    reference = _db_instance.reference
+    if _ln_name_error_at is not None and (
+            reference.max_age <= 0 or time.monotonic() - _ln_name_error_at < reference.max_age):
+        return {}
+
+    try:
+        # Та же выборка SET01, что и у страницы фона - запись кэша справочников общая
+        index = reference.derived("SET01", "ln_name_index", _build_ln_name_index,
+                                  columns=["ln_nmb", "ln_name", "ln_back"])
+    except Exception as e:
+        print(f"Ошибка при загрузке имён линий: {e}")
+        _ln_name_error_at = time.monotonic()
+        return {}
+
+    _ln_name_error_at = None
+    return index
+
+def _build_ln_name_index(rows) -> Dict[int, str]:
+    return {row["ln_nmb"]: row["ln_name"] for row in rows if row.get("ln_name")}
 
 def get_ln_name(ln_nmb: int) -> str:
     """
@@ -21,40 +58,21 @@ def get_ln_name(ln_nmb: int) -> str:
     Returns:
         str: Имя линии или "-1" если не найдено
     """
-    global _ln_name_cache, _db_instance
+    return _get_ln_name_index().get(ln_nmb, "-1")
 
-    # Проверяем кэш
-    if ln_nmb in _ln_name_cache:
-        return _ln_name_cache[ln_nmb]
+def get_ln_names(ln_nmbs: Iterable[int]) -> Dict[int, str]:
+    """Имена для набора номеров линий без дополнительных запросов к БД"""
+    index = _get_ln_name_index()
+    return {ln_nmb: index.get(ln_nmb, "-1") for ln_nmb in ln_nmbs}
 
-    # Проверяем наличие БД
-    if _db_instance is None:
-        return "-1"
-
-    try:
-        # Запрашиваем имя из БД
-        query = """
-        SELECT [ln_name]
-        FROM [AMMKASAKDB01].[dbo].[LN_SET01]
-        WHERE [ln_nmb] = ? AND [ac_nmb] = 1
-        """
-        # Исправлено: добавлена открывающая скобка для fetch_one(
-        result = _db_instance.fetch_one(query, [ln_nmb])
-
-        if result and result.get("ln_name"):
-            name = result["ln_name"]
-        else:
-            name = "-1"
-
-        # Сохраняем в кэш
-        _ln_name_cache[ln_nmb] = name
-        return name
-
-    except Exception as e:
-        print(f"Ошибка при получении имени для ln_nmb={ln_nmb}: {e}")
-        return "-1"
+def refresh_ln_names():
+    """Перечитывает имена линий (вызывается после записи в SET01)"""
+    clear_ln_name_cache()
+    if _db_instance is not None:
+        _db_instance.reference.invalidate("SET01")
+    _get_ln_name_index()
 
 def clear_ln_name_cache():
-    """Очищает кэш имён линий"""
-    global _ln_name_cache
-    _ln_name_cache.clear()
+    """Сбрасывает запомненную ошибку загрузки имён линий"""
+    global _ln_name_error_at
+    _ln_name_error_at = None
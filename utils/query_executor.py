@@ -0,0 +1,270 @@
+# utils/query_executor.py
+import itertools
+import traceback
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal, Slot
+from PySide6.QtWidgets import QWidget, QHBoxLayout, QLabel, QProgressBar, QPushButton
+
+from database.cancellation import CancelScope, QueryCancelledError, cancel_scope, current_scope
+
+
+class CancellationToken(CancelScope):
+    """
+    Признак отмены фоновой задачи (потокобезопасный).
+
+    Задача выполняется внутри области отмены токена, поэтому cancel()
+    прерывает и выполняющиеся на сервере запросы Database.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._progress_callback = None
+        self._partial_callback = None
+
+    def report_progress(self, done, total):
+        """Сообщает о ходе задачи (вызывается из фонового потока)"""
+        if self._progress_callback is not None:
+            self._progress_callback(int(done), int(total))
+
+    def report_partial(self, payload):
+        """Передает в GUI-поток часть результата до завершения задачи (вызывается из фонового потока)"""
+        if self._partial_callback is not None:
+            self._partial_callback(payload)
+
+
+def current_token():
+    """Токен задачи, выполняющейся в текущем потоке (None вне QueryExecutor)"""
+    scope = current_scope()
+    return scope if isinstance(scope, CancellationToken) else None
+
+
+class _TaskSignals(QObject):
+    result = Signal(int, object)
+    error = Signal(int, str)
+    cancelled = Signal(int)
+    progress = Signal(int, int, int)
+    partial = Signal(int, object)
+
+
+class _QueryTask(QRunnable):
+    """Выполнение функции в пуле потоков с передачей результата через сигналы"""
+
+    def __init__(self, task_id, fn, args, kwargs, token, signals):
+        super().__init__()
+        self.task_id = task_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.token = token
+        self.signals = signals
+
+    def run(self):
+        if self.token.is_cancelled:
+            self.signals.cancelled.emit(self.task_id)
+            return
+
+        self.token._progress_callback = lambda done, total: self.signals.progress.emit(self.task_id, done, total)
+        self.token._partial_callback = lambda payload: self.signals.partial.emit(self.task_id, payload)
+        try:
+            with cancel_scope(self.token):
+                result = self.fn(*self.args, **self.kwargs)
+        except QueryCancelledError:
+            self.signals.cancelled.emit(self.task_id)
+            return
+        except Exception as e:
+            if self.token.is_cancelled:
+                # Ошибка, вызванная отменой запроса на сервере
+                self.signals.cancelled.emit(self.task_id)
+            else:
+                traceback.print_exc()
+                self.signals.error.emit(self.task_id, str(e))
+            return
+
+        if self.token.is_cancelled:
+            self.signals.cancelled.emit(self.task_id)
+        else:
+            self.signals.result.emit(self.task_id, result)
+
+
+class QueryExecutor(QObject):
+    """
+    Общий исполнитель запросов к БД вне GUI-потока.
+
+    submit() ставит функцию в QThreadPool и возвращает CancellationToken;
+    обработчики on_result / on_error / on_cancelled / on_progress / on_partial
+    вызываются в GUI-потоке. Функция не должна обращаться к виджетам; о ходе работы
+    она сообщает через current_token().report_progress(done, total), а готовые
+    части результата передает через current_token().report_partial(payload).
+    """
+
+    busy_changed = Signal(bool)
+
+    def __init__(self, max_threads=4, parent=None):
+        super().__init__(parent)
+        self._pool = QThreadPool()
+        self._pool.setMaxThreadCount(max_threads)
+        self._signals = _TaskSignals()
+        self._signals.result.connect(self._on_result)
+        self._signals.error.connect(self._on_error)
+        self._signals.cancelled.connect(self._on_cancelled)
+        self._signals.progress.connect(self._on_progress)
+        self._signals.partial.connect(self._on_partial)
+        self._ids = itertools.count(1)
+        self._callbacks = {}
+
+    @property
+    def active_count(self) -> int:
+        return len(self._callbacks)
+
+    def submit(self, fn, *args, on_result=None, on_error=None, on_cancelled=None,
+               on_progress=None, on_partial=None, token=None, **kwargs) -> CancellationToken:
+        """Запускает fn(*args, **kwargs) в фоновом потоке"""
+        token = token or CancellationToken()
+        task_id = next(self._ids)
+        self._callbacks[task_id] = (on_result, on_error, on_cancelled, on_progress, on_partial)
+        if len(self._callbacks) == 1:
+            self.busy_changed.emit(True)
+
+        self._pool.start(_QueryTask(task_id, fn, args, kwargs, token, self._signals))
+        return token
+
+    def _pop_callbacks(self, task_id):
+        callbacks = self._callbacks.pop(task_id, (None, None, None, None, None))
+        if not self._callbacks:
+            self.busy_changed.emit(False)
+        return callbacks
+
+    @Slot(int, object)
+    def _on_result(self, task_id, result):
+        on_result = self._pop_callbacks(task_id)[0]
+        if on_result:
+            on_result(result)
+
+    @Slot(int, str)
+    def _on_error(self, task_id, message):
+        on_error = self._pop_callbacks(task_id)[1]
+        if on_error:
+            on_error(message)
+
+    @Slot(int)
+    def _on_cancelled(self, task_id):
+        on_cancelled = self._pop_callbacks(task_id)[2]
+        if on_cancelled:
+            on_cancelled()
+
+    @Slot(int, int, int)
+    def _on_progress(self, task_id, done, total):
+        callbacks = self._callbacks.get(task_id)
+        if callbacks and callbacks[3]:
+            callbacks[3](done, total)
+
+    @Slot(int, object)
+    def _on_partial(self, task_id, payload):
+        callbacks = self._callbacks.get(task_id)
+        if callbacks and callbacks[4]:
+            callbacks[4](payload)
+
+
+_executor = None
+
+
+def get_query_executor() -> QueryExecutor:
+    """Возвращает общий для всех страниц исполнитель запросов"""
+    global _executor
+    if _executor is None:
+        _executor = QueryExecutor()
+    return _executor
+
+
+class BusyIndicator(QWidget):
+    """
+    Индикатор фоновой операции страницы: текст, бегущая полоса и кнопка «Отмена».
+
+    submit() запускает задачу через общий исполнитель; предыдущая задача
+    этого индикатора при этом отменяется, чтобы её результат не перетёр новый.
+    Для такой вытесненной задачи всегда вызывается её on_cancelled
+    (даже если она успела завершиться), индикатор остаётся за новой задачей.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.token = None
+
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.label = QLabel()
+        self.progress = QProgressBar()
+        self.progress.setRange(0, 0)
+        self.progress.setFixedWidth(200)
+        self.cancel_btn = QPushButton("Отмена")
+        self.cancel_btn.clicked.connect(self.cancel)
+
+        layout.addWidget(self.label)
+        layout.addWidget(self.progress)
+        layout.addWidget(self.cancel_btn)
+        layout.addStretch()
+        self.setLayout(layout)
+        self.hide()
+
+    @property
+    def is_busy(self) -> bool:
+        return self.token is not None
+
+    def submit(self, text, fn, *args, on_result=None, on_error=None, on_cancelled=None,
+               on_progress=None, on_partial=None, **kwargs):
+        """Показывает индикатор и запускает fn в фоне; возвращает CancellationToken"""
+        self.cancel()
+
+        token = CancellationToken()
+        self.token = token
+        self.label.setText(text)
+        self.progress.setRange(0, 0)
+        self.cancel_btn.setEnabled(True)
+        self.show()
+
+        def progress(done, total):
+            if self.token is not token:
+                return
+            # Получен ход задачи - полоса становится определённой
+            self.progress.setRange(0, max(total, 1))
+            self.progress.setValue(min(done, max(total, 1)))
+            if on_progress:
+                on_progress(done, total)
+
+        def partial(payload):
+            # Части результата устаревшей задачи игнорируются
+            if self.token is token and on_partial:
+                on_partial(payload)
+
+        def finish(callback):
+            def handler(*callback_args):
+                if self.token is not token:
+                    # Задача перезапущена: её результат отбрасывается, но on_cancelled
+                    # вызывается, чтобы страница восстановила кнопки и состояние
+                    if on_cancelled:
+                        on_cancelled()
+                    return
+                self.token = None
+                self.hide()
+                if callback:
+                    callback(*callback_args)
+            return handler
+
+        return get_query_executor().submit(
+            fn, *args,
+            on_result=finish(on_result),
+            on_error=finish(on_error),
+            on_cancelled=finish(on_cancelled),
+            on_progress=progress,
+            on_partial=partial,
+            token=token,
+            **kwargs
+        )
+
+    def cancel(self):
+        """Отменяет текущую задачу индикатора"""
+        if self.token is not None:
+            self.token.cancel()
+            self.label.setText("Отмена...")
+            self.cancel_btn.setEnabled(False)
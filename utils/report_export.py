@@ -0,0 +1,151 @@
+# utils/report_export.py
+import csv
+import os
+
+import numpy as np
+
+from utils.query_executor import current_token
+
+CHUNK_ROWS = 10000  # строк данных на одну запись в файл
+
+
+def format_meas_dt(meas_dt) -> str:
+    """Время цикла для отображения и выгрузки"""
+    if isinstance(meas_dt, np.generic):
+        # Элемент массива datetime64 / object -> datetime (NaT -> None)
+        meas_dt = meas_dt.item()
+    if isinstance(meas_dt, str):
+        return meas_dt
+    if hasattr(meas_dt, 'strftime'):
+        return meas_dt.strftime("%Y-%m-%d %H:%M:%S")
+    return str(meas_dt) if meas_dt else ""
+
+
+def _format_column(values, template, missing):
+    """Текст столбца по шаблону; пропуски (NaN в missing) - прочерк"""
+    text = np.char.mod(template, np.where(missing, 0.0, values)).astype(object)
+    text[missing] = "-"
+    return text
+
+
+def _element_columns(report_data, deltas, relatives, rows, element):
+    """Четыре текстовых столбца элемента (С расч, С хим, ΔC, ΔC/С хим %) для строк rows"""
+    chemical = report_data.chemical[rows, element]
+    missing = np.isnan(chemical)
+    # + 0.0 убирает «-0%» после округления
+    percent = np.rint(relatives[rows, element]) + 0.0
+    return [
+        np.char.mod("%.4f", report_data.calculated[rows, element]).astype(object),
+        _format_column(chemical, "%.4f", missing),
+        _format_column(deltas[rows, element], "%.4f", missing),
+        _format_column(percent, "%.0f%%", missing),
+    ]
+
+
+def _replace_on_success(path, write):
+    """
+    Пишет файл через временный path.part и переименовывает его только после
+    успешной записи: при ошибке или отмене прежний файл не затирается.
+    """
+    temp_path = path + ".part"
+    try:
+        write(temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def export_report_csv(path, title_rows, headers, statistics_rows, report_data, rows,
+                      element_count, chunk_rows=CHUNK_ROWS):
+    """
+    Выгружает отчет в CSV (разделитель «;», UTF-8 с BOM).
+
+    title_rows, headers, statistics_rows - готовые строки шапки, заголовков
+    таблицы и статистики; строки данных rows (индексы ReportData) форматируются
+    из массивов блоками по chunk_rows. element_count - число элементов в таблице
+    (столбцы элементов сверх данных отчета остаются пустыми).
+    Выполняется в фоновом потоке: сообщает о ходе и проверяет отмену между блоками.
+    Возвращает число выгруженных строк данных.
+    """
+    token = current_token()
+    rows = np.asarray(rows, dtype=np.intp)
+    deltas = report_data.delta
+    relatives = report_data.relative
+    empty = np.full(len(rows), "", dtype=object)
+
+    def write(temp_path):
+        with open(temp_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
+            writer = csv.writer(csvfile, delimiter=';', quoting=csv.QUOTE_MINIMAL)
+            writer.writerows(title_rows)
+            writer.writerow(headers)
+            writer.writerows(statistics_rows)
+
+            for start in range(0, len(rows), chunk_rows):
+                if token:
+                    token.raise_if_cancelled()
+                    token.report_progress(start, len(rows))
+
+                chunk = rows[start:start + chunk_rows]
+                columns = [[format_meas_dt(report_data.meas_dt[row]) for row in chunk]]
+                for element in range(element_count):
+                    if element < report_data.element_count:
+                        columns.extend(_element_columns(report_data, deltas, relatives, chunk, element))
+                    else:
+                        columns.extend([empty[:len(chunk)]] * 4)
+                writer.writerows(zip(*columns))
+
+            if token:
+                token.report_progress(len(rows), len(rows))
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    _replace_on_success(path, write)
+    return len(rows)
+
+
+def _meas_dt_array(meas_dt):
+    """Время цикла как datetime64[s]; если значения не приводятся - как строки"""
+    try:
+        return np.asarray(meas_dt).astype("datetime64[s]")
+    except (ValueError, TypeError):
+        return np.array([format_meas_dt(value) for value in meas_dt], dtype=str)
+
+
+def export_report_npz(path, report_data, rows, elements):
+    """
+    Выгружает числовые данные отчета в двоичный столбцовый файл NumPy (.npz).
+
+    Массивы: meas_dt, elements (имена столбцов элементов), calculated, chemical,
+    delta, relative (строки × элементы, NaN - нет С хим). Только строки rows.
+    Возвращает число выгруженных строк.
+    """
+    token = current_token()
+    rows = np.asarray(rows, dtype=np.intp)
+    element_count = min(len(elements), report_data.element_count)
+    if token:
+        token.report_progress(0, 1)
+
+    arrays = {
+        "meas_dt": _meas_dt_array(report_data.meas_dt[rows]),
+        "elements": np.array(elements[:element_count], dtype=str),
+        "calculated": report_data.calculated[rows, :element_count],
+        "chemical": report_data.chemical[rows, :element_count],
+        "delta": report_data.delta[rows, :element_count],
+        "relative": report_data.relative[rows, :element_count],
+    }
+
+    def write(temp_path):
+        if token:
+            token.raise_if_cancelled()
+        with open(temp_path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    _replace_on_success(path, write)
+    if token:
+        token.report_progress(1, 1)
+    return len(rows)
@@ -0,0 +1,168 @@
+# utils/report_statistics.py
+import numpy as np
+
+ELEMENT_COUNT = 8
+MIN_VALID_COUNT = 5  # меньше проб с С хим - статистика по элементу не выводится
+
+
+class ReportData:
+    """
+    Данные отчёта по столбцам: для каждой строки и элемента - С расч и С хим.
+
+    meas_dt - массив времени цикла, calculated, chemical - матрицы строки × элементы (float64).
+    С хим, равное нулю или NULL, хранится как NaN: такая проба в статистику
+    не входит, а в таблице вместо С хим, ΔC и ΔC/С хим стоят прочерки.
+
+    Строки можно исключать из статистики и возвращать обратно (active).
+    Для каждого элемента и величины (С расч, С хим, ΔC, ΔC/С хим) ведутся
+    количество, сумма и сумма квадратов отклонений от сдвига (среднего
+    по первой загруженной части), поэтому исключение строки - это вычитание её
+    вклада, а не пересчёт по всем строкам. Сдвиг сохраняет точность СКО.
+    Данные, загружаемые частями, дописываются через extend.
+    """
+
+    def __init__(self, meas_dt, calculated, chemical):
+        self.meas_dt = np.asarray(meas_dt)
+        self.calculated = np.asarray(calculated, dtype=np.float64)
+        self.chemical = np.asarray(chemical, dtype=np.float64)
+        self.active = np.ones(len(self.meas_dt), dtype=bool)
+
+        # Сдвиг - среднее по всем строкам с С хим, величины × элементы
+        values, valid = self._values(slice(None))
+        count = valid.sum(axis=0)
+        self._shift = np.divide(values.sum(axis=1), count, out=np.zeros(values.shape[::2]), where=count > 0)
+        self._count = np.zeros(self.element_count, dtype=np.int64)
+        self._sum = np.zeros_like(self._shift)
+        self._sumsq = np.zeros_like(self._shift)
+        self._accumulate(slice(None), 1)
+
+    @classmethod
+    def from_columnar(cls, result, calculated: dict, element_count: int = ELEMENT_COUNT):
+        """
+        Строит данные из выборки PR_MEAS (ColumnarResult) и рассчитанных концентраций
+        {номер элемента: массив по строкам}; элементы без уравнения - нули.
+        """
+        row_count = len(result)
+        calc = np.zeros((row_count, element_count))
+        for element_num, values in calculated.items():
+            if 1 <= element_num <= element_count:
+                calc[:, element_num - 1] = values
+
+        chem = np.full((row_count, element_count), np.nan)
+        for i in range(element_count):
+            column = f"c_chem_{i + 1:02d}"
+            if column in result:
+                chem[:, i] = result.filled(column, np.nan)
+        chem[chem == 0] = np.nan
+
+        meas_dt = result["meas_dt"] if "meas_dt" in result else np.full(row_count, None, dtype=object)
+        return cls(meas_dt, calc, chem)
+
+    def __len__(self):
+        return len(self.meas_dt)
+
+    @property
+    def element_count(self) -> int:
+        return self.calculated.shape[1]
+
+    @property
+    def delta(self) -> np.ndarray:
+        """ΔC = С расч - С хим (NaN - нет С хим)"""
+        return self.calculated - self.chemical
+
+    @property
+    def relative(self) -> np.ndarray:
+        """ΔC / С хим, % (NaN - нет С хим)"""
+        return self.delta / self.chemical * 100.0
+
+    @property
+    def active_count(self) -> int:
+        """Количество строк, входящих в статистику"""
+        return int(np.count_nonzero(self.active))
+
+    def _values(self, rows):
+        """
+        Величины С расч, С хим, ΔC, ΔC/С хим строк rows: массив 4 × строки × элементы
+        (нули там, где нет С хим) и маска строк с С хим.
+        """
+        calculated = self.calculated[rows]
+        chemical = self.chemical[rows]
+        valid = ~np.isnan(chemical)
+        delta = calculated - chemical
+        values = np.stack([calculated, chemical, delta, delta / chemical * 100.0])
+        values[:, ~valid] = 0.0
+        return values, valid
+
+    def _accumulate(self, rows, sign: int):
+        """Добавляет (sign = 1) или вычитает (sign = -1) вклад строк rows в суммы"""
+        values, valid = self._values(rows)
+        centered = (values - self._shift[:, None, :]) * valid
+        self._count += sign * valid.sum(axis=0)
+        self._sum += sign * centered.sum(axis=1)
+        self._sumsq += sign * (centered ** 2).sum(axis=1)
+
+    def extend(self, other: "ReportData"):
+        """
+        Дописывает в конец строки other (все - активные) и добавляет их вклад в суммы.
+
+        Сдвиг сохраняется прежним; для элементов, по которым в суммах ещё нет
+        ни одной пробы, он берётся из other.
+        """
+        if other.element_count != self.element_count:
+            raise ValueError("Различается число элементов в данных отчёта")
+        start = len(self)
+        empty = self._count == 0
+        self._shift[:, empty] = other._shift[:, empty]
+        self._sum[:, empty] = 0.0
+        self._sumsq[:, empty] = 0.0
+
+        self.meas_dt = np.concatenate([self.meas_dt, other.meas_dt])
+        self.calculated = np.concatenate([self.calculated, other.calculated])
+        self.chemical = np.concatenate([self.chemical, other.chemical])
+        self.active = np.concatenate([self.active, np.ones(len(other), dtype=bool)])
+        self._accumulate(slice(start, None), 1)
+
+    def exclude(self, rows) -> int:
+        """Исключает строки rows из статистики; возвращает число исключённых"""
+        rows = np.unique(np.asarray(rows, dtype=np.intp))
+        rows = rows[self.active[rows]]
+        if len(rows):
+            self._accumulate(rows, -1)
+            self.active[rows] = False
+        return len(rows)
+
+    def include(self, rows=None) -> int:
+        """Возвращает строки rows (по умолчанию - все исключённые); возвращает их число"""
+        rows = np.flatnonzero(~self.active) if rows is None else np.unique(np.asarray(rows, dtype=np.intp))
+        rows = rows[~self.active[rows]]
+        if len(rows):
+            self._accumulate(rows, 1)
+            self.active[rows] = True
+        return len(rows)
+
+    def statistics(self) -> list:
+        """
+        Статистика по каждому элементу (только активные пробы с С хим).
+
+        Возвращает list[dict] с ключами count, mean_calc, mean_chem, mean_delta,
+        mean_relative, std_delta, std_relative (выборочное СКО); недоступные
+        значения - NaN.
+        """
+        count = self._count
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.where(count > 0, self._shift + self._sum / count, np.nan)
+            variance = (self._sumsq - self._sum ** 2 / count) / (count - 1)
+        std = np.where(count > 1, np.sqrt(np.maximum(variance, 0.0)), np.nan)
+
+        return [
+            {
+                "count": int(count[i]),
+                "mean_calc": float(mean[0, i]),
+                "mean_chem": float(mean[1, i]),
+                "mean_delta": float(mean[2, i]),
+                "mean_relative": float(mean[3, i]),
+                "std_delta": float(std[2, i]),
+                "std_relative": float(std[3, i]),
+            }
+            for i in range(self.element_count)
+        ]
@@ -0,0 +1,93 @@
+# utils/robust_regression.py
+import numpy as np
+
+# Константы настройки: 95% эффективности при нормальных ошибках
+HUBER_C = 1.345
+TUKEY_C = 4.685
+
+METHODS = ("huber", "tukey")
+
+
+def robust_weights(u, method: str) -> np.ndarray:
+    """Веса проб по нормированным остаткам u = r / s"""
+    a = np.abs(u)
+    if method == "huber":
+        return np.minimum(1.0, HUBER_C / np.maximum(a, 1e-300))
+    if method == "tukey":
+        return np.where(a < TUKEY_C, (1.0 - (a / TUKEY_C) ** 2) ** 2, 0.0)
+    raise ValueError(f"Неизвестный метод робастной регрессии: {method}")
+
+
+def _mad_scale(residuals) -> float:
+    """Робастная оценка σ остатков: 1.4826 · медиана |r - медиана r|"""
+    scale = 1.4826 * float(np.median(np.abs(residuals - np.median(residuals))))
+    if scale <= 0:
+        # Больше половины остатков одинаковы - берём средний модуль
+        scale = 1.2533 * float(np.mean(np.abs(residuals)))
+    return scale
+
+
+def _weighted_lstsq(X, y, weights):
+    sw = np.sqrt(weights)
+    return np.linalg.lstsq(X * sw[:, None], y * sw, rcond=None)[0]
+
+
+def irls(X, y, method="huber", max_iter=50, tol=1e-8) -> dict:
+    """
+    Робастная регрессия итеративно перевзвешенным МНК.
+
+    X - матрица с первым столбцом единиц, method - "huber" или "tukey".
+    Масштаб остатков на каждой итерации - MAD. Бисквадрат Тьюки не выпуклый,
+    поэтому стартует с решения Хьюбера, а не МНК.
+
+    Возвращает dict: coefficients, weights, scale, iterations, converged,
+    standard_errors, t_stats, dof (ошибки - по взвешенному МНК с итоговыми весами).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n, p = X.shape
+
+    if method == "tukey":
+        start = irls(X, y, "huber", max_iter, tol)
+        beta, iterations = start["coefficients"], start["iterations"]
+    else:
+        beta, iterations = np.linalg.lstsq(X, y, rcond=None)[0], 0
+
+    weights = np.ones(n)
+    scale = 0.0
+    converged = False
+    for _ in range(max_iter):
+        iterations += 1
+        residuals = y - X @ beta
+        scale = _mad_scale(residuals)
+        if scale <= 0:
+            # Точная подгонка - перевзвешивать нечего
+            converged = True
+            break
+
+        weights = robust_weights(residuals / scale, method)
+        if not np.any(weights > 0):
+            break
+        beta_new = _weighted_lstsq(X, y, weights)
+        step = np.max(np.abs(beta_new - beta))
+        beta = beta_new
+        if step <= tol * (np.max(np.abs(beta)) + tol):
+            converged = True
+            break
+
+    residuals = y - X @ beta
+    dof = max(n - p, 1)
+    sigma2 = float(np.sum(weights * residuals ** 2)) / dof
+    covariance = np.linalg.pinv((X * weights[:, None]).T @ X) * sigma2
+    standard_errors = np.sqrt(np.maximum(np.diag(covariance), 0.0))
+    t_stats = np.divide(beta, standard_errors, out=np.zeros_like(beta), where=standard_errors > 0)
+    return {
+        "coefficients": beta,
+        "weights": weights,
+        "scale": scale,
+        "iterations": iterations,
+        "converged": converged,
+        "standard_errors": standard_errors,
+        "t_stats": t_stats,
+        "dof": dof,
+    }
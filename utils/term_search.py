@@ -0,0 +1,468 @@
+# utils/term_search.py
+import itertools
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+# Методы подбора и критерии ранжирования моделей
+METHODS = ("forward", "backward", "exhaustive")
+CRITERIA = ("rmse", "adj_r2", "aic", "bic", "press")
+
+_SINGULAR_DET = 1e-10  # порог определителя нормированной матрицы (вырожденный набор членов)
+_BLOCK_SIZE = 50000  # подмножеств в одной пачке решения
+_SERIAL_LIMIT = 50000  # меньше этого числа подмножеств перебор идёт без пула процессов
+
+
+class CrossProducts:
+    """
+    Центрированные перекрёстные произведения членов-кандидатов и отклика.
+
+    gram = TcᵀTc, xty = Tcᵀyc, syy = ycᵀyc (Tc, yc - столбцы членов и C_хим
+    за вычетом средних). Модель со свободным членом по любому набору из k
+    членов сводится к системе k×k и не зависит от числа проб.
+    """
+
+    def __init__(self, means, gram, xty, y_mean, syy, n):
+        self.means = means
+        self.gram = gram
+        self.xty = xty
+        self.y_mean = y_mean
+        self.syy = syy
+        self.n = n
+
+    @classmethod
+    def from_matrix(cls, matrix, y):
+        """Строит произведения по матрице членов (строки × члены) и вектору отклика"""
+        y = np.asarray(y, dtype=np.float64)
+        means = matrix.mean(axis=0)
+        y_mean = float(y.mean()) if len(y) else 0.0
+        centered = matrix - means
+        y_centered = y - y_mean
+        return cls(means, centered.T @ centered, centered.T @ y_centered,
+                   y_mean, float(y_centered @ y_centered), len(y))
+
+    @property
+    def size(self) -> int:
+        return len(self.xty)
+
+    def subset(self, indices):
+        """Произведения только для указанных членов (нумерация - по порядку indices)"""
+        indices = np.asarray(indices, dtype=np.intp)
+        return CrossProducts(self.means[indices], self.gram[np.ix_(indices, indices)],
+                             self.xty[indices], self.y_mean, self.syy, self.n)
+
+    def solve(self, combos):
+        """
+        Коэффициенты при членах для пачки наборов (массив N×k индексов).
+        Возвращает (коэффициенты N×k, маска невырожденных наборов).
+        """
+        combos = np.asarray(combos, dtype=np.intp)
+        count, k = combos.shape
+        beta = np.zeros((count, k))
+        if k == 0:
+            return beta, np.ones(count, dtype=bool)
+
+        gram = self.gram[combos[:, :, None], combos[:, None, :]]
+        xty = self.xty[combos]
+
+        # Нормировка к единичной диагонали: определитель служит мерой вырожденности
+        scale = np.sqrt(np.einsum("nii->ni", gram))
+        valid = (scale > 0).all(axis=1)
+        scale = np.where(scale > 0, scale, 1.0)
+        normalized = gram / (scale[:, :, None] * scale[:, None, :])
+        valid &= np.linalg.det(normalized) > _SINGULAR_DET
+
+        if valid.any():
+            z = np.linalg.solve(normalized[valid], (xty[valid] / scale[valid])[..., None])[..., 0]
+            beta[valid] = z / scale[valid]
+        return beta, valid
+
+    def fit(self, indices):
+        """
+        Модель со свободным членом по набору indices - только из блока k×k.
+
+        Возвращает dict: coefficients (A0, затем при членах), standard_errors,
+        t_stats, rss, dof. None - набор вырожден или проб не больше,
+        чем коэффициентов.
+        """
+        indices = np.asarray(indices, dtype=np.intp)
+        k = len(indices)
+        dof = self.n - k - 1
+        if dof <= 0:
+            return None
+
+        beta, valid = self.solve(indices[None, :])
+        if not valid[0]:
+            return None
+        beta = beta[0]
+
+        means = self.means[indices]
+        rss = max(self.syy - float(self.xty[indices] @ beta), 0.0)
+        sigma2 = rss / dof
+
+        # (TcᵀTc)⁻¹ через нормированный блок; дисперсия A0 = σ²(1/n + m̄ᵀ(TcᵀTc)⁻¹m̄)
+        gram = self.gram[np.ix_(indices, indices)]
+        scale = np.sqrt(np.diag(gram))
+        inverse = np.linalg.inv(gram / np.outer(scale, scale)) / np.outer(scale, scale)
+        variances = np.concatenate(([1.0 / self.n + means @ inverse @ means], np.diag(inverse))) * sigma2
+
+        coefficients = np.concatenate(([self.y_mean - float(means @ beta)], beta))
+        standard_errors = np.sqrt(np.maximum(variances, 0.0))
+        t_stats = np.divide(coefficients, standard_errors,
+                            out=np.zeros_like(coefficients), where=standard_errors > 0)
+        return {
+            "coefficients": coefficients,
+            "standard_errors": standard_errors,
+            "t_stats": t_stats,
+            "rss": rss,
+            "dof": dof,
+        }
+
+    def rss(self, combos) -> np.ndarray:
+        """Остаточные суммы квадратов для пачки наборов; inf - вырожденный набор"""
+        combos = np.asarray(combos, dtype=np.intp)
+        if combos.shape[1] == 0:
+            return np.full(len(combos), self.syy)
+        beta, valid = self.solve(combos)
+        result = self.syy - np.einsum("nk,nk->n", self.xty[combos], beta)
+        result = np.maximum(result, 0.0)
+        result[~valid] = np.inf
+        return result
+
+
+def fit_metrics(rss, k, n, syy) -> dict:
+    """RMSE, R², скорректированный R², AIC и BIC для моделей из k членов и свободного члена"""
+    rss = np.asarray(rss, dtype=np.float64)
+    params = k + 1
+    dof = n - params
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if dof > 0:
+            rmse = np.sqrt(rss / dof)
+        else:
+            rmse = np.full_like(rss, np.inf)
+        r2 = 1.0 - rss / syy if syy > 0 else np.zeros_like(rss)
+        adj_r2 = 1.0 - (1.0 - r2) * (n - 1) / dof if dof > 0 else np.full_like(rss, -np.inf)
+        log_likelihood_term = n * np.log(np.maximum(rss, 1e-300) / n)
+    return {
+        "rmse": rmse,
+        "r2": r2,
+        "adj_r2": adj_r2,
+        "aic": log_likelihood_term + 2 * params,
+        "bic": log_likelihood_term + params * math.log(max(n, 1)),
+    }
+
+
+def press_statistic(X, y):
+    """
+    PRESS - сумма квадратов ошибок прогноза с исключением одной пробы,
+    через диагональ матрицы проекции H = Q·Qᵀ (X = QR), без n переобучений.
+    """
+    q, r = np.linalg.qr(X)
+    beta = np.linalg.lstsq(r, q.T @ y, rcond=None)[0]
+    residuals = y - X @ beta
+    leverage = np.einsum("ij,ij->i", q, q)
+    if np.any(leverage >= 1.0 - 1e-12):
+        return math.inf
+    return float(np.sum((residuals / (1.0 - leverage)) ** 2))
+
+
+def _criterion_scores(metrics, criterion):
+    """Оценка для ранжирования: меньше - лучше"""
+    if criterion == "adj_r2":
+        return -metrics["adj_r2"]
+    return metrics[criterion]
+
+
+def _design_matrix(matrix, terms):
+    return np.column_stack([np.ones(matrix.shape[0])] + [matrix[:, t] for t in terms])
+
+
+def _press_rmse(matrix, y, terms):
+    return math.sqrt(press_statistic(_design_matrix(matrix, terms), y) / len(y))
+
+
+def _distinct_candidates(matrix, cross):
+    """Члены с ненулевой дисперсией, без повторяющихся столбцов"""
+    seen = set()
+    candidates = []
+    for index in range(matrix.shape[1]):
+        if cross.gram[index, index] <= 0:
+            continue
+        key = hash(matrix[:, index].tobytes())
+        if key in seen:
+            continue
+        seen.add(key)
+        candidates.append(index)
+    return candidates
+
+
+class _Search:
+    """Состояние одного подбора: произведения, критерий, прогресс и отмена"""
+
+    def __init__(self, matrix, y, criterion, max_terms, progress, check_cancelled):
+        self.matrix = matrix
+        self.y = np.asarray(y, dtype=np.float64)
+        self.criterion = criterion
+        self.max_terms = max_terms
+        self.progress = progress
+        self.check_cancelled = check_cancelled
+        self.cross = CrossProducts.from_matrix(matrix, self.y)
+        self.candidates = _distinct_candidates(matrix, self.cross)
+
+    def tick(self, done, total):
+        if self.check_cancelled:
+            self.check_cancelled()
+        if self.progress:
+            self.progress(done, total)
+
+    def best_extension(self, selected, remaining, criterion=None):
+        """Лучший член для добавления к selected (или None)"""
+        criterion = criterion or self.criterion
+        if not remaining:
+            return None
+        combos = np.array([selected + [c] for c in remaining], dtype=np.intp)
+        rss = self.cross.rss(combos)
+        metrics = fit_metrics(rss, len(selected) + 1, self.cross.n, self.cross.syy)
+
+        if criterion == "press":
+            # PRESS считается по строкам - только для лучших по RSS
+            order = [i for i in np.argsort(rss)[:10] if np.isfinite(rss[i])]
+            scores = {i: _press_rmse(self.matrix, self.y, combos[i]) for i in order}
+            best = min(scores, key=scores.get, default=None)
+            return None if best is None or not math.isfinite(scores[best]) else remaining[best]
+
+        scores = _criterion_scores(metrics, criterion)
+        best = int(np.argmin(scores))
+        return remaining[best] if np.isfinite(scores[best]) else None
+
+    def forward_path(self, steps, criterion=None):
+        """Пошаговое включение: последовательность выбранных членов"""
+        selected = []
+        for step in range(steps):
+            remaining = [c for c in self.candidates if c not in selected]
+            best = self.best_extension(selected, remaining, criterion)
+            if best is None:
+                break
+            selected.append(best)
+            yield list(selected)
+
+    def forward(self):
+        models = []
+        for step, selected in enumerate(self.forward_path(self.max_terms), 1):
+            models.append(tuple(selected))
+            self.tick(step, self.max_terms)
+        return models
+
+    def backward(self):
+        """Последовательное исключение из набора, отобранного пошаговым включением"""
+        start_size = min(len(self.candidates), max(2 * self.max_terms, 12))
+        current = []
+        for current in self.forward_path(start_size, criterion="rmse"):
+            pass
+
+        models = []
+        total = max(len(current) - 1, 1)
+        if 0 < len(current) <= self.max_terms:
+            models.append(tuple(current))
+
+        step = 0
+        while len(current) > 1:
+            combos = np.array([[t for t in current if t != removed] for removed in current], dtype=np.intp)
+            rss = self.cross.rss(combos)
+            metrics = fit_metrics(rss, len(current) - 1, self.cross.n, self.cross.syy)
+            if self.criterion == "press":
+                scores = np.array([
+                    _press_rmse(self.matrix, self.y, combo) if np.isfinite(value) else np.inf
+                    for combo, value in zip(combos, rss)
+                ])
+            else:
+                scores = _criterion_scores(metrics, self.criterion)
+            best = int(np.argmin(scores))
+            if not np.isfinite(scores[best]):
+                break
+            current = [int(t) for t in combos[best]]
+            if len(current) <= self.max_terms:
+                models.append(tuple(current))
+            step += 1
+            self.tick(step, total)
+        return models
+
+    def exhaustive_pool(self, max_combinations):
+        """Члены для полного перебора; при большом числе кандидатов - предварительный отбор"""
+        def combinations_count(size):
+            return sum(math.comb(size, k) for k in range(1, self.max_terms + 1))
+
+        if combinations_count(len(self.candidates)) <= max_combinations:
+            return list(self.candidates)
+
+        size = len(self.candidates)
+        while size > self.max_terms and combinations_count(size) > max_combinations:
+            size -= 1
+
+        # Сначала - путь пошагового включения, затем - по модулю корреляции с C_хим
+        ranked = []
+        for selected in self.forward_path(min(size, 2 * self.max_terms), criterion="rmse"):
+            ranked = list(selected)
+        diagonal = np.diag(self.cross.gram)
+        correlation = np.abs(self.cross.xty) / np.sqrt(np.maximum(diagonal, 1e-300) * max(self.cross.syy, 1e-300))
+        for index in sorted(self.candidates, key=lambda c: -correlation[c]):
+            if len(ranked) >= size:
+                break
+            if index not in ranked:
+                ranked.append(index)
+        return ranked
+
+    def exhaustive(self, keep, max_combinations, processes):
+        pool = self.exhaustive_pool(max_combinations)
+        cross = self.cross.subset(pool)
+        tasks = [(k, first) for k in range(1, self.max_terms + 1) for first in range(len(pool) - k + 1)]
+        total_combinations = sum(math.comb(len(pool), k) for k in range(1, self.max_terms + 1))
+
+        found = []
+        if total_combinations <= _SERIAL_LIMIT:
+            for done, (k, first) in enumerate(tasks, 1):
+                found.append(_exhaustive_task(cross, k, first, keep))
+                self.tick(done, len(tasks))
+        else:
+            executor = _get_process_pool(processes)
+            futures = [executor.submit(_exhaustive_task, cross, k, first, keep) for k, first in tasks]
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    found.append(future.result())
+                    self.tick(done, len(tasks))
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        models = []
+        for combos, _ in found:
+            models.extend(tuple(pool[i] for i in combo) for combo in combos)
+        return models
+
+    def rank(self, models, top_n):
+        """Метрики и упорядочивание найденных моделей по критерию"""
+        unique = list(dict.fromkeys(tuple(sorted(m)) for m in models if m))
+        results = []
+        for k in sorted({len(m) for m in unique}):
+            group = [m for m in unique if len(m) == k]
+            rss = self.cross.rss(np.array(group, dtype=np.intp))
+            metrics = fit_metrics(rss, k, self.cross.n, self.cross.syy)
+            for i, terms in enumerate(group):
+                if not np.isfinite(rss[i]):
+                    continue
+                result = {name: float(values[i]) for name, values in metrics.items()}
+                result.update({"terms": terms, "rss": float(rss[i])})
+                results.append(result)
+
+        if self.criterion == "press":
+            # PRESS по строкам - для лучших по RMSE
+            results.sort(key=lambda r: r["rmse"])
+            results = results[:max(top_n * 5, top_n)]
+            for result in results:
+                result["press"] = _press_rmse(self.matrix, self.y, result["terms"])
+            results.sort(key=lambda r: r["press"])
+        else:
+            sign = -1 if self.criterion == "adj_r2" else 1
+            results.sort(key=lambda r: sign * r[self.criterion])
+
+        results = results[:top_n]
+        for result in results:
+            if "press" not in result:
+                result["press"] = _press_rmse(self.matrix, self.y, result["terms"])
+        return results
+
+
+def _exhaustive_task(cross, k, first, keep):
+    """
+    Перебор наборов из k членов с первым членом first (выполняется в процессе пула).
+    Возвращает лучшие keep наборов по RSS (при фиксированном k все критерии,
+    кроме PRESS, монотонны по RSS).
+    """
+    tails = itertools.combinations(range(first + 1, cross.size), k - 1)
+    best_combos = np.empty((0, k), dtype=np.intp)
+    best_rss = np.empty(0)
+
+    while True:
+        block = list(itertools.islice(tails, _BLOCK_SIZE))
+        if not block:
+            break
+        combos = np.empty((len(block), k), dtype=np.intp)
+        combos[:, 0] = first
+        if k > 1:
+            combos[:, 1:] = block
+        rss = cross.rss(combos)
+
+        best_combos = np.concatenate([best_combos, combos])
+        best_rss = np.concatenate([best_rss, rss])
+        if len(best_rss) > keep:
+            order = np.argpartition(best_rss, keep - 1)[:keep]
+            best_combos, best_rss = best_combos[order], best_rss[order]
+
+    finite = np.isfinite(best_rss)
+    return best_combos[finite].tolist(), best_rss[finite].tolist()
+
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool(processes=None):
+    """Общий пул процессов для перебора (создаётся при первом использовании)"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            workers = processes or max(1, (os.cpu_count() or 2) - 1)
+            # spawn: процессы не наследуют копию GUI и открытые соединения с БД
+            _process_pool = ProcessPoolExecutor(max_workers=workers,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        return _process_pool
+
+
+def shutdown_process_pool():
+    """Останавливает пул процессов (при закрытии приложения)"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+
+
+def search_terms(matrix, y, method="forward", criterion="rmse", max_terms=5, top_n=20,
+                 max_combinations=2_000_000, processes=None, progress=None, check_cancelled=None) -> list:
+    """
+    Автоматический подбор членов уравнения.
+
+    matrix - значения членов-кандидатов (строки × члены), y - C_хим.
+    method: "forward" - пошаговое включение, "backward" - последовательное
+    исключение, "exhaustive" - полный перебор наборов до max_terms членов
+    (при числе наборов больше max_combinations - по предварительно
+    отобранным членам, в пуле процессов).
+    criterion: "rmse", "adj_r2", "aic", "bic" или "press" (СКО прогноза
+    с исключением одной пробы).
+
+    Возвращает до top_n моделей, лучшие первыми: словари с индексами
+    столбцов "terms" и метриками rmse, r2, adj_r2, aic, bic, press, rss.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Неизвестный метод подбора: {method}")
+    if criterion not in CRITERIA:
+        raise ValueError(f"Неизвестный критерий: {criterion}")
+
+    matrix = np.asarray(matrix, dtype=np.float64)
+    search = _Search(matrix, y, criterion, max(1, min(int(max_terms), 5)), progress, check_cancelled)
+    if not search.candidates or search.cross.n <= 2:
+        return []
+
+    if method == "forward":
+        models = search.forward()
+    elif method == "backward":
+        models = search.backward()
+    else:
+        models = search.exhaustive(max(top_n * 5, 50), max_combinations, processes)
+
+    return search.rank(models, top_n)
@@ -59,7 +59,7 @@ class Cfg01Page(QWidget):
     def load_devices(self):
         """Загрузка списка приборов"""
         try:
-            res = self.db.fetch_one("SELECT ac_nmb FROM SET00")
+            res = self.db.reference.first("SET00", columns=["ac_nmb"])
             count = res['ac_nmb'] if res else 1
 
             self.ac_combo.clear()
@@ -81,7 +81,7 @@ class Cfg01Page(QWidget):
             ORDER BY meas_nmb
         """
         data = self.db.fetch_all(query, (ac_nmb,))
-        products = self.db.fetch_all("SELECT pr_nmb, pr_name FROM CFG02 ORDER BY pr_nmb")
+        products = self.db.reference.rows("CFG02", columns=["pr_nmb", "pr_name", "pr_desc"], order_by="pr_nmb")
 
         self.table.setRowCount(len(data))
 
@@ -56,7 +56,7 @@ class Cfg03Page(QWidget):
             # Берем данные, сортируем по sp_nmb (отборник слева)
             data = self.db.fetch_all("SELECT sp_nmb, pr_nmb FROM CFG03 ORDER BY sp_nmb")
             # Список всех доступных продуктов для комбобокса
-            products = self.db.fetch_all("SELECT pr_nmb, pr_name FROM CFG02 ORDER BY pr_nmb")
+            products = self.db.reference.rows("CFG02", columns=["pr_nmb", "pr_name", "pr_desc"], order_by="pr_nmb")
 
             self.table.setRowCount(len(data))
 
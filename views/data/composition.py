@@ -9,6 +9,7 @@ import math
 import json
 from pathlib import Path
 from utils.path_manager import get_config_path
+from utils.query_executor import BusyIndicator
 
 class TimeEdit15Min(QTimeEdit):
     """Кастомный QTimeEdit с шагом 15 минут"""
@@ -306,8 +307,21 @@ class CompositionPage(QWidget):
             else:
                 query += " ORDER BY timestamp"
 
-            rows = self.db.fetch_all(query, params)
+            self.busy_indicator.submit(
+                "Загрузка интенсивностей...",
+                self.db.fetch_all, query, params,
+                on_result=lambda rows: self._fill_intensity_table(rows, num_columns),
+                on_error=lambda message: self._on_load_failed("Ошибка загрузки данных интенсивностей", message)
+            )
 
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка загрузки данных интенсивностей: {str(e)}")
+            self.table.setRowCount(0)
+            self.original_data = {}
+
+    def _fill_intensity_table(self, rows, num_columns):
+        """Заполняет таблицу интенсивностей загруженными строками (в GUI-потоке)"""
+        try:
             if not rows:
                 QMessageBox.information(self, "Информация",
                                         "Данные интенсивностей не найдены. Проверьте параметры фильтрации.")
@@ -351,6 +365,11 @@ class CompositionPage(QWidget):
             self.table.setRowCount(0)
             self.original_data = {}
 
+    def _on_load_failed(self, title, message):
+        QMessageBox.critical(self, "Ошибка", f"{title}: {message}")
+        self.table.setRowCount(0)
+        self.original_data = {}
+
     def load_data(self):
         """Загрузка данных с автоматической проверкой конфигурации элементов"""
         if self.check_inten.isChecked():
@@ -417,8 +436,21 @@ class CompositionPage(QWidget):
             else:
                 query += " ORDER BY timestamp"
 
-            rows = self.db.fetch_all(query, params)
+            self.busy_indicator.submit(
+                "Загрузка данных...",
+                self.db.fetch_all, query, params,
+                on_result=self._fill_normal_table,
+                on_error=lambda message: self._on_load_failed("Ошибка загрузки данных (обычный режим)", message)
+            )
+
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка загрузки данных (обычный режим): {str(e)}")
+            self.table.setRowCount(0)
+            self.original_data = {}
 
+    def _fill_normal_table(self, rows):
+        """Заполняет таблицу концентраций загруженными строками (в GUI-потоке)"""
+        try:
             if not rows:
                 QMessageBox.information(self, "Информация",
                                         "Данные не найдены. Проверьте параметры фильтрации.")
@@ -542,6 +574,11 @@ class CompositionPage(QWidget):
                 QMessageBox.information(self, "Информация", "Нет изменений для сохранения")
                 return
 
+            # Группируем изменения по столбцу: один пакетный запрос на элемент
+            updates_by_element = {}
+            for update in updates:
+                updates_by_element.setdefault(update['element_num'], []).append(update)
+
             progress = QProgressDialog("Сохранение изменений...", "Отмена", 0, len(updates), self)
             progress.setWindowModality(Qt.WindowModal)
             progress.setMinimumDuration(0)
@@ -549,30 +586,28 @@ class CompositionPage(QWidget):
             failed_updates = []
             success_count = 0
 
-            for i, update in enumerate(updates):
-                progress.setValue(i)
+            for element_num, element_updates in updates_by_element.items():
+                progress.setValue(success_count + len(failed_updates))
                 if progress.wasCanceled():
                     break
 
                 query = f"""
                 UPDATE pr_meas
-                SET c_chem_{update['element_num']:02d} = ?
+                SET c_chem_{element_num:02d} = ?
                 WHERE id = ?
                 """
-                params = [update['value'], update['id']]
+                param_rows = [[update['value'], update['id']] for update in element_updates]
 
                 try:
-                    self.db.execute(query, params)
+                    self.db.execute_many(query, param_rows)
 
-                    if self.verify_update_in_db(update['id'], update):
+                    for update in element_updates:
                         self.original_data[(update['row'], update['col'])] = update['value']
-                        success_count += 1
-                    else:
-                        failed_updates.append(update['id'])
+                    success_count += len(element_updates)
 
                 except Exception as e:
-                    failed_updates.append(update['id'])
-                    print(f"Ошибка при обновлении ID {update['id']}: {str(e)}")
+                    failed_updates.extend(update['id'] for update in element_updates)
+                    print(f"Ошибка при обновлении c_chem_{element_num:02d}: {str(e)}")
 
             progress.setValue(len(updates))
 
@@ -580,38 +615,13 @@ class CompositionPage(QWidget):
             if success_count > 0:
                 message.append(f"Успешно обновлено: {success_count}")
             if failed_updates:
-                message.append(
-                    f"Проблемы с ID: {', '.join(map(str, failed_updates))} (но проверьте БД - возможно обновление прошло)")
+                message.append(f"Не сохранены ID: {', '.join(map(str, failed_updates))}")
 
             QMessageBox.information(self, "Результат сохранения", "\n".join(message))
 
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка при сохранении: {str(e)}")
 
-    def verify_update_in_db(self, record_id: int, update_data: dict) -> bool:
-        """Проверяет, что данные были успешно обновлены в БД"""
-        try:
-            query = f"""
-            SELECT c_chem_{update_data['element_num']:02d}
-            FROM pr_meas
-            WHERE id = ?
-            """
-            result = self.db.fetch_one(query, [record_id])
-
-            if not result:
-                return False
-
-            if isinstance(result, dict):
-                db_value = result[f'c_chem_{update_data["element_num"]:02d}']
-            else:
-                db_value = result[0] if isinstance(result, (list, tuple)) else result
-
-            return math.isclose(float(db_value), update_data['value'], rel_tol=1e-5)
-
-        except Exception as e:
-            print(f"Ошибка при проверке обновления ID {record_id}: {str(e)}")
-            return False
-
     def force_reload_data(self):
         """Принудительная перезагрузка данных"""
         try:
@@ -715,6 +725,10 @@ class CompositionPage(QWidget):
         btn_layout.addWidget(self.save_btn)
         main_layout.addLayout(btn_layout)
 
+        # Индикатор фоновой загрузки
+        self.busy_indicator = BusyIndicator()
+        main_layout.addWidget(self.busy_indicator)
+
         # Таблица
         self.table = self.init_table()
         self.configure_table_normal()
@@ -1,19 +1,33 @@
 # views/data/regression.py
+import itertools
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QFormLayout,
     QPushButton, QLabel, QTableWidget, QTableWidgetItem,
     QComboBox, QLineEdit, QGroupBox, QSplitter, QTabWidget,
-    QMessageBox
+    QMessageBox, QSpinBox, QAbstractItemView, QDialog, QDialogButtonBox,
+    QRadioButton
 )
 from PySide6.QtCore import Qt
 from database.db import Database
+from database.columnar import ColumnarResult
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from views.data.sample_dialog import SampleDialog
 from utils.path_manager import get_config_path
+from utils.query_executor import BusyIndicator, current_token
+from utils.term_search import CrossProducts, search_terms
+from utils.robust_regression import irls
+from utils.cross_validation import (
+    KFOLD_FOLDS, TIME_FOLDS, cross_validation, influence_diagnostics, kfold_assignment,
+    time_block_assignment
+)
+from utils.feature_engine import (
+    CompiledEquation, FeatureEngine, TermMatrix, TermMatrixCache, feature_columns, load_interaction_terms
+)
 
 class RegressionPage(QWidget):
     def __init__(self, db: Database):
@@ -22,6 +36,15 @@ class RegressionPage(QWidget):
         self.current_sample = []
         self.current_element = None
         self.current_meas_type = 0  # 0 - по интенсивностям, 1 - по концентрациям
+        self._feature_engine = None  # столбцы текущей выборки для расчёта членов уравнения
+        self._term_matrix = None  # все члены-кандидаты текущей выборки
+        self._term_cache = TermMatrixCache()
+        self._cross_products = None  # (матрица членов, элемент, y, CrossProducts) текущей выборки
+        self._cv_folds = None  # (выборка, блоки k-fold, блоки по времени)
+        self._sample_weights = None  # веса проб робастной регрессии (None - обычный МНК)
+        self._influence = None  # диагностика влияния проб (influence_diagnostics)
+        self._pr_set_row = None  # активная градуировка PR_SET загруженного элемента
+        self._coefficients = None  # A0..A5 последнего расчёта (без округления таблицы)
         self.init_ui()
 
         # Подключаем обработчики
@@ -29,6 +52,7 @@ class RegressionPage(QWidget):
         self.combo_meas_type.currentIndexChanged.connect(self.load_data)
         for combo in self.combo_equation_terms:
             combo.currentIndexChanged.connect(self.perform_regression)
+        self.combo_fit_method.currentIndexChanged.connect(self.perform_regression)
 
 
         # Загружаем данные при открытии страницы
@@ -44,6 +68,10 @@ class RegressionPage(QWidget):
         title.setAlignment(Qt.AlignCenter)
         layout.addWidget(title)
 
+        # Индикатор фоновой загрузки
+        self.busy_indicator = BusyIndicator()
+        layout.addWidget(self.busy_indicator)
+
         # === Основной сплиттер (вертикальный) ===
         main_splitter = QSplitter(Qt.Vertical)
 
@@ -60,14 +88,17 @@ class RegressionPage(QWidget):
         self.btn_change_selection = QPushButton("Изменить выборку")
         self.btn_save_equation = QPushButton("Сохранить уравнение")
         self.btn_load_data = QPushButton("Выгрузка данных")
+        self.btn_exclude_flagged = QPushButton("Исключить влиятельные")
 
         self.btn_change_selection.clicked.connect(self.open_sample_dialog)
         self.btn_save_equation.clicked.connect(self.save_equation)
         self.btn_load_data.clicked.connect(self.load_data)
+        self.btn_exclude_flagged.clicked.connect(self.exclude_flagged_samples)
 
         btn_layout.addWidget(self.btn_change_selection)
         btn_layout.addWidget(self.btn_save_equation)
         btn_layout.addWidget(self.btn_load_data)
+        btn_layout.addWidget(self.btn_exclude_flagged)
         btn_layout.addStretch()
         left_top_layout.addLayout(btn_layout)
 
@@ -106,13 +137,15 @@ class RegressionPage(QWidget):
         # === Таблица характеристик уравнения ===
         left_top_layout.addWidget(QLabel("Характеристики уравнения:"))
         self.stats_table = QTableWidget()
-        self.stats_table.setRowCount(6)
+        self.stats_table.setRowCount(10)
         self.stats_table.setColumnCount(2)
         self.stats_table.setHorizontalHeaderLabels(["Параметр", "Значение"])
         self.stats_table.verticalHeader().setVisible(False)
 
         stats_labels = [
-            "СКО σ", "Отн. СКО", "Смин", "Смакс", "Ссред", "Корреляция R²"
+            "СКО σ", "Отн. СКО", "Смин", "Смакс", "Ссред", "Корреляция R²",
+            "СКО скольз. контроля (LOO)", "R² прогноза (LOO)",
+            f"СКО {KFOLD_FOLDS}-блочного контроля", f"СКО контроля по времени ({TIME_FOLDS} блоков)"
         ]
 
         for row, label in enumerate(stats_labels):
@@ -162,6 +195,14 @@ class RegressionPage(QWidget):
         combo_layout.addWidget(QLabel("Пробы:"))
         combo_layout.addWidget(self.combo_meas_type)
 
+        # Метод подгонки: МНК или робастная регрессия
+        self.combo_fit_method = QComboBox()
+        for text, method in [("МНК", "ols"), ("Робастный (Хьюбер)", "huber"),
+                             ("Робастный (Тьюки)", "tukey")]:
+            self.combo_fit_method.addItem(text, method)
+        combo_layout.addWidget(QLabel("Метод:"))
+        combo_layout.addWidget(self.combo_fit_method)
+
         # 5 комбо-боксов для членов уравнения
         self.combo_equation_terms = []
         combo_layout.addWidget(QLabel("Члены уравнения:"))
@@ -173,15 +214,24 @@ class RegressionPage(QWidget):
         combo_layout.addStretch()
         bottom_layout.addLayout(combo_layout)
 
+        bottom_tabs = QTabWidget()
+
         # Таблица выборки
-        bottom_layout.addWidget(QLabel("Таблица выборки:"))
         self.data_table = QTableWidget()
-        self.data_table.setColumnCount(11)
+        self.data_table.setColumnCount(16)
         self.data_table.setHorizontalHeaderLabels([
             "Продукт", "Дата/Время", "X1", "X2", "X3", "X4", "X5",
-            "C_хим", "C_расч", "ΔC", "δC=|ΔC/C_хим|"
+            "C_хим", "C_расч", "ΔC", "δC=|ΔC/C_хим|", "Вес",
+            "h", "D Кука", "DFFITS", "t стьюд."
         ])
-        bottom_layout.addWidget(self.data_table)
+        bottom_tabs.addTab(self.data_table, "Таблица выборки")
+
+        # Автоподбор членов уравнения
+        bottom_tabs.addTab(self._init_search_tab(), "Автоподбор членов")
+
+        # Пересчёт всех элементов продукта
+        bottom_tabs.addTab(self._init_batch_tab(), "Пакетный пересчёт")
+        bottom_layout.addWidget(bottom_tabs)
 
         bottom_widget.setLayout(bottom_layout)
 
@@ -196,6 +246,85 @@ class RegressionPage(QWidget):
         # Загружаем начальные данные
         self.ini_load_elements()
 
+    def _init_search_tab(self):
+        """Вкладка автоматического подбора членов уравнения"""
+        search_widget = QWidget()
+        search_layout = QVBoxLayout()
+
+        controls_layout = QHBoxLayout()
+        self.combo_search_method = QComboBox()
+        for text, method in [("Пошаговое включение", "forward"),
+                             ("Последовательное исключение", "backward"),
+                             ("Полный перебор", "exhaustive")]:
+            self.combo_search_method.addItem(text, method)
+        controls_layout.addWidget(QLabel("Метод:"))
+        controls_layout.addWidget(self.combo_search_method)
+
+        self.combo_search_criterion = QComboBox()
+        for text, criterion in [("СКО σ", "rmse"), ("Скорр. R²", "adj_r2"), ("AIC", "aic"),
+                                ("BIC", "bic"), ("СКО скользящего контроля", "press")]:
+            self.combo_search_criterion.addItem(text, criterion)
+        controls_layout.addWidget(QLabel("Критерий:"))
+        controls_layout.addWidget(self.combo_search_criterion)
+
+        self.spin_search_terms = QSpinBox()
+        self.spin_search_terms.setRange(1, 5)
+        self.spin_search_terms.setValue(5)
+        controls_layout.addWidget(QLabel("Членов не более:"))
+        controls_layout.addWidget(self.spin_search_terms)
+
+        self.btn_search_terms = QPushButton("Подобрать")
+        self.btn_search_terms.clicked.connect(self.run_term_search)
+        self.btn_apply_search = QPushButton("Применить")
+        self.btn_apply_search.clicked.connect(self.apply_search_result)
+        controls_layout.addWidget(self.btn_search_terms)
+        controls_layout.addWidget(self.btn_apply_search)
+        controls_layout.addStretch()
+        search_layout.addLayout(controls_layout)
+
+        self.search_table = QTableWidget()
+        self.search_table.setColumnCount(8)
+        self.search_table.setHorizontalHeaderLabels([
+            "№", "Члены уравнения", "СКО σ", "R²", "Скорр. R²", "AIC", "BIC", "СКО скольз. контроля"
+        ])
+        self.search_table.verticalHeader().setVisible(False)
+        self.search_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.search_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.search_table.doubleClicked.connect(self.apply_search_result)
+        search_layout.addWidget(self.search_table)
+
+        self._search_results = []
+        search_widget.setLayout(search_layout)
+        return search_widget
+
+    def _init_batch_tab(self):
+        """Вкладка пакетного пересчёта уравнений всех элементов продукта"""
+        batch_widget = QWidget()
+        batch_layout = QVBoxLayout()
+
+        controls_layout = QHBoxLayout()
+        self.btn_batch_regression = QPushButton("Пересчитать все элементы")
+        self.btn_batch_regression.clicked.connect(self.run_batch_regression)
+        controls_layout.addWidget(self.btn_batch_regression)
+        controls_layout.addWidget(QLabel("Члены уравнений - из активных градуировок PR_SET"))
+        controls_layout.addStretch()
+        batch_layout.addLayout(controls_layout)
+
+        self.batch_table = QTableWidget()
+        self.batch_table.setColumnCount(13)
+        self.batch_table.setHorizontalHeaderLabels([
+            "Элемент", "Тип", "Проб", "Члены уравнения", "A0", "A1", "A2", "A3", "A4", "A5",
+            "СКО σ", "R²", "СКО скольз. контроля"
+        ])
+        self.batch_table.verticalHeader().setVisible(False)
+        self.batch_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.batch_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        batch_layout.addWidget(self.batch_table)
+
+        self._batch_results = []
+        batch_widget.setLayout(batch_layout)
+        return batch_widget
+
     def ini_load_elements(self):
         """Загрузка элементов из JSON файла"""
         try:
@@ -231,7 +360,7 @@ class RegressionPage(QWidget):
                 significance_item.setText("0.0")
 
         # Сбрасываем статистику
-        for i in range(6):
+        for i in range(self.stats_table.rowCount()):
             item = self.stats_table.item(i, 1)
             if item:
                 item.setText("0.0")
@@ -254,21 +383,8 @@ class RegressionPage(QWidget):
 
         try:
             # 1. Загружаем параметры выборки
-            sample_path = get_config_path() / "sample" / "s_regress.json"
-            if not os.path.exists(sample_path):
-                QMessageBox.warning(self, "Ошибка", "Файл выборки не найден: config/sample/s_regress.json")
-                return
-
-            with open(sample_path, "r", encoding="utf-8") as f:
-                sample_config = json.load(f)
-
-            if not sample_config:
-                QMessageBox.warning(self, "Ошибка", "Выборка пуста. Откройте «Изменить выборку».")
-                return
-
-            pr_nmb = sample_config[0].get("product_id")
-            if pr_nmb is None:
-                QMessageBox.critical(self, "Ошибка", "В выборке отсутствует product_id")
+            sample_config, pr_nmb = self._read_sample_config()
+            if sample_config is None:
                 return
 
             # 2. Получаем el_nmb из UI
@@ -277,13 +393,71 @@ class RegressionPage(QWidget):
                 QMessageBox.warning(self, "Ошибка", "Сначала выберите элемент")
                 return
 
-            # 3. Запрашиваем PR_SET для получения meas_type
-            query_pr_set = """
-                SELECT *
-                FROM PR_SET
-                WHERE pr_nmb = ? AND el_nmb = ? AND active_model = 1
-            """
-            pr_set_row = self.db.fetch_one(query_pr_set, [pr_nmb, el_nmb])
+            # 3-5. PR_SET и PR_MEAS запрашиваются в фоновом потоке
+            meas_index = self.combo_meas_type.currentIndex()
+            self.busy_indicator.submit(
+                "Загрузка выборки...",
+                self._fetch_regression_data, sample_config, pr_nmb, el_nmb, meas_index,
+                on_result=self._on_regression_data_loaded,
+                on_error=lambda message: QMessageBox.critical(
+                    self, "Ошибка", f"load_data() провалился:\n{message}")
+            )
+
+        except Exception as e:
+            import traceback
+            print("❌ Ошибка в load_data():")
+            traceback.print_exc()
+            QMessageBox.critical(self, "Ошибка", f"load_data() провалился:\n{str(e)}")
+
+    def _read_sample_config(self):
+        """Условия выборки из s_regress.json и продукт; (None, None) - выборка не задана"""
+        sample_path = get_config_path() / "sample" / "s_regress.json"
+        if not os.path.exists(sample_path):
+            QMessageBox.warning(self, "Ошибка", "Файл выборки не найден: config/sample/s_regress.json")
+            return None, None
+
+        with open(sample_path, "r", encoding="utf-8") as f:
+            sample_config = json.load(f)
+
+        if not sample_config:
+            QMessageBox.warning(self, "Ошибка", "Выборка пуста. Откройте «Изменить выборку».")
+            return None, None
+
+        pr_nmb = sample_config[0].get("product_id")
+        if pr_nmb is None:
+            QMessageBox.critical(self, "Ошибка", "В выборке отсутствует product_id")
+            return None, None
+        return sample_config, pr_nmb
+
+    def _fetch_regression_data(self, sample_config, pr_nmb, el_nmb, meas_index):
+        """Запросы PR_SET и PR_MEAS (выполняется в фоновом потоке, к виджетам не обращается)"""
+        pr_set_row = self.db.reference.first(
+            "PR_SET", order_by="pr_nmb, mdl_nmb, el_nmb", pr_nmb=pr_nmb, el_nmb=el_nmb, active_model=1
+        )
+        if not pr_set_row:
+            return {"pr_nmb": pr_nmb, "el_nmb": el_nmb, "pr_set_row": None, "sample": None}
+
+        meas_type = pr_set_row["meas_type"]
+        sample = self._fetch_pr_meas_data(sample_config, el_nmb, meas_type, meas_index)
+
+        # Все члены-кандидаты вычисляются сразу, здесь же, вне GUI-потока
+        engine = FeatureEngine.from_columnar(sample, meas_type)
+        term_matrix = self._build_term_matrix(engine, meas_type, el_nmb)
+        return {"pr_nmb": pr_nmb, "el_nmb": el_nmb, "pr_set_row": pr_set_row, "sample": sample,
+                "engine": engine, "term_matrix": term_matrix}
+
+    def _build_term_matrix(self, engine, meas_type, el_nmb) -> TermMatrix:
+        """Матрица всех членов уравнения для выборки (из LRU-кэша, если выборка не изменилась)"""
+        key = (meas_type, el_nmb, engine.fingerprint())
+        return self._term_cache.get_or_build(
+            key, lambda: TermMatrix.build(engine, load_interaction_terms(meas_type, el_nmb))
+        )
+
+    def _on_regression_data_loaded(self, data):
+        """Заполняет страницу загруженной выборкой (в GUI-потоке)"""
+        try:
+            pr_nmb, el_nmb = data["pr_nmb"], data["el_nmb"]
+            pr_set_row = data["pr_set_row"]
             if not pr_set_row:
                 QMessageBox.critical(self, "Ошибка",
                                     f"Не найдена активная градуировка:\npr_nmb={pr_nmb}, el_nmb={el_nmb}")
@@ -291,13 +465,17 @@ class RegressionPage(QWidget):
 
             meas_type = pr_set_row["meas_type"]
             self.current_meas_type = meas_type
+            self._pr_set_row = pr_set_row
             print(f"✅ PR_SET: pr_nmb={pr_nmb}, el_nmb={el_nmb}, meas_type={meas_type}")
 
             # 4. Заполняем комбобоксы членами уравнения
             self._load_equation_terms(meas_type, el_nmb)
 
-            # 5. Выгружаем данные из PR_MEAS → raw_buffer
-            self.raw_buffer = self._fetch_pr_meas_data(sample_config, el_nmb, meas_type)
+            # 5. Данные из PR_MEAS → raw_buffer (ColumnarResult: массивы по столбцам)
+            self.raw_buffer = data["sample"]
+            self._feature_engine = data["engine"]
+            self._term_matrix = data["term_matrix"]
+            self._cross_products = None
             print(f"📥 Получено строк: {len(self.raw_buffer)}")
 
             if not self.raw_buffer:
@@ -325,28 +503,9 @@ class RegressionPage(QWidget):
     def _load_equation_terms(self, meas_type, el_nmb):
         """Заполняет 5 комбобоксов на основе meas_type и el_nmb"""
         try:
-            json_file = "lines_math_interactions.json" if meas_type == 0 else "math_interactions.json"
-            json_path = get_config_path() / json_file
-
-            if not os.path.exists(json_path):
-                print(f"❌ {json_path} не найден")
-                terms_list = []
-            else:
-                with open(json_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-
-                terms_list = []
-                if meas_type == 0:
-                    interactions = data.get("interactions", [])
-                    terms_list = [term["description"] for term in interactions
-                                if term.get("description") and term["description"].strip()]
-                else:
-                    for group in data.get("interactions", []):
-                        if group.get("element_original_number") == el_nmb:
-                            interactions = group.get("interactions", [])
-                            terms_list = [term["description"] for term in interactions
-                                        if term.get("description") and term["description"].strip()]
-                            break
+            terms_list = [term["description"] for term in load_interaction_terms(meas_type, el_nmb)]
+            if not terms_list:
+                print(f"❌ Члены уравнения не найдены: meas_type={meas_type}, el_nmb={el_nmb}")
 
             for combo in self.combo_equation_terms:
                 combo.blockSignals(True)  # Блокируем сигналы во время обновления
@@ -362,109 +521,90 @@ class RegressionPage(QWidget):
                 combo.clear()
                 combo.addItem("")
 
-    def _fetch_pr_meas_data(self, sample_config, el_nmb, meas_type):
-        """Возвращает list[dict] — буфер данных из PR_MEAS"""
-        all_rows = []
+    def _fetch_pr_meas_data(self, sample_config, el_nmb, meas_type, meas_index=0):
+        """
+        Возвращает выборку из PR_MEAS по столбцам (ColumnarResult).
+
+        Все окна выборки объединяются в один запрос: по каждому продукту
+        pr_nmb = ? AND (интервал 1 OR интервал 2 ...). Пересекающиеся окна
+        не дают повторов строк, результат упорядочен по meas_dt.
+        """
+        cols = ["pr_nmb", "meas_dt"] + feature_columns(meas_type)
+
+        chem_col = f"c_chem_0{el_nmb}"
+        cor_col = f"c_cor_0{el_nmb}"
+        cols.extend([chem_col, cor_col])
+
+        windows_filter, params = self._sample_windows_filter(sample_config)
+        if not params:
+            names = cols + ["dc", "ddc"]
+            return ColumnarResult.from_columns(names, [()] * len(names))
+
+        select_list = ", ".join(f"{c}" for c in cols)
+        query = f"""
+            SELECT {select_list},
+                {cor_col} - {chem_col} AS dc,
+                CASE
+                    WHEN {chem_col} <> 0 AND {chem_col} IS NOT NULL
+                    THEN ABS({cor_col} - {chem_col}) / {chem_col}
+                    ELSE 0
+                END AS ddc
+            FROM PR_MEAS
+            WHERE {windows_filter}
+            AND {chem_col} <> 0
+            AND active_model = 1
+        """
+        query += self._meas_type_filter(meas_index)
+        query += " ORDER BY meas_dt, timestamp"
 
+        try:
+            return self.db.fetch_numpy(query, params)
+        except Exception as e:
+            print(f"⚠️ Ошибка запроса выборки PR_MEAS: {e}")
+            raise
+
+    @staticmethod
+    def _sample_windows_filter(sample_config):
+        """
+        Условие WHERE по всем окнам выборки и его параметры.
+        Окна группируются по продукту: (pr_nmb = ? AND (timestamp BETWEEN ? AND ? OR ...)) OR ...
+        """
+        windows = {}
         for cond in sample_config:
-            pr_nmb = cond["product_id"]
-            start_dt = f"{cond['date_from']} {cond['time_from']}"
-            end_dt = f"{cond['date_to']} {cond['time_to']}"
-
-            cols = ["pr_nmb", "meas_dt"]
-            if meas_type == 0:
-                cols.extend([f"i_00_{i:02d}" for i in range(20)])
-            else:
-                cols.extend([f"c_cor_{i:02d}" for i in range(1, 9)])
-
-            chem_col = f"c_chem_0{el_nmb}"
-            cor_col = f"c_cor_0{el_nmb}"
-            cols.extend([chem_col, cor_col])
-
-            select_list = ", ".join(f"{c}" for c in cols)
-            query = f"""
-                SELECT {select_list},
-                    {cor_col} - {chem_col} AS dc,
-                    CASE
-                        WHEN {chem_col} <> 0 AND {chem_col} IS NOT NULL
-                        THEN ABS({cor_col} - {chem_col}) / {chem_col}
-                        ELSE 0
-                    END AS ddc
-                FROM PR_MEAS
-                WHERE timestamp BETWEEN ? AND ?
-                AND pr_nmb = ?
-                AND {chem_col} <> 0
-                AND active_model = 1
-            """
-
-            meas_index = self.combo_meas_type.currentIndex()
-            if meas_index == 1:
-                query += " AND meas_type = 0"
-            elif meas_index == 2:
-                query += " AND meas_type = 1"
-
-            query += " ORDER BY meas_dt, timestamp"
-
-            try:
-                rows = self.db.fetch_all(query, [start_dt, end_dt, pr_nmb])
-                all_rows.extend(rows)
-            except Exception as e:
-                print(f"⚠️ Ошибка запроса для pr_nmb={pr_nmb}: {e}")
-
-        return all_rows
+            windows.setdefault(cond["product_id"], []).append((
+                f"{cond['date_from']} {cond['time_from']}",
+                f"{cond['date_to']} {cond['time_to']}"
+            ))
+
+        product_filters = []
+        params = []
+        for pr_nmb, ranges in windows.items():
+            time_filter = " OR ".join(["timestamp BETWEEN ? AND ?"] * len(ranges))
+            product_filters.append(f"(pr_nmb = ? AND ({time_filter}))")
+            params.append(pr_nmb)
+            for start_dt, end_dt in ranges:
+                params.extend([start_dt, end_dt])
+        return f"({' OR '.join(product_filters)})", params
+
+    @staticmethod
+    def _meas_type_filter(meas_index):
+        """Условие по типу проб: 0 - все, 1 - ручные, 2 - цикл"""
+        if meas_index == 1:
+            return " AND meas_type = 0"
+        if meas_index == 2:
+            return " AND meas_type = 1"
+        return ""
 
     def _apply_initial_equation(self, pr_set_row, meas_type):
         """Загружает начальное уравнение в комбобоксы"""
         try:
-            k_prefix = "k_i_" if meas_type == 0 else "k_c_"
-            op_prefix = "operand_i_" if meas_type == 0 else "operand_c_"
-            op_type = "operator_i_" if meas_type == 0 else "operator_c_"
-
-            json_file = "lines_math_interactions.json" if meas_type == 0 else "math_interactions.json"
-            json_path = get_config_path() / json_file
-
-            if not os.path.exists(json_path):
-                print(f"⚠️ {json_path} не найден — пропускаем заполнение членов")
+            found_terms = self._equation_term_descriptions(
+                pr_set_row, meas_type, self.combo_element.currentData()
+            )
+            if found_terms is None:
+                print("⚠️ Члены уравнения не найдены — пропускаем заполнение членов")
                 return
 
-            with open(json_path, "r", encoding="utf-8") as f:
-                json_data = json.load(f)
-
-            term_lookup = {}
-            if meas_type == 0:
-                for term in json_data.get("interactions", []):
-                    desc = term.get("description", "").strip()
-                    if desc:
-                        key = (term["x1"], term["x2"], term["op"])
-                        term_lookup[key] = desc
-            else:
-                el_nmb = self.combo_element.currentData()
-                for group in json_data.get("interactions", []):
-                    if group.get("element_original_number") == el_nmb:
-                        for term in group.get("interactions", []):
-                            desc = term.get("description", "").strip()
-                            if desc:
-                                key = (term["x1"], term["x2"], term["op"])
-                                term_lookup[key] = desc
-                        break
-
-            term_specs = [
-                (f"{op_prefix}01_01", f"{op_prefix}02_01", f"{op_type}01"),
-                (f"{op_prefix}01_02", f"{op_prefix}02_02", f"{op_type}02"),
-                (f"{op_prefix}01_03", f"{op_prefix}02_03", f"{op_type}03"),
-                (f"{op_prefix}01_04", f"{op_prefix}02_04", f"{op_type}04"),
-                (f"{op_prefix}01_05", f"{op_prefix}02_05", f"{op_type}05"),
-            ]
-
-            found_terms = []
-            for i, (x1_key, x2_key, op_key) in enumerate(term_specs, start=1):
-                x1 = pr_set_row.get(x1_key, 0)
-                x2 = pr_set_row.get(x2_key, 0)
-                op = pr_set_row.get(op_key, 0)
-
-                desc = term_lookup.get((x1, x2, op), "-")
-                found_terms.append(desc)
-
             for i, combo in enumerate(self.combo_equation_terms):
                 combo.blockSignals(True)
                 if i < len(found_terms) and found_terms[i] != "-":
@@ -483,40 +623,96 @@ class RegressionPage(QWidget):
             print("❌ Ошибка в _apply_initial_equation:")
             traceback.print_exc()
 
+    @staticmethod
+    def _equation_term_descriptions(pr_set_row, meas_type, el_nmb):
+        """
+        Описания членов A1..A5 уравнения из строки PR_SET ("-" - член не найден).
+        None - для типа градуировки и элемента нет списка членов.
+        """
+        op_prefix = "operand_i_" if meas_type == 0 else "operand_c_"
+        op_type = "operator_i_" if meas_type == 0 else "operator_c_"
+
+        terms = load_interaction_terms(meas_type, el_nmb)
+        if not terms:
+            return None
+
+        term_lookup = {
+            (term["x1"], term["x2"], term["op"]): term["description"].strip()
+            for term in terms
+        }
+        return [
+            term_lookup.get((
+                pr_set_row.get(f"{op_prefix}01_{i:02d}", 0),
+                pr_set_row.get(f"{op_prefix}02_{i:02d}", 0),
+                pr_set_row.get(f"{op_type}{i:02d}", 0)
+            ), "-")
+            for i in range(1, 6)
+        ]
+
     def _update_data_table_from_buffer(self):
         """Заполняет data_table из self.raw_buffer (базовые колонки)"""
         self.data_table.setRowCount(0)
         if not self.raw_buffer:
             return
 
-        self.data_table.setRowCount(len(self.raw_buffer))
-        for row_idx, rec in enumerate(self.raw_buffer):
-            self.data_table.setItem(row_idx, 0, QTableWidgetItem(str(rec.get("pr_nmb", ""))))
-            self.data_table.setItem(row_idx, 1, QTableWidgetItem(str(rec.get("meas_dt", ""))))
+        el_nmb = self.combo_element.currentData()
+        pr_nmbs = self._sample_values("pr_nmb")
+        meas_dts = self._sample_values("meas_dt")
+        c_chems = self._sample_values(f"c_chem_0{el_nmb}")
 
-            el_nmb = self.combo_element.currentData()
-            c_chem = rec.get(f"c_chem_0{el_nmb}", "")
-            self.data_table.setItem(row_idx, 7, QTableWidgetItem(str(c_chem)))
+        self.data_table.setRowCount(len(self.raw_buffer))
+        for row_idx in range(len(self.raw_buffer)):
+            self.data_table.setItem(row_idx, 0, QTableWidgetItem(self._cell_text(pr_nmbs[row_idx])))
+            self.data_table.setItem(row_idx, 1, QTableWidgetItem(self._cell_text(meas_dts[row_idx])))
+            self.data_table.setItem(row_idx, 7, QTableWidgetItem(self._cell_text(c_chems[row_idx])))
 
             # Колонки C_расч, ΔC, δC оставляем пустыми до регрессии
             self.data_table.setItem(row_idx, 8, QTableWidgetItem(""))  # C_расч
             self.data_table.setItem(row_idx, 9, QTableWidgetItem(""))  # ΔC
             self.data_table.setItem(row_idx, 10, QTableWidgetItem(""))  # δC
 
+    def _sample_values(self, name) -> list:
+        """Значения столбца выборки как объекты Python (NULL и отсутствующий столбец - None)"""
+        if name not in self.raw_buffer:
+            return [None] * len(self.raw_buffer)
+        values = self.raw_buffer[name].tolist()
+        for row_idx in np.flatnonzero(self.raw_buffer.is_null(name)):
+            values[row_idx] = None
+        return values
+
+    @staticmethod
+    def _cell_text(value) -> str:
+        return "" if value is None else str(value)
+
     def perform_regression(self):
         """Выполняет регрессию (LINEST) → обновляет все таблицы и график"""
         if not hasattr(self, 'raw_buffer') or not self.raw_buffer:
             return
 
         try:
-            # 1. Собираем матрицу признаков X и вектор y
-            X_matrix, y_vector = self._build_regression_data()
+            # 1. Регрессия по блоку XᵀX выбранных членов (не зависит от числа проб)
+            #    или робастная регрессия по весам проб
+            fit_method = self.combo_fit_method.currentData()
+            self._sample_weights = None
+            if fit_method == "ols":
+                y_vector, regression = self._calculate_regression_from_cross_products()
+            else:
+                y_vector, regression = self._calculate_robust_regression(fit_method)
 
-            if X_matrix is None or y_vector is None:
-                return
+            if regression is None:
+                # 2. Вырожденный набор членов - расчёт по полной матрице X
+                X_matrix, y_vector = self._build_regression_data()
+
+                if X_matrix is None or y_vector is None:
+                    return
 
-            # 2. Выполняем регрессию
-            coefficients, statistics, standard_errors, t_stats, p_values = self._calculate_regression(X_matrix, y_vector)
+                regression = self._calculate_regression(X_matrix, y_vector)
+
+            coefficients, statistics, standard_errors, t_stats, p_values = regression
+            self._coefficients = np.asarray(coefficients, dtype=np.float64)
+
+            # Диагностика влияния проб для выбранных членов
+            self._influence = self._influence_diagnostics(y_vector)
 
             # 3. Обновляем таблицы
             self._update_coefficients_table(coefficients, p_values)
@@ -524,6 +720,8 @@ class RegressionPage(QWidget):
 
             # 4. Применяем уравнение для расчета C_расч
             self.apply_current_equation()
+            self._fill_weight_column()
+            self._fill_influence_columns()
 
             # 5. Строим график
             self._update_plot(y_vector)
@@ -542,7 +740,7 @@ class RegressionPage(QWidget):
 
             # Вектор y (C_хим)
             el_nmb = self.combo_element.currentData()
-            y_vector = np.array([rec.get(f"c_chem_0{el_nmb}", 0.0) for rec in self.raw_buffer])
+            y_vector = self._target_vector(el_nmb)
 
             # Матрица X: [1, X1, X2, X3, X4, X5]
             X_matrix = np.ones((n_samples, 6))  # 6 колонок: A0 + A1..A5
@@ -560,6 +758,464 @@ class RegressionPage(QWidget):
             print(f"❌ Ошибка в _build_regression_data: {e}")
             return None, None
 
+    def _target_vector(self, el_nmb) -> np.ndarray:
+        """C_хим выборки для элемента"""
+        column = f"c_chem_0{el_nmb}"
+        if column not in self.raw_buffer:
+            return np.zeros(len(self.raw_buffer))
+        return np.array(self.raw_buffer.filled(column, 0.0), dtype=np.float64)
+
+    def run_term_search(self):
+        """Запускает автоматический подбор членов уравнения в фоне"""
+        if not getattr(self, 'raw_buffer', None) or self._term_matrix is None:
+            QMessageBox.warning(self, "Ошибка", "Сначала загрузите выборку")
+            return
+
+        term_matrix = self._term_matrix
+        y_vector = self._target_vector(self.combo_element.currentData())
+
+        self._set_sample_controls_enabled(False)
+        self.busy_indicator.submit(
+            "Подбор членов уравнения...",
+            self._search_terms_task, term_matrix.matrix, y_vector,
+            self.combo_search_method.currentData(),
+            self.combo_search_criterion.currentData(),
+            self.spin_search_terms.value(),
+            on_result=lambda results: self._on_term_search_finished(results, term_matrix.descriptions),
+            on_error=self._on_term_search_failed,
+            on_cancelled=lambda: self._set_sample_controls_enabled(True)
+        )
+
+    def _set_sample_controls_enabled(self, enabled):
+        """
+        Блокирует на время подбора членов или пакетного пересчёта смену элемента,
+        типа измерения, выгрузку и запуск другой задачи: все они идут через тот же
+        индикатор и отменили бы текущую.
+        """
+        for widget in (self.combo_element, self.combo_meas_type, self.btn_load_data,
+                       self.btn_search_terms, self.btn_batch_regression):
+            widget.setEnabled(enabled)
+
+    @staticmethod
+    def _search_terms_task(matrix, y_vector, method, criterion, max_terms):
+        """Подбор (выполняется в фоновом потоке, перебор - в пуле процессов)"""
+        token = current_token()
+        return search_terms(
+            matrix, y_vector, method=method, criterion=criterion, max_terms=max_terms, top_n=20,
+            progress=token.report_progress if token else None,
+            check_cancelled=token.raise_if_cancelled if token else None
+        )
+
+    def _on_term_search_failed(self, message):
+        self._set_sample_controls_enabled(True)
+        QMessageBox.critical(self, "Ошибка", f"Ошибка подбора членов уравнения:\n{message}")
+
+    def _on_term_search_finished(self, results, descriptions):
+        """Заполняет таблицу лучших наборов членов"""
+        self._set_sample_controls_enabled(True)
+        self._search_results = [tuple(descriptions[i].strip() for i in r["terms"]) for r in results]
+
+        self.search_table.setRowCount(len(results))
+        for row, (result, terms) in enumerate(zip(results, self._search_results)):
+            values = [str(row + 1), "; ".join(terms)] + [
+                f"{result[key]:.6g}" for key in ("rmse", "r2", "adj_r2", "aic", "bic", "press")
+            ]
+            for col, value in enumerate(values):
+                self.search_table.setItem(row, col, QTableWidgetItem(value))
+        self.search_table.resizeColumnsToContents()
+
+        if not results:
+            QMessageBox.information(self, "Информация", "Подходящие наборы членов не найдены")
+
+    def apply_search_result(self):
+        """Подставляет выбранный набор членов в комбобоксы и пересчитывает регрессию"""
+        row = self.search_table.currentRow()
+        if row < 0 or row >= len(self._search_results):
+            QMessageBox.information(self, "Информация", "Выберите строку с набором членов")
+            return
+
+        terms = list(self._search_results[row])
+        for i, combo in enumerate(self.combo_equation_terms):
+            combo.blockSignals(True)
+            index = combo.findText(terms[i]) if i < len(terms) else 0
+            combo.setCurrentIndex(max(index, 0))
+            combo.blockSignals(False)
+
+        self.perform_regression()
+
+    def _sample_cross_products(self, el_nmb):
+        """y и перекрёстные произведения всех членов-кандидатов выборки (считаются один раз)"""
+        term_matrix = self._ensure_term_matrix(self.current_meas_type, el_nmb)
+        cached = self._cross_products
+        if cached is None or cached[0] is not term_matrix or cached[1] != el_nmb:
+            y_vector = self._target_vector(el_nmb)
+            cached = self._cross_products = (
+                term_matrix, el_nmb, y_vector, CrossProducts.from_matrix(term_matrix.matrix, y_vector)
+            )
+        return cached[2], cached[3]
+
+    def _calculate_regression_from_cross_products(self):
+        """
+        Регрессия по выбранным членам из подблока XᵀX, Xᵀy, yᵀy выборки.
+
+        Пустые и неизвестные члены получают нулевой коэффициент (их значения
+        в уравнении - нули). Возвращает (y, результат как у _calculate_regression);
+        результат None - набор вырожден (например, один член выбран дважды).
+        """
+        el_nmb = self.combo_element.currentData()
+        y_vector, cross = self._sample_cross_products(el_nmb)
+        slots, indices = self._selected_terms()
+
+        fit = cross.fit(indices)
+        if fit is None or len(y_vector) == 0:
+            return y_vector, None
+
+        # Раскладываем по позициям A0..A5
+        positions = [0] + slots
+        coefficients, standard_errors, t_stats = np.zeros(6), np.zeros(6), np.zeros(6)
+        p_values = np.ones(6)
+        coefficients[positions] = fit["coefficients"]
+        standard_errors[positions] = fit["standard_errors"]
+        t_stats[positions] = fit["t_stats"]
+        try:
+            p_values[positions] = self._p_values(fit["t_stats"], fit["dof"])
+        except Exception:
+            pass
+
+        rmse = np.sqrt(fit["rss"] / fit["dof"])
+        y_mean = cross.y_mean
+        statistics = {
+            'rmse': rmse,
+            'r_squared': 1 - fit["rss"] / cross.syy if cross.syy != 0 else 0,
+            'y_min': np.min(y_vector),
+            'y_max': np.max(y_vector),
+            'y_mean': y_mean,
+            'relative_rmse': rmse / y_mean if y_mean != 0 else 0
+        }
+        statistics.update(self._cross_validation_statistics(self._term_matrix.matrix[:, indices], y_vector))
+        return y_vector, (coefficients, statistics, standard_errors, t_stats, p_values)
+
+    def _selected_terms(self):
+        """Позиции A1..A5 и номера столбцов матрицы членов для выбранных (известных) членов"""
+        slots, indices = [], []
+        for i, combo in enumerate(self.combo_equation_terms):
+            index = self._term_matrix.index_of(combo.currentText()) if combo.currentText().strip() else None
+            if index is not None:
+                slots.append(i + 1)
+                indices.append(index)
+        return slots, indices
+
+    def _calculate_robust_regression(self, method):
+        """
+        Робастная регрессия (IRLS с весами Хьюбера или Тьюки) по выбранным членам.
+        Веса проб сохраняются в self._sample_weights для таблицы выборки.
+        Скользящий контроль для робастной модели не считается.
+        """
+        el_nmb = self.combo_element.currentData()
+        y_vector, _ = self._sample_cross_products(el_nmb)
+        slots, indices = self._selected_terms()
+        n_samples = len(y_vector)
+        if n_samples <= len(indices) + 1:
+            return y_vector, None
+
+        X = np.column_stack([np.ones(n_samples), self._term_matrix.matrix[:, indices]])
+        fit = irls(X, y_vector, method)
+        if not fit["converged"]:
+            print(f"⚠️ Робастная регрессия не сошлась за {fit['iterations']} итераций")
+        weights = self._sample_weights = fit["weights"]
+
+        positions = [0] + slots
+        coefficients, standard_errors, t_stats = np.zeros(6), np.zeros(6), np.zeros(6)
+        p_values = np.ones(6)
+        coefficients[positions] = fit["coefficients"]
+        standard_errors[positions] = fit["standard_errors"]
+        t_stats[positions] = fit["t_stats"]
+        try:
+            p_values[positions] = self._p_values(fit["t_stats"], fit["dof"])
+        except Exception:
+            pass
+
+        # σ и R² - взвешенные: выбросы с малым весом их не искажают
+        residuals = y_vector - X @ fit["coefficients"]
+        rmse = np.sqrt(np.sum(weights * residuals ** 2) / fit["dof"])
+        y_weighted_mean = np.average(y_vector, weights=weights) if weights.sum() > 0 else np.mean(y_vector)
+        ss_tot = np.sum(weights * (y_vector - y_weighted_mean) ** 2)
+        y_mean = np.mean(y_vector)
+        statistics = {
+            'rmse': rmse,
+            'r_squared': 1 - np.sum(weights * residuals ** 2) / ss_tot if ss_tot != 0 else 0,
+            'y_min': np.min(y_vector),
+            'y_max': np.max(y_vector),
+            'y_mean': y_mean,
+            'relative_rmse': rmse / y_mean if y_mean != 0 else 0
+        }
+        print(f"✅ Робастная регрессия ({method}): итераций {fit['iterations']}, "
+              f"проб с весом < 0.5: {int(np.sum(weights < 0.5))}")
+        return y_vector, (coefficients, statistics, standard_errors, t_stats, p_values)
+
+    def _fill_weight_column(self):
+        """Колонка «Вес»: веса робастной регрессии, выбросы подсвечиваются"""
+        weights = self._sample_weights
+        for row_idx in range(self.data_table.rowCount()):
+            if weights is None or row_idx >= len(weights):
+                self.data_table.setItem(row_idx, 11, QTableWidgetItem(""))
+                continue
+            item = QTableWidgetItem(f"{weights[row_idx]:.3g}")
+            if weights[row_idx] == 0:
+                item.setBackground(Qt.GlobalColor.red)
+            elif weights[row_idx] < 0.5:
+                item.setBackground(Qt.GlobalColor.yellow)
+            self.data_table.setItem(row_idx, 11, item)
+
+    def _influence_diagnostics(self, y_vector):
+        """h, D Кука, DFFITS и стьюдентизированные остатки по выбранным членам"""
+        try:
+            _, indices = self._selected_terms()
+            return influence_diagnostics(self._term_matrix.matrix[:, indices], y_vector)
+        except Exception as e:
+            print(f"❌ Ошибка диагностики влияния: {e}")
+            return None
+
+    def _fill_influence_columns(self):
+        """Колонки диагностики влияния; превышения порогов подсвечиваются"""
+        influence = self._influence
+        if influence is None or len(influence["leverage"]) != self.data_table.rowCount():
+            for row_idx in range(self.data_table.rowCount()):
+                for col in range(12, 16):
+                    self.data_table.setItem(row_idx, col, QTableWidgetItem(""))
+            return
+
+        columns = [
+            (12, influence["leverage"], influence["high_leverage"]),
+            (13, influence["cooks"], influence["high_cooks"]),
+            (14, influence["dffits"], influence["high_dffits"]),
+            (15, influence["studentized"], influence["outlier"]),
+        ]
+        flagged = influence["flagged"]
+        for row_idx in range(self.data_table.rowCount()):
+            for col, values, exceeded in columns:
+                item = QTableWidgetItem(f"{values[row_idx]:.4g}")
+                if exceeded[row_idx]:
+                    item.setBackground(Qt.GlobalColor.yellow)
+                self.data_table.setItem(row_idx, col, item)
+
+            product_item = self.data_table.item(row_idx, 0)
+            if product_item:
+                product_item.setBackground(Qt.GlobalColor.red if flagged[row_idx] else Qt.GlobalColor.white)
+
+    def exclude_flagged_samples(self):
+        """
+        Исключает влиятельные пробы из выборки и пересчитывает уравнение.
+        Строки берутся из уже рассчитанной матрицы членов - без обращения к БД.
+        """
+        influence = self._influence
+        if not getattr(self, 'raw_buffer', None) or influence is None \
+                or len(influence["flagged"]) != len(self.raw_buffer):
+            QMessageBox.information(self, "Информация", "Нет рассчитанного уравнения")
+            return
+
+        flagged = influence["flagged"]
+        excluded = int(np.count_nonzero(flagged))
+        if excluded == 0:
+            QMessageBox.information(self, "Информация", "Влиятельных проб нет")
+            return
+
+        keep = ~flagged
+        self.raw_buffer = self.raw_buffer.take(keep)
+        self._term_matrix = self._term_matrix.take(keep)
+        if self._feature_engine is not None:
+            self._feature_engine = self._feature_engine.take(keep)
+
+        self._update_data_table_from_buffer()
+        self.perform_regression()
+        print(f"✅ Исключено влиятельных проб: {excluded}, осталось {len(self.raw_buffer)}")
+
+    def _sample_folds(self):
+        """Разбиения выборки для k-fold и контроля по времени (meas_dt), строятся один раз"""
+        cached = self._cv_folds
+        if cached is None or cached[0] is not self.raw_buffer or len(cached[1]) != len(self.raw_buffer):
+            cached = self._cv_folds = (
+                self.raw_buffer,
+                kfold_assignment(len(self.raw_buffer)),
+                time_block_assignment(self._sample_values("meas_dt"))
+            )
+        return cached[1], cached[2]
+
+    def _cross_validation_statistics(self, terms, y_vector) -> dict:
+        """LOO (PRESS), k-fold и контроль по времени для членов terms (пробы × члены)"""
+        try:
+            kfold, time_folds = self._sample_folds()
+            return cross_validation(terms, y_vector, kfold, time_folds)
+        except Exception as e:
+            print(f"❌ Ошибка скользящего контроля: {e}")
+            return {}
+
+    @staticmethod
+    def _p_values(t_stats, dof):
+        """Двусторонние p-значения t-статистик"""
+        from scipy import stats
+        return 2 * (1 - stats.t.cdf(np.abs(t_stats), dof))
+
+    def run_batch_regression(self):
+        """Пересчитывает уравнения всех элементов продукта по одной выгрузке выборки"""
+        sample_config, pr_nmb = self._read_sample_config()
+        if sample_config is None:
+            return
+
+        elements = [(self.combo_element.itemData(i), self.combo_element.itemText(i))
+                    for i in range(self.combo_element.count())
+                    if self.combo_element.itemData(i) is not None]
+        if not elements:
+            QMessageBox.warning(self, "Ошибка", "Список элементов пуст")
+            return
+
+        self._set_sample_controls_enabled(False)
+        self.busy_indicator.submit(
+            "Пересчёт уравнений всех элементов...",
+            self._batch_regression_task, sample_config, pr_nmb, elements,
+            self.combo_meas_type.currentIndex(),
+            on_result=self._on_batch_regression_finished,
+            on_error=self._on_batch_regression_failed,
+            on_cancelled=lambda: self._set_sample_controls_enabled(True)
+        )
+
+    def _batch_regression_task(self, sample_config, pr_nmb, elements, meas_index):
+        """
+        Фоновая задача: активные градуировки PR_SET, выборка PR_MEAS одним запросом
+        со столбцами всех элементов и подгонка элементов в пуле потоков.
+        """
+        token = current_token()
+        pr_set_rows = {
+            el_nmb: self.db.reference.first(
+                "PR_SET", order_by="pr_nmb, mdl_nmb, el_nmb", pr_nmb=pr_nmb, el_nmb=el_nmb, active_model=1
+            )
+            for el_nmb, _ in elements
+        }
+        configured = [(el_nmb, name, pr_set_rows[el_nmb]) for el_nmb, name in elements if pr_set_rows[el_nmb]]
+        if not configured:
+            return []
+
+        columns = self._fetch_batch_sample(
+            sample_config, [el_nmb for el_nmb, _, _ in configured],
+            {row["meas_type"] for _, _, row in configured}, meas_index
+        )
+        if token:
+            token.raise_if_cancelled()
+
+        completed = itertools.count(1)
+
+        def fit(element):
+            result = self._fit_batch_element(columns, *element)
+            done = next(completed)
+            if token:
+                token.raise_if_cancelled()
+                token.report_progress(done, len(configured))
+            return result
+
+        # Вычисления NumPy отпускают GIL - элементы считаются параллельно
+        with ThreadPoolExecutor(max_workers=min(len(configured), os.cpu_count() or 1)) as pool:
+            return list(pool.map(fit, configured))
+
+    def _fetch_batch_sample(self, sample_config, el_nmbs, meas_types, meas_index):
+        """
+        Выборка PR_MEAS по столбцам для нескольких элементов сразу:
+        столбцы признаков нужных типов градуировки и c_chem_0x всех элементов.
+        Строка попадает в выборку, если хотя бы у одного элемента есть химия.
+        """
+        cols = ["pr_nmb", "meas_dt"]
+        for meas_type in sorted(meas_types):
+            cols.extend(c for c in feature_columns(meas_type) if c not in cols)
+        chem_cols = [f"c_chem_0{el_nmb}" for el_nmb in el_nmbs]
+        cols.extend(c for c in chem_cols if c not in cols)
+
+        windows_filter, params = self._sample_windows_filter(sample_config)
+        query = f"""
+            SELECT {", ".join(cols)}
+            FROM PR_MEAS
+            WHERE {windows_filter}
+            AND ({" OR ".join(f"{c} <> 0" for c in chem_cols)})
+            AND active_model = 1
+        """
+        query += self._meas_type_filter(meas_index)
+        query += " ORDER BY meas_dt, timestamp"
+        return self.db.fetch_columns(query, params)
+
+    def _fit_batch_element(self, columns, el_nmb, name, pr_set_row):
+        """Подгонка уравнения одного элемента по общей выборке (члены - из PR_SET)"""
+        meas_type = pr_set_row["meas_type"]
+        result = {"el_nmb": el_nmb, "name": name, "meas_type": meas_type, "pr_set_row": pr_set_row,
+                  "samples": 0, "terms": ["-"] * 5, "coefficients": None, "error": ""}
+
+        terms = self._equation_term_descriptions(pr_set_row, meas_type, el_nmb)
+        if terms is None:
+            result["error"] = "Нет списка членов уравнения"
+            return result
+        result["terms"] = terms
+
+        # Пробы с химией этого элемента
+        chem = np.array(columns.get(f"c_chem_0{el_nmb}", ()), dtype=np.float64)
+        mask = np.isfinite(chem) & (chem != 0)
+        y_vector = chem[mask]
+        result["samples"] = len(y_vector)
+
+        engine = FeatureEngine.from_columns(columns, meas_type, len(chem)).take(mask)
+        term_lookup = {term["description"].strip(): term for term in load_interaction_terms(meas_type, el_nmb)}
+        slots = [i + 1 for i, desc in enumerate(terms) if desc in term_lookup]
+        features = np.column_stack(
+            [engine.evaluate_term(term_lookup[terms[slot - 1]]) for slot in slots]
+        ) if slots else np.zeros((len(y_vector), 0))
+
+        fit = CrossProducts.from_matrix(features, y_vector).fit(range(len(slots))) if len(y_vector) else None
+        if fit is None:
+            result["error"] = "Мало проб или вырожденный набор членов"
+            return result
+
+        coefficients = np.zeros(6)
+        coefficients[[0] + slots] = fit["coefficients"]
+        syy = float(np.sum((y_vector - y_vector.mean()) ** 2))
+        meas_dt = [value for value, keep in zip(columns.get("meas_dt", ()), mask) if keep]
+        validation = cross_validation(
+            features, y_vector, kfold_assignment(len(y_vector)), time_block_assignment(meas_dt)
+        )
+        result.update({
+            "coefficients": coefficients,
+            "rmse": float(np.sqrt(fit["rss"] / fit["dof"])),
+            "r_squared": 1 - fit["rss"] / syy if syy != 0 else 0.0,
+            "rmse_loo": validation["rmse_loo"],
+        })
+        return result
+
+    def _on_batch_regression_failed(self, message):
+        self._set_sample_controls_enabled(True)
+        QMessageBox.critical(self, "Ошибка", f"Ошибка пакетного пересчёта:\n{message}")
+
+    def _on_batch_regression_finished(self, results):
+        """Сводная таблица коэффициентов и характеристик по элементам"""
+        self._set_sample_controls_enabled(True)
+        self._batch_results = results
+
+        self.batch_table.setRowCount(len(results))
+        for row, result in enumerate(results):
+            values = [
+                result["name"],
+                "Интенс." if result["meas_type"] == 0 else "Конц.",
+                str(result["samples"]),
+                "; ".join(t for t in result["terms"] if t != "-"),
+            ]
+            if result["coefficients"] is not None:
+                values += [f"{value:.6g}" for value in result["coefficients"]]
+                values += [f"{result['rmse']:.6g}", f"{result['r_squared']:.6g}",
+                           "-" if np.isnan(result["rmse_loo"]) else f"{result['rmse_loo']:.6g}"]
+            else:
+                values += [""] * 8 + [result["error"]]
+
+            for col, value in enumerate(values):
+                self.batch_table.setItem(row, col, QTableWidgetItem(value))
+        self.batch_table.resizeColumnsToContents()
+
+        if not results:
+            QMessageBox.information(self, "Информация", "Для продукта нет активных градуировок")
+
     def _calculate_regression(self, X, y):
         """Выполняет линейную регрессию и возвращает коэффициенты, статистику и значимость"""
         try:
@@ -590,8 +1246,7 @@ class RegressionPage(QWidget):
                 t_stats = coefficients / standard_errors
 
                 # p-values (двусторонний тест)
-                from scipy import stats
-                p_values = 2 * (1 - stats.t.cdf(np.abs(t_stats), n_samples - n_features))
+                p_values = self._p_values(t_stats, n_samples - n_features)
             except:
                 # Если матрица вырождена, используем нули
                 standard_errors = np.zeros(n_features)
@@ -606,6 +1261,7 @@ class RegressionPage(QWidget):
                 'y_mean': np.mean(y),
                 'relative_rmse': rmse / np.mean(y) if np.mean(y) != 0 else 0
             }
+            statistics.update(self._cross_validation_statistics(X[:, 1:], y))
 
             return coefficients, statistics, standard_errors, t_stats, p_values
 
@@ -660,13 +1316,17 @@ class RegressionPage(QWidget):
             (2, statistics.get('y_min', 0) if y_vector is None else np.min(y_vector)),
             (3, statistics.get('y_max', 0) if y_vector is None else np.max(y_vector)),
             (4, statistics.get('y_mean', 0) if y_vector is None else np.mean(y_vector)),
-            (5, statistics.get('r_squared', 0))
+            (5, statistics.get('r_squared', 0)),
+            (6, statistics.get('rmse_loo', np.nan)),
+            (7, statistics.get('q2', np.nan)),
+            (8, statistics.get('rmse_kfold', np.nan)),
+            (9, statistics.get('rmse_time', np.nan))
         ]
 
         for row, value in stats_mapping:
             item = self.stats_table.item(row, 1)
             if item:
-                item.setText(f"{value:.6g}")
+                item.setText("-" if np.isnan(value) else f"{value:.6g}")
 
     def _update_plot(self, y_vector):
         """Обновляет график зависимости C_хим от C_расч"""
@@ -676,6 +1336,11 @@ class RegressionPage(QWidget):
             # Собираем C_хим и C_расч из таблицы
             c_chem_values = []
             c_calc_values = []
+            flagged_rows = []
+
+            influence = self._influence
+            flagged = influence["flagged"] if influence is not None \
+                and len(influence["flagged"]) == self.data_table.rowCount() else None
 
             for row in range(self.data_table.rowCount()):
                 chem_item = self.data_table.item(row, 7)
@@ -687,12 +1352,19 @@ class RegressionPage(QWidget):
                         c_calc = float(calc_item.text())
                         c_chem_values.append(c_chem)
                         c_calc_values.append(c_calc)
+                        flagged_rows.append(bool(flagged[row]) if flagged is not None else False)
                     except ValueError:
                         continue
 
             if c_chem_values and c_calc_values:
                 self.ax.scatter(c_chem_values, c_calc_values, alpha=0.6, label='Данные')
 
+                # Влиятельные пробы поверх основных точек
+                if any(flagged_rows):
+                    mask = np.array(flagged_rows)
+                    self.ax.scatter(np.array(c_chem_values)[mask], np.array(c_calc_values)[mask],
+                                    facecolors='none', edgecolors='red', s=80, label='Влиятельные пробы')
+
                 # Линия идеальной корреляции
                 min_val = min(min(c_chem_values), min(c_calc_values))
                 max_val = max(max(c_chem_values), max(c_calc_values))
@@ -716,44 +1388,27 @@ class RegressionPage(QWidget):
                 return
 
             # Читаем текущие коэффициенты из coeff_table
-            coeffs = []
-            for i in range(6):
-                item = self.coeff_table.item(i, 2)
-                try:
-                    val = float(item.text()) if item and item.text() else 0.0
-                except:
-                    val = 0.0
-                coeffs.append(val)
+            coeffs = self._table_coefficients()
 
-            A0, A1, A2, A3, A4, A5 = coeffs
-
-            # Вычисляем признаки для всех членов уравнения
+            # Уравнение из коэффициентов таблицы и выбранных членов - тот же расчёт, что в отчёте
             el_nmb = self.combo_element.currentData()
-            features = []
-            for combo in self.combo_equation_terms:
-                desc = combo.currentText().strip()
-                feat_vals = self._compute_feature(desc, self.current_meas_type, el_nmb)
-                features.append(feat_vals)
-                self._fill_feature_column(len(features)-1, feat_vals)
+            self._ensure_term_matrix(self.current_meas_type, el_nmb)
+            equation = CompiledEquation(self.current_meas_type, coeffs, self._selected_term_specs(el_nmb))
 
-            # Рассчитываем C_расч для каждой строки
-            for row_idx in range(len(self.raw_buffer)):
-                c_chem = self.raw_buffer[row_idx].get(f"c_chem_0{el_nmb}", 0.0)
-
-                # Собираем X-вектор: [1, X1, X2, X3, X4, X5]
-                X_row = [1.0] + [features[i][row_idx] for i in range(5)]
+            features = equation.features(self._feature_engine)
+            for i in range(features.shape[1]):
+                self._fill_feature_column(i, features[:, i])
 
-                # C_расч = A0*X0 + A1*X1 + ... + A5*X5
-                c_calc = sum(coeffs[i] * X_row[i] for i in range(6))
+            # C_расч, ΔC, δC для всей выборки
+            c_calc = equation.evaluate(self._feature_engine, features)
+            c_chem = self._target_vector(el_nmb)
+            d_c = c_calc - c_chem
+            dd_c = np.divide(np.abs(d_c), c_chem, out=np.zeros_like(d_c), where=c_chem != 0)
 
-                # ΔC, δC
-                dC = c_calc - c_chem
-                ddc = abs(dC) / c_chem if c_chem != 0 else 0.0
-
-                # Обновляем таблицу
-                self.data_table.setItem(row_idx, 8, QTableWidgetItem(f"{c_calc:.6g}"))
-                self.data_table.setItem(row_idx, 9, QTableWidgetItem(f"{dC:.6g}"))
-                self.data_table.setItem(row_idx, 10, QTableWidgetItem(f"{ddc:.6g}"))
+            for row_idx in range(len(self.raw_buffer)):
+                self.data_table.setItem(row_idx, 8, QTableWidgetItem(f"{c_calc[row_idx]:.6g}"))
+                self.data_table.setItem(row_idx, 9, QTableWidgetItem(f"{d_c[row_idx]:.6g}"))
+                self.data_table.setItem(row_idx, 10, QTableWidgetItem(f"{dd_c[row_idx]:.6g}"))
 
             print(f"✅ Расчёт завершён: {len(self.raw_buffer)} строк")
 
@@ -762,79 +1417,35 @@ class RegressionPage(QWidget):
             print("❌ Ошибка в apply_current_equation():")
             traceback.print_exc()
 
-    def _compute_feature(self, feature_desc: str, meas_type: int, el_nmb: int) -> list:
+    def _selected_term_specs(self, el_nmb) -> list:
+        """(x1, x2, op) членов из комбобоксов; пустой или неизвестный член - (0, 0, 0)"""
+        term_lookup = {
+            term["description"].strip(): (term["x1"], term["x2"], term["op"])
+            for term in load_interaction_terms(self.current_meas_type, el_nmb)
+        }
+        return [term_lookup.get(combo.currentText().strip(), (0, 0, 0)) for combo in self.combo_equation_terms]
+
+    def _compute_feature(self, feature_desc: str, meas_type: int, el_nmb: int) -> np.ndarray:
         """Вычисляет один признак для всего self.raw_buffer"""
+        row_count = len(self.raw_buffer)
         if not feature_desc or feature_desc == "-":
-            return [0.0] * len(self.raw_buffer)
-
-        json_file = "lines_math_interactions.json" if meas_type == 0 else "math_interactions.json"
-        json_path = get_config_path() / json_file
-
-        if not os.path.exists(json_path):
-            return [0.0] * len(self.raw_buffer)
-
-        with open(json_path, "r", encoding="utf-8") as f:
-            json_data = json.load(f)
-
-        x1, x2, op = 0, 0, 0
-        found = False
-
-        if meas_type == 0:
-            for term in json_data.get("interactions", []):
-                if term.get("description") == feature_desc:
-                    x1, x2, op = term["x1"], term["x2"], term["op"]
-                    found = True
-                    break
-        else:
-            for group in json_data.get("interactions", []):
-                if group.get("element_original_number") == el_nmb:
-                    for term in group.get("interactions", []):
-                        if term.get("description") == feature_desc:
-                            x1, x2, op = term["x1"], term["x2"], term["op"]
-                            found = True
-                            break
-                    if found:
-                        break
+            return np.zeros(row_count)
 
-        if not found:
-            return [0.0] * len(self.raw_buffer)
-
-        result = []
-        for rec in self.raw_buffer:
-            try:
-                if meas_type == 0:
-                    val1 = rec.get(f"i_00_{x1:02d}", 0.0)
-                    val2 = rec.get(f"i_00_{x2:02d}", 0.0) if x2 != 0 else 1.0
-                else:
-                    val1 = rec.get(f"c_cor_{x1:02d}", 0.0) if x1 != 0 else 1.0
-                    val2 = rec.get(f"c_cor_{x2:02d}", 0.0) if x2 != 0 else 1.0
-
-                if op == 0:
-                    res = 0.0
-                elif op == 1:
-                    res = val1
-                elif op == 2:
-                    res = val1 * val2
-                elif op == 3:
-                    res = val1 / val2 if val2 != 0 else 0.0
-                elif op == 4:
-                    res = val1 * val1
-                elif op == 5:
-                    res = 1.0 / val1 if val1 != 0 else 0.0
-                elif op == 6:
-                    denom = val2 * val2
-                    res = val1 / denom if denom != 0 else 0.0
-                elif op == 7:
-                    denom = val1 * val1
-                    res = 1.0 / denom if denom != 0 else 0.0
-                else:
-                    res = 0.0
+        # Выбор члена - срез предвычисленной матрицы
+        column = self._ensure_term_matrix(meas_type, el_nmb).column(feature_desc)
+        return column if column is not None else np.zeros(row_count)
 
-                result.append(res)
-            except Exception as e:
-                result.append(0.0)
+    def _ensure_term_matrix(self, meas_type: int, el_nmb: int) -> TermMatrix:
+        """Матрица членов-кандидатов для текущего self.raw_buffer"""
+        row_count = len(self.raw_buffer)
+        engine = self._feature_engine
+        if engine is None or engine.meas_type != meas_type or engine.row_count != row_count:
+            engine = self._feature_engine = FeatureEngine.from_columnar(self.raw_buffer, meas_type)
+            self._term_matrix = None
 
-        return result
+        if self._term_matrix is None or self._term_matrix.matrix.shape[0] != row_count:
+            self._term_matrix = self._build_term_matrix(engine, meas_type, el_nmb)
+        return self._term_matrix
 
     def _fill_feature_column(self, col_index: int, values: list):
         """Заполняет колонки признаков в data_table"""
@@ -843,6 +1454,191 @@ class RegressionPage(QWidget):
                 self.data_table.setItem(row_idx, 2 + col_index, QTableWidgetItem(f"{val:.6g}"))
 
     def save_equation(self):
-        """Сохранение уравнения - заглушка"""
-        print("Сохранение уравнения...")
-        QMessageBox.information(self, "Info", "Сохранение уравнения будет реализовано позже")
+        """Записывает коэффициенты и члены уравнения (текущего или пакетного пересчёта) в PR_SET"""
+        current = self._current_equation()
+        batch = [
+            {"el_nmb": r["el_nmb"], "meas_type": r["meas_type"], "coefficients": r["coefficients"],
+             "terms": r["terms"], "pr_nmb": r["pr_set_row"]["pr_nmb"], "mdl_nmb": r["pr_set_row"]["mdl_nmb"]}
+            for r in self._batch_results if r["coefficients"] is not None
+        ]
+        if current is None and not batch:
+            QMessageBox.warning(self, "Ошибка", "Нет рассчитанного уравнения для сохранения.")
+            return
+
+        dialog = SaveEquationDialog(self, current, len(batch))
+        if dialog.exec() != QDialog.Accepted:
+            return
+
+        try:
+            use_batch, product_numbers, model_numbers = dialog.get_data()
+        except ValueError as e:
+            QMessageBox.warning(self, "Ошибка ввода", f"Некорректный формат ввода:\n{str(e)}")
+            return
+
+        equations = batch if use_batch else [current]
+        try:
+            saved = self._write_equations(equations, product_numbers, model_numbers)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка сохранения уравнения:\n{str(e)}")
+            return
+
+        QMessageBox.information(self, "Успех",
+                                f"Сохранено уравнений: {len(equations)}, записей PR_SET: {saved}")
+
+    def _current_equation(self):
+        """Уравнение загруженного элемента: коэффициенты и члены; None - не рассчитано"""
+        if self._pr_set_row is None or self._coefficients is None or not getattr(self, 'raw_buffer', None):
+            return None
+
+        return {
+            "el_nmb": self._pr_set_row["el_nmb"],
+            "meas_type": self._pr_set_row["meas_type"],
+            "coefficients": self._table_coefficients(),
+            "terms": [combo.currentText().strip() or "-" for combo in self.combo_equation_terms],
+            "pr_nmb": self._pr_set_row["pr_nmb"],
+            "mdl_nmb": self._pr_set_row["mdl_nmb"],
+        }
+
+    def _table_coefficients(self) -> np.ndarray:
+        """
+        A0..A5 из таблицы коэффициентов. Таблица показывает значения с округлением,
+        поэтому для неизменённых ячеек берётся точный результат расчёта,
+        а исправленные вручную имеют приоритет.
+        """
+        coefficients = self._coefficients.copy() if self._coefficients is not None else np.zeros(6)
+        for i in range(6):
+            item = self.coeff_table.item(i, 2)
+            text = item.text() if item else ""
+            if text and text != f"{coefficients[i]:.6g}":
+                try:
+                    coefficients[i] = float(text.replace(",", "."))
+                except ValueError:
+                    pass
+        return coefficients
+
+    @staticmethod
+    def _equation_update_query(meas_type):
+        """UPDATE коэффициентов A0..A5 и членов уравнения PR_SET для типа градуировки"""
+        suffix = "i" if meas_type == 0 else "c"
+        fields = [f"k_{suffix}_alin00 = ?"]
+        for i in range(1, 6):
+            fields.append(f"k_{suffix}_alin{i:02d} = ?, operand_{suffix}_01_{i:02d} = ?, "
+                          f"operand_{suffix}_02_{i:02d} = ?, operator_{suffix}_{i:02d} = ?")
+        return f"""
+        UPDATE pr_set SET
+        {", ".join(fields)}
+        WHERE pr_nmb = ? AND mdl_nmb = ? AND el_nmb = ?
+        """
+
+    @staticmethod
+    def _equation_values(equation):
+        """Значения для _equation_update_query: A0, затем (Ai, x1, x2, op) для i = 1..5"""
+        term_lookup = {
+            term["description"].strip(): term
+            for term in load_interaction_terms(equation["meas_type"], equation["el_nmb"])
+        }
+        coefficients = equation["coefficients"]
+        values = [float(coefficients[0])]
+        for i, desc in enumerate(equation["terms"], start=1):
+            term = term_lookup.get(desc)
+            if term is None:
+                # Член не задан - нулевой коэффициент и пустые операнды
+                values.extend([0.0, 0, 0, 0])
+            else:
+                values.extend([float(coefficients[i]), term["x1"], term["x2"], term["op"]])
+        return values
+
+    def _write_equations(self, equations, product_numbers=None, model_numbers=None):
+        """
+        Записывает уравнения в PR_SET одной транзакцией: один пакетный UPDATE
+        на тип градуировки. Без списков продуктов/моделей каждое уравнение
+        пишется в свою активную модель, иначе - во все сочетания продукт × модель.
+        Возвращает количество записанных наборов параметров.
+        """
+        rows_by_type = {}
+        for equation in equations:
+            values = self._equation_values(equation)
+            if product_numbers and model_numbers:
+                targets = [(pr_nmb, mdl_nmb) for pr_nmb in product_numbers for mdl_nmb in model_numbers]
+            else:
+                targets = [(equation["pr_nmb"], equation["mdl_nmb"])]
+            for pr_nmb, mdl_nmb in targets:
+                rows_by_type.setdefault(equation["meas_type"], []).append(
+                    values + [pr_nmb, mdl_nmb, equation["el_nmb"]]
+                )
+
+        saved = 0
+        with self.db.transaction() as session:
+            for meas_type, param_rows in rows_by_type.items():
+                saved += session.execute_many(self._equation_update_query(meas_type), param_rows)
+        return saved
+
+
+class SaveEquationDialog(QDialog):
+    """Диалог сохранения уравнения: что сохранять и (необязательно) для каких продуктов и моделей"""
+
+    def __init__(self, parent, current, batch_count):
+        super().__init__(parent)
+        self.setWindowTitle("Сохранение уравнения в PR_SET")
+        self.setModal(True)
+        self.resize(420, 280)
+
+        layout = QVBoxLayout(self)
+
+        # Что сохранять
+        source_group = QGroupBox("Что сохранять?")
+        source_layout = QVBoxLayout()
+        self.current_radio = QRadioButton("Уравнение текущего элемента")
+        self.batch_radio = QRadioButton(f"Результаты пакетного пересчёта (элементов: {batch_count})")
+        self.current_radio.setEnabled(current is not None)
+        self.batch_radio.setEnabled(batch_count > 0)
+        (self.current_radio if current is not None else self.batch_radio).setChecked(True)
+        source_layout.addWidget(self.current_radio)
+        source_layout.addWidget(self.batch_radio)
+        source_group.setLayout(source_layout)
+
+        # Куда сохранять: по умолчанию - в активную модель каждого элемента
+        self.targets_group = QGroupBox("Применить для продуктов и моделей")
+        self.targets_group.setCheckable(True)
+        self.targets_group.setChecked(False)
+        targets_layout = QFormLayout()
+        self.products_edit = QLineEdit(str(current["pr_nmb"]) if current else "")
+        self.products_edit.setPlaceholderText("например: 1,2,3")
+        self.models_edit = QLineEdit(str(current["mdl_nmb"]) if current else "")
+        self.models_edit.setPlaceholderText("например: 1,2")
+        targets_layout.addRow("Номера продуктов:", self.products_edit)
+        targets_layout.addRow("Номера моделей:", self.models_edit)
+        self.targets_group.setLayout(targets_layout)
+
+        self.button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        self.button_box.accepted.connect(self.accept)
+        self.button_box.rejected.connect(self.reject)
+        self.button_box.button(QDialogButtonBox.Ok).setText("Сохранить")
+        self.button_box.button(QDialogButtonBox.Cancel).setText("Отмена")
+
+        layout.addWidget(source_group)
+        layout.addWidget(self.targets_group)
+        layout.addWidget(self.button_box)
+
+    @staticmethod
+    def _parse_numbers(text, what):
+        numbers = []
+        for part in text.split(','):
+            num = int(part.strip())
+            if num < 1:
+                raise ValueError(f"Номера {what} должны быть положительными целыми числами.")
+            numbers.append(num)
+        return numbers
+
+    def get_data(self):
+        """(сохранять пакетный пересчёт, номера продуктов, номера моделей); списки None - в активные модели"""
+        use_batch = self.batch_radio.isChecked()
+        if not self.targets_group.isChecked():
+            return use_batch, None, None
+
+        products_text = self.products_edit.text().strip()
+        models_text = self.models_edit.text().strip()
+        if not products_text or not models_text:
+            raise ValueError("Необходимо заполнить оба поля.")
+        return (use_batch, self._parse_numbers(products_text, "продуктов"),
+                self._parse_numbers(models_text, "моделей"))
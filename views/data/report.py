@@ -1,17 +1,21 @@
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QTableWidget, QPushButton, QLabel,
+    QWidget, QVBoxLayout, QTableView, QPushButton, QLabel,
     QHBoxLayout, QComboBox, QDateTimeEdit, QMessageBox,
-    QHeaderView, QScrollArea, QTableWidgetItem, QProgressDialog,
+    QHeaderView, QScrollArea, QProgressDialog,
     QTimeEdit, QGroupBox, QFileDialog
 )
-from PySide6.QtCore import Qt, QDateTime, QTime
+from PySide6.QtCore import Qt, QDateTime, QTime, QAbstractTableModel, QModelIndex
 from PySide6.QtGui import QFontMetrics, QColor, QFont
 from database.db import Database
 import math
 import json
+import numpy as np
 from pathlib import Path
-import statistics
 from utils.path_manager import get_config_path
+from utils.query_executor import BusyIndicator, current_token
+from utils.feature_engine import CompiledEquation, FeatureEngine
+from utils.report_statistics import MIN_VALID_COUNT, ReportData
+from utils.report_export import export_report_csv, export_report_npz, format_meas_dt
 
 class TimeEdit15Min(QTimeEdit):
     """Кастомный QTimeEdit с шагом 15 минут"""
@@ -45,13 +49,174 @@ class TimeEdit15Min(QTimeEdit):
         self.setTime(QTime(hours, new_minutes))
 
 
+class ReportTableModel(QAbstractTableModel):
+    """
+    Модель таблицы отчета: строки статистики, строка-разделитель и строки данных.
+
+    Для строк данных элементы таблицы не создаются: текст, выравнивание
+    и подсветка ячейки формируются в data() из массивов ReportData,
+    то есть только для строк, которые показывает представление.
+    """
+
+    STATISTICS_NAMES = ["Среднее", "СКО", "Норматив", "Вывод"]
+    SEPARATOR_ROW = 4
+    DATA_START_ROW = 5
+
+    SEPARATOR_COLOR = QColor(220, 220, 220)  # Серый фон
+    HIGHLIGHT_COLOR = QColor(255, 255, 200)  # Подсветка больших отклонений
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._elements = []
+        self._report_data = None
+        self._deltas = None
+        self._relatives = None
+        self._statistics = {}  # (строка, столбец) -> (текст, цвет фона или None)
+        self._bold_font = QFont()
+        self._bold_font.setBold(True)
+
+    @property
+    def elements(self) -> list:
+        return list(self._elements)
+
+    @property
+    def report_data(self):
+        return self._report_data
+
+    def set_elements(self, elements):
+        """Задает элементы (столбцы) отчета"""
+        self.beginResetModel()
+        self._elements = list(elements)
+        self.endResetModel()
+
+    def set_report_data(self, report_data):
+        """Показывает данные отчета (None - пустая таблица)"""
+        self.beginResetModel()
+        self._report_data = report_data
+        self._statistics = {}
+        if report_data is not None:
+            self._deltas = report_data.delta
+            self._relatives = report_data.relative
+        else:
+            self._deltas = self._relatives = None
+        self.endResetModel()
+
+    def append_report_data(self, report_data):
+        """Дописывает в конец таблицы очередную загруженную часть отчета"""
+        if self._report_data is None:
+            self.set_report_data(report_data)
+            return
+        if not len(report_data):
+            return
+        first = self.rowCount()
+        self.beginInsertRows(QModelIndex(), first, first + len(report_data) - 1)
+        self._report_data.extend(report_data)
+        self._deltas = np.concatenate([self._deltas, report_data.delta])
+        self._relatives = np.concatenate([self._relatives, report_data.relative])
+        self.endInsertRows()
+
+    def set_statistics_cell(self, row, column, text, background=None):
+        """Записывает ячейку строки статистики; отображение обновляет statistics_changed()"""
+        self._statistics[(row, column)] = (text, background)
+
+    def statistics_changed(self):
+        if self.rowCount() and self.columnCount():
+            self.dataChanged.emit(self.index(0, 0), self.index(self.SEPARATOR_ROW - 1, self.columnCount() - 1))
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self._report_data is None:
+            return 0
+        return self.DATA_START_ROW + len(self._report_data)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 1 + len(self._elements) * 4
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation != Qt.Horizontal or role != Qt.DisplayRole:
+            return None
+        if section == 0:
+            return "Время цикла"
+        element = self._elements[(section - 1) // 4]
+        return [
+            f"С расч ({element})",
+            f"С хим ({element})",
+            f"ΔC ({element})",
+            f"ΔC/С хим ({element}) %"
+        ][(section - 1) % 4]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row, column = index.row(), index.column()
+        if row < self.SEPARATOR_ROW:
+            return self._statistics_data(row, column, role)
+        if row == self.SEPARATOR_ROW:
+            if role == Qt.BackgroundRole:
+                return self.SEPARATOR_COLOR
+            return "" if role == Qt.DisplayRole else None
+        return self._measurement_data(row - self.DATA_START_ROW, column, role)
+
+    def _statistics_data(self, row, column, role):
+        if column == 0:
+            if role == Qt.DisplayRole:
+                return self.STATISTICS_NAMES[row]
+            return self._bold_font if role == Qt.FontRole else None
+
+        text, background = self._statistics.get((row, column), ("", None))
+        if role == Qt.DisplayRole:
+            return text
+        if role == Qt.BackgroundRole:
+            return background
+        return None
+
+    def _measurement_data(self, data_row, column, role):
+        report_data = self._report_data
+        if column == 0:
+            return format_meas_dt(report_data.meas_dt[data_row]) if role == Qt.DisplayRole else None
+
+        element, kind = divmod(column - 1, 4)
+        if element >= report_data.element_count:
+            return None
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignRight | Qt.AlignVCenter
+        if role not in (Qt.DisplayRole, Qt.BackgroundRole):
+            return None
+
+        # С расч
+        if kind == 0:
+            return f"{report_data.calculated[data_row, element]:.4f}" if role == Qt.DisplayRole else None
+
+        # Если С хим равно нулю, ставим прочерки
+        c_chem = report_data.chemical[data_row, element]
+        if math.isnan(c_chem):
+            return "-" if role == Qt.DisplayRole else None
+
+        if kind == 1:
+            return f"{c_chem:.4f}" if role == Qt.DisplayRole else None
+        if kind == 2:
+            delta_c = self._deltas[data_row, element]
+            if role == Qt.DisplayRole:
+                return f"{delta_c:.4f}"
+            return self.HIGHLIGHT_COLOR if abs(delta_c) > 0.1 else None
+
+        delta_percent = round(float(self._relatives[data_row, element]))
+        if role == Qt.DisplayRole:
+            return f"{delta_percent:.0f}%"
+        return self.HIGHLIGHT_COLOR if abs(delta_percent) > 10 else None
+
+
 class ReportPage(QWidget):
     """Виджет для формирования и экспорта отчетов"""
 
+    REPORT_BATCH_ROWS = 5000  # строк PR_MEAS в одной пачке загрузки отчета
+
     def __init__(self, db: Database):
         super().__init__()
         self.db = db
         self.original_data = {}
+        self._report_data = None  # числовые данные строк отчета (ReportData)
+        self._normatives = {}  # нормативы set08 загруженного отчета
         self._config_dir = get_config_path()
         self.init_ui()
         self.setup_connections()
@@ -116,13 +281,10 @@ class ReportPage(QWidget):
     def get_normatives_from_db(self, pr_nmb: int):
         """Получает нормативы из таблицы set08 для указанного продукта"""
         try:
-            query = """
-            SELECT el_nmb, delta_c_01, delta_c_02 
-            FROM set08 
-            WHERE pr_nmb = ?
-            ORDER BY el_nmb
-            """
-            normatives = self.db.fetch_all(query, [pr_nmb])
+            normatives = self.db.reference.where(
+                "set08", columns=["pr_nmb", "el_nmb", "delta_c_01", "delta_c_02"],
+                order_by="pr_nmb, el_nmb", pr_nmb=pr_nmb
+            )
 
             # Преобразуем в удобный формат: {el_nmb: (delta_c_01, delta_c_02)}
             normative_dict = {}
@@ -157,17 +319,21 @@ class ReportPage(QWidget):
         self.date_to.setStyleSheet("")
         return True
 
-    def init_table(self) -> QTableWidget:
-        """Инициализация таблицы с данными"""
-        table = QTableWidget()
-        table.setEditTriggers(QTableWidget.NoEditTriggers)
-        table.setSelectionMode(QTableWidget.SingleSelection)
-        table.setHorizontalScrollMode(QTableWidget.ScrollPerPixel)
-        table.setVerticalScrollMode(QTableWidget.ScrollPerPixel)
+    def init_table(self) -> QTableView:
+        """Инициализация таблицы с данными (представление модели ReportTableModel)"""
+        self.table_model = ReportTableModel(self)
+        table = QTableView()
+        table.setModel(self.table_model)
+        table.setEditTriggers(QTableView.NoEditTriggers)
+        table.setSelectionMode(QTableView.ExtendedSelection)
+        table.setHorizontalScrollMode(QTableView.ScrollPerPixel)
+        table.setVerticalScrollMode(QTableView.ScrollPerPixel)
         table.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         table.verticalHeader().setVisible(False)  # Выключаем вертикальные заголовки
+        # Одинаковая высота строк - представлению не нужно измерять каждую строку
+        table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         # Разрешаем выбор строк
-        table.setSelectionBehavior(QTableWidget.SelectRows)
+        table.setSelectionBehavior(QTableView.SelectRows)
         return table
 
     def configure_table(self):
@@ -176,18 +342,10 @@ class ReportPage(QWidget):
 
         # Столбцы: Время цикла + для каждого элемента: С расч, С хим, ΔC, ΔC/С хим (%)
         column_count = 1 + len(elements) * 4  # Убрали столбец "Модель"
-        self.table.clear()
-        self.table.setColumnCount(column_count)
-
-        headers = ["Время цикла"]  # Убрали "Модель"
-        for element in elements:
-            headers.extend([
-                f"С расч ({element})",
-                f"С хим ({element})",
-                f"ΔC ({element})",
-                f"ΔC/С хим ({element}) %"
-            ])
-        self.table.setHorizontalHeaderLabels(headers)
+        if elements != self.table_model.elements:
+            # Загруженный отчет построен по прежнему списку элементов
+            self._clear_report()
+            self.table_model.set_elements(elements)
 
         # Устанавливаем ширину столбцов
         time_width = QFontMetrics(self.font()).horizontalAdvance("Время цикла") + 20
@@ -259,13 +417,10 @@ class ReportPage(QWidget):
     def get_active_model_coefficients(self, pr_nmb: int):
         """Получает коэффициенты активной модели"""
         try:
-            # Находим активную модель
-            active_model_query = """
-            SELECT DISTINCT mdl_nmb 
-            FROM PR_SET 
-            WHERE pr_nmb = ? AND active_model = 1
-            """
-            active_model_result = self.db.fetch_one(active_model_query, [pr_nmb])
+            # Находим активную модель (PR_SET берётся из кэша справочников)
+            active_model_result = self.db.reference.first(
+                "PR_SET", order_by="pr_nmb, mdl_nmb, el_nmb", pr_nmb=pr_nmb, active_model=1
+            )
 
             if not active_model_result:
                 return None, None
@@ -273,28 +428,9 @@ class ReportPage(QWidget):
             active_model = active_model_result['mdl_nmb']
 
             # Получаем все коэффициенты для активной модели
-            coefficients_query = """
-            SELECT 
-                el_nmb, meas_type,
-                k_i_alin00, k_i_alin01, k_i_alin02, k_i_alin03, k_i_alin04, k_i_alin05,
-                k_i_klin00, k_i_klin01,
-                operand_i_01_01, operand_i_02_01, operator_i_01,
-                operand_i_01_02, operand_i_02_02, operator_i_02,
-                operand_i_01_03, operand_i_02_03, operator_i_03,
-                operand_i_01_04, operand_i_02_04, operator_i_04,
-                operand_i_01_05, operand_i_02_05, operator_i_05,
-                k_c_alin00, k_c_alin01, k_c_alin02, k_c_alin03, k_c_alin04, k_c_alin05,
-                k_c_klin00, k_c_klin01,
-                operand_c_01_01, operand_c_02_01, operator_c_01,
-                operand_c_01_02, operand_c_02_02, operator_c_02,
-                operand_c_01_03, operand_c_02_03, operator_c_03,
-                operand_c_01_04, operand_c_02_04, operator_c_04,
-                operand_c_01_05, operand_c_02_05, operator_c_05
-            FROM PR_SET 
-            WHERE pr_nmb = ? AND mdl_nmb = ?
-            ORDER BY el_nmb
-            """
-            coefficients = self.db.fetch_all(coefficients_query, [pr_nmb, active_model])
+            coefficients = self.db.reference.where(
+                "PR_SET", order_by="pr_nmb, mdl_nmb, el_nmb", pr_nmb=pr_nmb, mdl_nmb=active_model
+            )
 
             if not coefficients:
                 return active_model, None
@@ -305,391 +441,134 @@ class ReportPage(QWidget):
             print(f"Ошибка получения коэффициентов активной модели: {str(e)}")
             return None, None
 
-    def calculate_operation(self, operand1, operand2, operator, row_data, is_intensity=True):
-        """Вычисляет операцию согласно логике хранимой процедуры"""
-        try:
-            if is_intensity:
-                # Для интенсивностей: i_00_00 до i_00_19
-                val1 = self.safe_float(row_data.get(f'i_00_{operand1:02d}'))
-                val2 = self.safe_float(row_data.get(f'i_00_{operand2:02d}'))
-            else:
-                # Для концентраций: c_01 до c_08 (в PR_SET нумерация с 0, в данных с 1)
-                element_num1 = operand1 + 1
-                element_num2 = operand2 + 1
-                val1 = self.safe_float(row_data.get(f'c_{element_num1:02d}'))
-                val2 = self.safe_float(row_data.get(f'c_{element_num2:02d}'))
-
-            # Применяем оператор согласно логике хранимой процедуры
-            if operator == 0:  # operand1 * 0 * operand2
-                result = val1 * 0 * val2
-            elif operator == 1:  # operand1 * 1
-                result = val1 * 1
-            elif operator == 2:  # operand1 * operand2
-                result = val1 * val2
-            elif operator == 3:  # operand1 / operand2
-                result = val1 / val2 if val2 != 0 else 0
-            elif operator == 4:  # operand1 * operand1 (квадрат)
-                result = val1 * val1
-            elif operator == 5:  # 1 / operand1
-                result = 1 / val1 if val1 != 0 else 0
-            elif operator == 6:  # operand1 / (operand2 * operand2)
-                denominator = val2 * val2
-                result = val1 / denominator if denominator != 0 else 0
-            elif operator == 7:  # 1 / (operand1 * operand1)
-                denominator = val1 * val1
-                result = 1 / denominator if denominator != 0 else 0
-            else:
-                result = 0
-
-            return result
-
-        except Exception as e:
-            print(f"Ошибка вычисления операции: {str(e)}")
-            return 0
-
-    def calculate_concentration(self, row_data, coeffs, element_num):
-        """Расчет концентрации по алгоритму хранимой процедуры"""
-        try:
-            meas_type = self.safe_int(coeffs.get('meas_type'))
-            is_intensity = (meas_type == 0)
-
-            if is_intensity:
-                # Коэффициенты для ИНТЕНСИВНОСТЕЙ (meas_type = 0)
-                k_alin00 = self.safe_float(coeffs.get('k_i_alin00'))
-                k_alin01 = self.safe_float(coeffs.get('k_i_alin01'))
-                k_alin02 = self.safe_float(coeffs.get('k_i_alin02'))
-                k_alin03 = self.safe_float(coeffs.get('k_i_alin03'))
-                k_alin04 = self.safe_float(coeffs.get('k_i_alin04'))
-                k_alin05 = self.safe_float(coeffs.get('k_i_alin05'))
-                k_klin00 = self.safe_float(coeffs.get('k_i_klin00'))
-                k_klin01 = self.safe_float(coeffs.get('k_i_klin01'))
-
-                # Операторы для ИНТЕНСИВНОСТЕЙ
-                op_01_01 = self.safe_int(coeffs.get('operand_i_01_01'))
-                op_02_01 = self.safe_int(coeffs.get('operand_i_02_01'))
-                oper_01 = self.safe_int(coeffs.get('operator_i_01'))
-                op_01_02 = self.safe_int(coeffs.get('operand_i_01_02'))
-                op_02_02 = self.safe_int(coeffs.get('operand_i_02_02'))
-                oper_02 = self.safe_int(coeffs.get('operator_i_02'))
-                op_01_03 = self.safe_int(coeffs.get('operand_i_01_03'))
-                op_02_03 = self.safe_int(coeffs.get('operand_i_02_03'))
-                oper_03 = self.safe_int(coeffs.get('operator_i_03'))
-                op_01_04 = self.safe_int(coeffs.get('operand_i_01_04'))
-                op_02_04 = self.safe_int(coeffs.get('operand_i_02_04'))
-                oper_04 = self.safe_int(coeffs.get('operator_i_04'))
-                op_01_05 = self.safe_int(coeffs.get('operand_i_01_05'))
-                op_02_05 = self.safe_int(coeffs.get('operand_i_02_05'))
-                oper_05 = self.safe_int(coeffs.get('operator_i_05'))
-
-            else:
-                # Коэффициенты для КОНЦЕНТРАЦИЙ (meas_type = 1)
-                k_alin00 = self.safe_float(coeffs.get('k_c_alin00'))
-                k_alin01 = self.safe_float(coeffs.get('k_c_alin01'))
-                k_alin02 = self.safe_float(coeffs.get('k_c_alin02'))
-                k_alin03 = self.safe_float(coeffs.get('k_c_alin03'))
-                k_alin04 = self.safe_float(coeffs.get('k_c_alin04'))
-                k_alin05 = self.safe_float(coeffs.get('k_c_alin05'))
-                k_klin00 = self.safe_float(coeffs.get('k_c_klin00'))
-                k_klin01 = self.safe_float(coeffs.get('k_c_klin01'))
-
-                # Операторы для КОНЦЕНТРАЦИЙ
-                op_01_01 = self.safe_int(coeffs.get('operand_c_01_01'))
-                op_02_01 = self.safe_int(coeffs.get('operand_c_02_01'))
-                oper_01 = self.safe_int(coeffs.get('operator_c_01'))
-                op_01_02 = self.safe_int(coeffs.get('operand_c_01_02'))
-                op_02_02 = self.safe_int(coeffs.get('operand_c_02_02'))
-                oper_02 = self.safe_int(coeffs.get('operator_c_02'))
-                op_01_03 = self.safe_int(coeffs.get('operand_c_01_03'))
-                op_02_03 = self.safe_int(coeffs.get('operand_c_02_03'))
-                oper_03 = self.safe_int(coeffs.get('operator_c_03'))
-                op_01_04 = self.safe_int(coeffs.get('operand_c_01_04'))
-                op_02_04 = self.safe_int(coeffs.get('operand_c_02_04'))
-                oper_04 = self.safe_int(coeffs.get('operator_c_04'))
-                op_01_05 = self.safe_int(coeffs.get('operand_c_01_05'))
-                op_02_05 = self.safe_int(coeffs.get('operand_c_02_05'))
-                oper_05 = self.safe_int(coeffs.get('operator_c_05'))
-
-            # Вычисляем все операции
-            oper_result_01 = self.calculate_operation(op_01_01, op_02_01, oper_01, row_data, is_intensity)
-            oper_result_02 = self.calculate_operation(op_01_02, op_02_02, oper_02, row_data, is_intensity)
-            oper_result_03 = self.calculate_operation(op_01_03, op_02_03, oper_03, row_data, is_intensity)
-            oper_result_04 = self.calculate_operation(op_01_04, op_02_04, oper_04, row_data, is_intensity)
-            oper_result_05 = self.calculate_operation(op_01_05, op_02_05, oper_05, row_data, is_intensity)
-
-            # Расчет концентрации
-            c = (k_alin00 +
-                 k_alin01 * oper_result_01 +
-                 k_alin02 * oper_result_02 +
-                 k_alin03 * oper_result_03 +
-                 k_alin04 * oper_result_04 +
-                 k_alin05 * oper_result_05)
-
-            # Расчет скорректированной концентрации
-            c_cor = k_klin00 + k_klin01 * c
-
-            return c_cor
-
-        except Exception as e:
-            print(f"Ошибка расчета концентрации для элемента {element_num}: {str(e)}")
-            return 0
-
-    def calculate_statistics_from_table_data(self, elements, data_start_row):
-        """Расчет статистики из данных таблицы (начиная с указанной строки)"""
-        stats = {}
-
-        for col_idx, element in enumerate(elements):
-            element_stats = {
-                'calculated': [],
-                'chemical': [],
-                'deltas': [],
-                'relative_deltas': [],
-                'valid_count': 0  # Добавляем счетчик валидных значений
-            }
-
-            col_base = 1 + col_idx * 4
-
-            for row in range(data_start_row, self.table.rowCount()):
-                try:
-                    calc_item = self.table.item(row, col_base)
-                    chem_item = self.table.item(row, col_base + 1)
-                    delta_item = self.table.item(row, col_base + 2)
-                    relative_item = self.table.item(row, col_base + 3)
-
-                    if calc_item and chem_item and chem_item.text() != "-":
-                        # Только если С хим не прочерк
-                        c_calc = float(calc_item.text())
-                        c_chem = float(chem_item.text())
-
-                        # Проверяем что delta_item не прочерк
-                        if delta_item and delta_item.text() != "-":
-                            delta = float(delta_item.text())
-                        else:
-                            delta = 0
-
-                        # Проверяем что relative_item не прочерк
-                        if relative_item and relative_item.text() != "-":
-                            relative_text = relative_item.text().replace('%', '').strip()
-                            if relative_text != "-":
-                                relative_percent = float(relative_text)
-                            else:
-                                relative_percent = 0
-                        else:
-                            relative_percent = 0
-
-                        element_stats['calculated'].append(c_calc)
-                        element_stats['chemical'].append(c_chem)
-                        element_stats['deltas'].append(delta)
-                        element_stats['relative_deltas'].append(relative_percent)
-                        element_stats['valid_count'] += 1
-
-                except (ValueError, AttributeError) as e:
-                    continue
-
-            stats[element] = element_stats
+    def calculate_concentrations(self, sample, coefficients) -> dict:
+        """
+        C_расч (c_cor) по уравнениям активной модели для всех строк выборки
+        (части отчёта).
+
+        Каждое уравнение PR_SET компилируется один раз и считается по всей
+        выборке сразу. Возвращает {номер элемента: массив значений по строкам}.
+        """
+        engines = {}
+        calculated = {}
+        for element_coeffs in coefficients:
+            element_num = element_coeffs['el_nmb']
+            if element_num in calculated:
+                continue
+            try:
+                equation = CompiledEquation.from_pr_set(element_coeffs)
+                if equation.meas_type not in engines:
+                    engines[equation.meas_type] = FeatureEngine.from_columnar(sample, equation.meas_type)
+                calculated[element_num] = equation.evaluate_corrected(engines[equation.meas_type])
+            except Exception as e:
+                print(f"Ошибка расчета концентрации для элемента {element_num}: {str(e)}")
+        return calculated
+
+    def calculate_statistics(self, elements) -> dict:
+        """
+        Статистика по элементам из числовых данных отчета (без разбора текста таблицы).
+        Возвращает {имя элемента: статистика ReportData.statistics()}.
+        """
+        if self._report_data is None:
+            return {}
 
-        return stats
+        element_stats = self._report_data.statistics()
+        return {element: element_stats[i] for i, element in enumerate(elements[:len(element_stats)])}
 
-    def add_statistics_rows(self, stats, elements, normatives, pr_nmb, data_start_row, total_rows):
-        """Добавляет строки статистики в основную таблицу с учетом нормативов из БД и F-критерия"""
-        # Создаем жирный шрифт
-        bold_font = QFont()
-        bold_font.setBold(True)
+    def _set_statistics_cells(self, row, col_base, cells):
+        """Записывает четыре ячейки строки статистики элемента (текст или (текст, цвет фона))"""
+        for offset, cell in enumerate(cells):
+            text, background = cell if isinstance(cell, tuple) else (cell, None)
+            self.table_model.set_statistics_cell(row, col_base + offset, text, background)
 
+    def _fill_statistics_rows(self, stats, elements, normatives, row_count):
+        """Заполняет строки «Среднее», «СКО», «Норматив», «Вывод» с учетом нормативов из БД и F-критерия"""
         # Цвета для подсветки
         light_green = QColor(200, 255, 200)  # Светло-зеленый
         light_red = QColor(255, 200, 200)  # Светло-красный
 
-        # Количество наблюдений для расчета F-критерия
-        n = total_rows - data_start_row  # количество наблюдений
-        if n < 2:
-            n = 2  # минимальное значение для расчета СКО
-
-        # Получаем табличное значение F
-        f_critical = self.get_f_critical_value(n)
+        # Табличное значение F по количеству наблюдений (минимум 2 для расчета СКО)
+        f_critical = self.get_f_critical_value(max(row_count, 2))
 
         for col_idx, element in enumerate(elements):
             element_num = col_idx + 1  # Номер элемента (начинается с 1)
+            col_base = 1 + col_idx * 4  # 1 - потому что первый столбец "Время цикла"
 
             if element not in stats:
                 # Если элемента нет в статистике, ставим прочерки
-                col_base = 1 + col_idx * 4
-                self.table.setItem(0, col_base, QTableWidgetItem("-"))  # Ср.расч
-                self.table.setItem(0, col_base + 1, QTableWidgetItem("-"))  # С хим
-                self.table.setItem(0, col_base + 2, QTableWidgetItem("-"))  # ΔC
-                self.table.setItem(0, col_base + 3, QTableWidgetItem("-"))  # Отн.ΔC%
-
-                self.table.setItem(1, col_base, QTableWidgetItem(""))
-                self.table.setItem(1, col_base + 1, QTableWidgetItem(""))
-                self.table.setItem(1, col_base + 2, QTableWidgetItem("-"))  # СКО ΔC
-                self.table.setItem(1, col_base + 3, QTableWidgetItem("-"))  # СКО Отн.ΔC%
-
-                self.table.setItem(3, col_base, QTableWidgetItem(""))
-                self.table.setItem(3, col_base + 1, QTableWidgetItem(""))
-                self.table.setItem(3, col_base + 2, QTableWidgetItem("-"))  # Вывод ΔC
-                self.table.setItem(3, col_base + 3, QTableWidgetItem("-"))  # Вывод Отн.ΔC%
+                self._set_statistics_cells(0, col_base, ["-", "-", "-", "-"])
+                self._set_statistics_cells(1, col_base, ["", "", "-", "-"])
+                self._set_statistics_cells(3, col_base, ["", "", "-", "-"])
                 continue
 
             element_stats = stats[element]
-            col_base = 1 + col_idx * 4  # 1 - потому что первый столбец "Время цикла"
 
-            # Получаем нормативы для текущего элемента и продукта
-            normative_delta_c_01 = 0.0  # значение по умолчанию
-            normative_delta_c_02 = 0.0  # значение по умолчанию
+            # Нормативы для текущего элемента и продукта
+            normative_delta_c_01, normative_delta_c_02 = normatives.get(element_num, (0.0, 0.0))
 
-            if element_num in normatives:
-                normative_delta_c_01, normative_delta_c_02 = normatives[element_num]
+            # Строка "Норматив" (строка 2) - из БД
+            self._set_statistics_cells(2, col_base, [
+                "", "",
+                f"{normative_delta_c_01:.4f}" if normative_delta_c_01 > 0 else "-",
+                f"{normative_delta_c_02:.0f}%" if normative_delta_c_02 > 0 else "-"
+            ])
 
             # ПРОВЕРКА: достаточно ли данных для статистики (минимум 5 ненулевых С хим)
-            if element_stats['valid_count'] < 5:
-                # Недостаточно данных - ставим прочерки ВО ВСЕХ полях статистики
-                self.table.setItem(0, col_base, QTableWidgetItem("-"))  # Ср.расч
-                self.table.setItem(0, col_base + 1, QTableWidgetItem("-"))  # С хим
-                self.table.setItem(0, col_base + 2, QTableWidgetItem("-"))  # ΔC
-                self.table.setItem(0, col_base + 3, QTableWidgetItem("-"))  # Отн.ΔC%
-
-                self.table.setItem(1, col_base, QTableWidgetItem(""))
-                self.table.setItem(1, col_base + 1, QTableWidgetItem(""))
-                self.table.setItem(1, col_base + 2, QTableWidgetItem("-"))  # СКО ΔC
-                self.table.setItem(1, col_base + 3, QTableWidgetItem("-"))  # СКО Отн.ΔC%
-
-                # Обновляем строку "Норматив" (строка 2)
-                self.table.setItem(2, col_base, QTableWidgetItem(""))
-                self.table.setItem(2, col_base + 1, QTableWidgetItem(""))
-                self.table.setItem(2, col_base + 2,
-                                   QTableWidgetItem(f"{normative_delta_c_01:.4f}" if normative_delta_c_01 > 0 else "-"))
-                self.table.setItem(2, col_base + 3,
-                                   QTableWidgetItem(
-                                       f"{normative_delta_c_02:.0f}%" if normative_delta_c_02 > 0 else "-"))
-
-                self.table.setItem(3, col_base, QTableWidgetItem(""))
-                self.table.setItem(3, col_base + 1, QTableWidgetItem(""))
-                self.table.setItem(3, col_base + 2, QTableWidgetItem("-"))  # Вывод ΔC
-                self.table.setItem(3, col_base + 3, QTableWidgetItem("-"))  # Вывод Отн.ΔC%
-                continue  # Переходим к следующему элементу
-
-            # Средние значения - считаем ТОЛЬКО по валидным данным (где С хим ≠ 0)
-            if element_stats['calculated'] and element_stats['chemical']:
-                avg_calc = statistics.mean(element_stats['calculated'])
-                avg_chem = statistics.mean(element_stats['chemical'])
-                avg_delta = statistics.mean(element_stats['deltas'])
-                avg_relative = statistics.mean(element_stats['relative_deltas'])
-            else:
-                # Если нет валидных данных, ставим прочерки
-                self.table.setItem(0, col_base, QTableWidgetItem("-"))
-                self.table.setItem(0, col_base + 1, QTableWidgetItem("-"))
-                self.table.setItem(0, col_base + 2, QTableWidgetItem("-"))
-                self.table.setItem(0, col_base + 3, QTableWidgetItem("-"))
-
-                self.table.setItem(1, col_base, QTableWidgetItem(""))
-                self.table.setItem(1, col_base + 1, QTableWidgetItem(""))
-                self.table.setItem(1, col_base + 2, QTableWidgetItem("-"))
-                self.table.setItem(1, col_base + 3, QTableWidgetItem("-"))
-
-                self.table.setItem(3, col_base, QTableWidgetItem(""))
-                self.table.setItem(3, col_base + 1, QTableWidgetItem(""))
-                self.table.setItem(3, col_base + 2, QTableWidgetItem("-"))
-                self.table.setItem(3, col_base + 3, QTableWidgetItem("-"))
+            if element_stats['count'] < MIN_VALID_COUNT:
+                self._set_statistics_cells(0, col_base, ["-", "-", "-", "-"])
+                self._set_statistics_cells(1, col_base, ["", "", "-", "-"])
+                self._set_statistics_cells(3, col_base, ["", "", "-", "-"])
                 continue
 
-            # СКО - считаем ТОЛЬКО если есть хотя бы 2 валидных значения
-            if len(element_stats['deltas']) > 1:
-                std_delta = statistics.stdev(element_stats['deltas'])
-                std_relative = statistics.stdev(element_stats['relative_deltas'])
-            else:
-                # Если недостаточно данных для СКО, ставим прочерки
-                std_delta = 0
-                std_relative = 0
-
-            # Заполняем строку "Среднее" (строка 0)
-            self.table.setItem(0, col_base, QTableWidgetItem(f"{avg_calc:.6f}"))
-            self.table.setItem(0, col_base + 1, QTableWidgetItem(f"{avg_chem:.6f}"))
-            self.table.setItem(0, col_base + 2, QTableWidgetItem(f"{avg_delta:.6f}"))
-            self.table.setItem(0, col_base + 3, QTableWidgetItem(f"{avg_relative:.1f}%"))
-
-            # Заполняем строку "СКО" (строка 1)
-            self.table.setItem(1, col_base, QTableWidgetItem(""))
-            self.table.setItem(1, col_base + 1, QTableWidgetItem(""))
-            if len(element_stats['deltas']) > 1:
-                self.table.setItem(1, col_base + 2, QTableWidgetItem(f"{std_delta:.6f}"))
-                self.table.setItem(1, col_base + 3, QTableWidgetItem(f"{std_relative:.1f}%"))
-            else:
-                self.table.setItem(1, col_base + 2, QTableWidgetItem("-"))
-                self.table.setItem(1, col_base + 3, QTableWidgetItem("-"))
-
-            # Заполняем строку "Норматив" (строка 2) - теперь берем из БД
-            self.table.setItem(2, col_base, QTableWidgetItem(""))
-            self.table.setItem(2, col_base + 1, QTableWidgetItem(""))
-            self.table.setItem(2, col_base + 2,
-                               QTableWidgetItem(f"{normative_delta_c_01:.4f}" if normative_delta_c_01 > 0 else "-"))
-            self.table.setItem(2, col_base + 3,
-                               QTableWidgetItem(f"{normative_delta_c_02:.0f}%" if normative_delta_c_02 > 0 else "-"))
-
-            # Заполняем строку "Вывод" (строка 3) - проверяем по нормативам из БД с F-критерием
+            std_delta = element_stats['std_delta']
+            std_relative = element_stats['std_relative']
+
+            # Строка "Среднее" (строка 0) - только по пробам с С хим
+            self._set_statistics_cells(0, col_base, [
+                f"{element_stats['mean_calc']:.6f}",
+                f"{element_stats['mean_chem']:.6f}",
+                f"{element_stats['mean_delta']:.6f}",
+                f"{element_stats['mean_relative']:.1f}%"
+            ])
+
+            # Строка "СКО" (строка 1)
+            self._set_statistics_cells(1, col_base, ["", "", f"{std_delta:.6f}", f"{std_relative:.1f}%"])
+
+            # Строка "Вывод" (строка 3)
             # Для процентного отношения - простое сравнение
-            if normative_delta_c_02 == 0 or len(element_stats['relative_deltas']) <= 1:
+            if normative_delta_c_02 == 0:
                 relative_status = "-"
                 is_relative_ok = True
             else:
-                is_relative_ok = std_relative <= normative_delta_c_02 if element_stats['relative_deltas'] else True
+                is_relative_ok = std_relative <= normative_delta_c_02
                 relative_status = "Норма" if is_relative_ok else "Не норма"
 
-            # Для delta C - используем F-критерий
-            if normative_delta_c_01 == 0 or len(element_stats['deltas']) <= 1:
-                # Если нет норматива для delta C или недостаточно данных
+            # Для delta C - F-критерий: F-расчетное (СКО / Норматив delta C) < F-табличное => Норма
+            if normative_delta_c_01 == 0:
                 delta_status = "-"
                 is_delta_ok = True
             else:
-                # Вычисляем F-расчетное как (СКО / Норматив delta C)
-                f_calculated = std_delta / normative_delta_c_01
-
-                # F-расчетное < F-табличное => Норма
-                if f_calculated < f_critical:
-                    delta_status = "Норма"
-                    is_delta_ok = True
-                else:
-                    delta_status = "Не норма"
-                    is_delta_ok = False
-
-            delta_item = QTableWidgetItem(delta_status)
-            relative_item = QTableWidgetItem(relative_status)
+                is_delta_ok = std_delta / normative_delta_c_01 < f_critical
+                delta_status = "Норма" if is_delta_ok else "Не норма"
 
             # Подсветка вывода
-            if is_delta_ok:
-                delta_item.setBackground(light_green)
-            else:
-                delta_item.setBackground(light_red)
+            self._set_statistics_cells(3, col_base, [
+                "", "",
+                (delta_status, light_green if is_delta_ok else light_red),
+                (relative_status, light_green if is_relative_ok else light_red)
+            ])
 
-            if is_relative_ok:
-                relative_item.setBackground(light_green)
-            else:
-                relative_item.setBackground(light_red)
-
-            self.table.setItem(3, col_base, QTableWidgetItem(""))
-            self.table.setItem(3, col_base + 1, QTableWidgetItem(""))
-            self.table.setItem(3, col_base + 2, delta_item)
-            self.table.setItem(3, col_base + 3, relative_item)
-
-        # Добавляем пустую строку-разделитель после "Вывод"
-        separator_row = 4  # Это будет 5-я строка (индекс 4)
-        self.table.insertRow(separator_row)
-
-        # Заполняем всю строку серым цветом
-        for col in range(self.table.columnCount()):
-            item = QTableWidgetItem("")
-            item.setBackground(QColor(220, 220, 220))  # Серый фон
-            self.table.setItem(separator_row, col, item)
-
-        # Устанавливаем жирный шрифт для заголовков статистики в столбце "Время цикла"
-        stat_names = ["Среднее", "СКО", "Норматив", "Вывод"]
-        for i, name in enumerate(stat_names):
-            item = self.table.item(i, 0)
-            if item:
-                item.setFont(bold_font)
+        self.table_model.statistics_changed()
 
     def load_report_data(self):
-        """Загружает данные для отчета с расчетом c_cor на основе активной модели"""
+        """Запускает загрузку данных отчета в фоновом потоке"""
         try:
-            self.table.setRowCount(0)
+            # Новая задача индикатора отменила бы идущую выгрузку в файл
+            if self.busy_indicator.is_busy:
+                QMessageBox.warning(self, "Предупреждение", "Дождитесь завершения текущей операции")
+                return
+
+            self._clear_report()
 
             if not self.validate_dates():
                 return
@@ -704,238 +583,252 @@ class ReportPage(QWidget):
                 QMessageBox.warning(self, "Ошибка", "Неверный формат номера продукта")
                 return
 
-            # Получаем нормативы из БД
-            normatives = self.get_normatives_from_db(pr_nmb)
+            self.load_btn.setEnabled(False)
+            self.configure_table()
+            self.busy_indicator.submit(
+                "Загрузка данных отчета...",
+                self._fetch_report_data, dt_from, dt_to, pr_nmb,
+                on_result=self._on_report_data_loaded,
+                on_error=self._on_report_data_failed,
+                on_cancelled=lambda: self.load_btn.setEnabled(True),
+                on_partial=self._on_report_batch_loaded
+            )
+
+        except Exception as e:
+            self.load_btn.setEnabled(True)
+            QMessageBox.critical(self, "Ошибка", f"Ошибка загрузки данных отчета: {str(e)}")
+
+    def _fetch_report_data(self, dt_from, dt_to, pr_nmb):
+        """
+        Запросы отчета (выполняется в фоновом потоке, к виджетам не обращается).
+
+        Данные измерений читаются пачками по REPORT_BATCH_ROWS строк: каждая пачка
+        сразу пересчитывается в ReportData и передается в GUI через report_partial
+        (сначала - {"normatives": ...}, затем {"report_data": ...} на каждую пачку).
+        Результат - сводка загрузки с числом строк row_count.
+        """
+        token = current_token()
+
+        # Получаем нормативы из БД
+        normatives = self.get_normatives_from_db(pr_nmb)
+
+        # Получаем коэффициенты активной модели
+        active_model, coefficients = self.get_active_model_coefficients(pr_nmb)
+        if not coefficients:
+            return {"pr_nmb": pr_nmb, "normatives": normatives, "coefficients": None, "row_count": 0}
+        if token:
+            token.report_partial({"normatives": normatives})
+
+        # Загружаем данные измерений
+        query = """
+        SELECT 
+            id, mdl_nmb, meas_dt,
+            c_01, c_02, c_03, c_04, c_05, c_06, c_07, c_08,
+            c_chem_01, c_chem_02, c_chem_03, c_chem_04, 
+            c_chem_05, c_chem_06, c_chem_07, c_chem_08,
+            i_00_00, i_00_01, i_00_02, i_00_03, i_00_04, i_00_05, i_00_06, i_00_07, i_00_08, i_00_09,
+            i_00_10, i_00_11, i_00_12, i_00_13, i_00_14, i_00_15, i_00_16, i_00_17, i_00_18, i_00_19
+        FROM pr_meas
+        WHERE meas_dt BETWEEN ? AND ?
+        AND pr_nmb = ? AND active_model = 1
+        AND (
+            c_chem_01 <> 0 OR c_chem_02 <> 0 OR c_chem_03 <> 0 OR c_chem_04 <> 0 OR
+            c_chem_05 <> 0 OR c_chem_06 <> 0 OR c_chem_07 <> 0 OR c_chem_08 <> 0
+        )
+        ORDER BY meas_dt
+        """
+
+        params = [dt_from, dt_to, pr_nmb]
+        row_count = 0
+        # Отмена проверяется в iter_batches между пачками
+        for sample in self.db.iter_batches(query, params, batch_size=self.REPORT_BATCH_ROWS, as_numpy=True):
+            calculated = self.calculate_concentrations(sample, coefficients)
+            report_data = ReportData.from_columnar(sample, calculated)
+            row_count += len(report_data)
+            if token:
+                token.report_partial({"report_data": report_data})
+
+        return {"pr_nmb": pr_nmb, "normatives": normatives, "coefficients": coefficients,
+                "row_count": row_count}
+
+    def _on_report_batch_loaded(self, payload):
+        """Дописывает в таблицу очередную пачку отчета и обновляет статистику (в GUI-потоке)"""
+        try:
+            if "normatives" in payload:
+                self._normatives = payload["normatives"] or {}
+                return
+
+            # Строки статистики, разделитель и строки данных формирует модель по массивам отчета
+            self.table_model.append_report_data(payload["report_data"])
+            self._report_data = self.table_model.report_data
+
+            # Статистика - по накопленным суммам ReportData, а не по тексту ячеек
+            self.recalculate_statistics_after_deletion()
+
+        except Exception as e:
+            self.busy_indicator.cancel()
+            QMessageBox.critical(self, "Ошибка", f"Ошибка загрузки данных отчета: {str(e)}")
+            self._clear_report()
+
+    def _on_report_data_failed(self, message):
+        self.load_btn.setEnabled(True)
+        QMessageBox.critical(self, "Ошибка", f"Ошибка загрузки данных отчета: {message}")
+        self._clear_report()
+
+    def _clear_report(self):
+        """Очищает таблицу и данные отчета"""
+        self._report_data = None
+        self._normatives = {}
+        self.table_model.set_report_data(None)
+        self.restore_rows_btn.setEnabled(False)
+
+    def _on_report_data_loaded(self, data):
+        """Завершает загрузку отчета, строки которого уже показаны по пачкам (в GUI-потоке)"""
+        self.load_btn.setEnabled(True)
+        try:
+            pr_nmb = data["pr_nmb"]
+            normatives = data["normatives"]
+            coefficients = data["coefficients"]
+
             if not normatives:
                 QMessageBox.warning(self, "Предупреждение",
                                     f"Не найдены нормативы для продукта {pr_nmb} в таблице set08")
 
-            # Получаем коэффициенты активной модели
-            active_model, coefficients = self.get_active_model_coefficients(pr_nmb)
             if not coefficients:
                 QMessageBox.warning(self, "Ошибка", "Не найдены коэффициенты для активной модели")
                 return
 
-            # Загружаем данные измерений
-            query = """
-            SELECT 
-                id, mdl_nmb, meas_dt,
-                c_01, c_02, c_03, c_04, c_05, c_06, c_07, c_08,
-                c_chem_01, c_chem_02, c_chem_03, c_chem_04, 
-                c_chem_05, c_chem_06, c_chem_07, c_chem_08,
-                i_00_00, i_00_01, i_00_02, i_00_03, i_00_04, i_00_05, i_00_06, i_00_07, i_00_08, i_00_09,
-                i_00_10, i_00_11, i_00_12, i_00_13, i_00_14, i_00_15, i_00_16, i_00_17, i_00_18, i_00_19
-            FROM pr_meas
-            WHERE meas_dt BETWEEN ? AND ?
-            AND pr_nmb = ? AND active_model = 1
-            AND (
-                c_chem_01 <> 0 OR c_chem_02 <> 0 OR c_chem_03 <> 0 OR c_chem_04 <> 0 OR
-                c_chem_05 <> 0 OR c_chem_06 <> 0 OR c_chem_07 <> 0 OR c_chem_08 <> 0
-            )
-            ORDER BY meas_dt
-            """
-
-            params = [dt_from, dt_to, pr_nmb]
-            rows = self.db.fetch_all(query, params)
-
-            if not rows:
+            if not data["row_count"] or self._report_data is None:
                 QMessageBox.information(self, "Информация",
                                         "Данные не найдены для выбранного периода и продукта.")
+                self._clear_report()
                 return
 
-            elements = self.get_configured_elements()
-
-            # Настраиваем таблицу
-            self.configure_table()
-
-            # Сначала добавляем 4 строки для статистики
-            self.table.setRowCount(4)
-
-            # Записываем названия статистики в столбец "Время цикла" жирным шрифтом
-            bold_font = QFont()
-            bold_font.setBold(True)
-
-            stat_names = ["Среднее", "СКО", "Норматив", "Вывод"]
-            for i, name in enumerate(stat_names):
-                item = QTableWidgetItem(name)
-                item.setFont(bold_font)
-                self.table.setItem(i, 0, item)
-
-            # Теперь добавляем основные данные, начиная с 5-й строки
-            data_start_row = 4
-            self.table.setRowCount(data_start_row + len(rows))
-
-            for row_idx, row in enumerate(rows):
-                row_position = data_start_row + row_idx
-
-                # Время цикла
-                meas_dt = row.get('meas_dt')
-                if isinstance(meas_dt, str):
-                    dt_str = meas_dt
-                elif hasattr(meas_dt, 'strftime'):
-                    dt_str = meas_dt.strftime("%Y-%m-%d %H:%M:%S")
-                else:
-                    dt_str = str(meas_dt) if meas_dt else ""
-
-                time_item = QTableWidgetItem(dt_str)
-                self.table.setItem(row_position, 0, time_item)
-
-                # Данные по элементам
-                for i, element in enumerate(elements, 1):
-                    if i > 8:
-                        break
-
-                    col_base = 1 + (i - 1) * 4  # Смещение из-за убранного столбца "Модель"
-
-                    # Находим коэффициенты для текущего элемента
-                    element_coeffs = next((coeff for coeff in coefficients if coeff['el_nmb'] == i), None)
-                    if not element_coeffs:
-                        c_calc = 0
-                    else:
-                        # Расчет концентрации на основе коэффициентов активной модели
-                        c_calc = self.calculate_concentration(row, element_coeffs, i)
-
-                    # С расчетное (рассчитанное)
-                    c_calc_item = QTableWidgetItem(f"{c_calc:.4f}")
-                    c_calc_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                    self.table.setItem(row_position, col_base, c_calc_item)
-
-                    # С химическое
-                    c_chem = row.get(f'c_chem_{i:02d}', 0)
-                    if c_chem is None or float(c_chem) == 0:
-                        # Если С хим равно нулю, ставим прочерки
-                        c_chem_item = QTableWidgetItem("-")
-                        delta_c_item = QTableWidgetItem("-")
-                        delta_percent_item = QTableWidgetItem("-")
-                    else:
-                        c_chem_item = QTableWidgetItem(f"{float(c_chem):.4f}")
-
-                        # ΔC (разница)
-                        delta_c = c_calc - float(c_chem)
-                        delta_c_item = QTableWidgetItem(f"{delta_c:.4f}")
-
-                        # ΔC/С хим (%)
-                        delta_percent = (delta_c / float(c_chem)) * 100
-                        delta_percent = round(delta_percent)
-                        delta_percent_item = QTableWidgetItem(f"{delta_percent:.0f}%")
-
-                        # Подсветка больших отклонений
-                        if abs(delta_c) > 0.1:
-                            delta_c_item.setBackground(QColor(255, 255, 200))
-                        if abs(delta_percent) > 10:
-                            delta_percent_item.setBackground(QColor(255, 255, 200))
-
-                    c_chem_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                    delta_c_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                    delta_percent_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-
-                    self.table.setItem(row_position, col_base + 1, c_chem_item)
-                    self.table.setItem(row_position, col_base + 2, delta_c_item)
-                    self.table.setItem(row_position, col_base + 3, delta_percent_item)
-
-            # Теперь рассчитываем статистику из данных таблицы
-            stats = self.calculate_statistics_from_table_data(elements,
-                                                              data_start_row + 1)  # +1 из-за добавленной пустой строки
-            self.add_statistics_rows(stats, elements, normatives, pr_nmb, data_start_row + 1, self.table.rowCount())
-
             self.table.resizeColumnsToContents()
 
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка загрузки данных отчета: {str(e)}")
-            self.table.setRowCount(0)
+            self._clear_report()
 
     def export_to_file(self):
-        """Экспорт данных в файл"""
+        """Экспорт данных в файл (CSV или двоичный .npz) в фоновом потоке"""
         try:
-            if self.table.rowCount() == 0:
+            if self.table_model.rowCount() == 0 or self._report_data is None:
                 QMessageBox.warning(self, "Предупреждение", "Нет данных для экспорта")
                 return
 
+            if self.busy_indicator.is_busy:
+                QMessageBox.warning(self, "Предупреждение", "Дождитесь завершения текущей операции")
+                return
+
             # Получаем настройки для формирования имени файла
             selected_product = self.product_combo.currentText()
             dt_from = QDateTime(self.date_from.date(), self.time_from.time()).toString("yyyy-MM-dd_HH-mm")
             dt_to = QDateTime(self.date_to.date(), self.time_to.time()).toString("yyyy-MM-dd_HH-mm")
 
             # Предлагаем пользователю выбрать файл для сохранения
-            from PySide6.QtWidgets import QFileDialog
+            csv_filter = "CSV Files (*.csv)"
+            npz_filter = "NumPy (*.npz)"
             default_filename = f"отчет_{selected_product}_{dt_from}_по_{dt_to}.csv"
-            file_path, _ = QFileDialog.getSaveFileName(
+            file_path, selected_filter = QFileDialog.getSaveFileName(
                 self,
-                "Сохранить отчет как CSV",
+                "Сохранить отчет",
                 default_filename,
-                "CSV Files (*.csv);;All Files (*)"
+                f"{csv_filter};;{npz_filter};;All Files (*)"
             )
 
             if not file_path:
                 return  # Пользователь отменил сохранение
 
-            # Добавляем расширение .csv если его нет
-            if not file_path.lower().endswith('.csv'):
-                file_path += '.csv'
-
-            # Экспортируем данные в CSV
-            self.export_to_csv(file_path)
-
-            QMessageBox.information(self, "Успех", f"Отчет успешно сохранен в файл:\n{file_path}")
+            # Формат - по выбранному фильтру или расширению .npz
+            if selected_filter == npz_filter or file_path.lower().endswith('.npz'):
+                if file_path.lower().endswith('.csv'):
+                    file_path = file_path[:-4]  # Имя по умолчанию предложено с .csv
+                if not file_path.lower().endswith('.npz'):
+                    file_path += '.npz'
+                task_args = (export_report_npz, file_path, self._report_data,
+                             self._exported_rows(), self.table_model.elements)
+            else:
+                # Добавляем расширение .csv если его нет
+                if not file_path.lower().endswith('.csv'):
+                    file_path += '.csv'
+                task_args = (export_report_csv,) + self._csv_export_args(file_path)
+
+            self.export_btn.setEnabled(False)
+            self.busy_indicator.submit(
+                "Выгрузка отчета в файл...",
+                *task_args,
+                on_result=lambda _: self._on_export_finished(file_path),
+                on_error=self._on_export_failed,
+                on_cancelled=self._on_export_cancelled
+            )
 
         except Exception as e:
+            self.export_btn.setEnabled(True)
             QMessageBox.critical(self, "Ошибка", f"Ошибка при экспорте: {str(e)}")
 
-    def export_to_csv(self, file_path):
-        """Экспорт данных таблицы в CSV файл"""
-        try:
-            import csv
-            from pathlib import Path
-
-            # Создаем директорию если не существует
-            Path(file_path).parent.mkdir(parents=True, exist_ok=True)
-
-            with open(file_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                writer = csv.writer(csvfile, delimiter=';', quoting=csv.QUOTE_MINIMAL)
-
-                # Записываем заголовок с информацией о периоде и продукте
-                self.write_csv_header(writer)
-
-                # Записываем заголовки таблицы
-                headers = []
-                for col in range(self.table.columnCount()):
-                    header = self.table.horizontalHeaderItem(col)
-                    headers.append(header.text() if header else f"Column_{col}")
-                writer.writerow(headers)
-
-                # Записываем данные таблицы
-                for row in range(self.table.rowCount()):
-                    row_data = []
-                    for col in range(self.table.columnCount()):
-                        item = self.table.item(row, col)
-                        if item is not None:
-                            # Обрабатываем специальные случаи (серые строки и т.д.)
-                            text = self.process_cell_text(item.text(), row, col)
-                            row_data.append(text)
-                        else:
-                            row_data.append("")
-
-                    writer.writerow(row_data)
-
-        except Exception as e:
-            raise Exception(f"Ошибка записи CSV файла: {str(e)}")
-
-    def write_csv_header(self, writer):
-        """Записывает заголовочную информацию в CSV"""
+    def _on_export_finished(self, file_path):
+        self.export_btn.setEnabled(True)
+        QMessageBox.information(self, "Успех", f"Отчет успешно сохранен в файл:\n{file_path}")
+
+    def _on_export_cancelled(self):
+        self.export_btn.setEnabled(True)
+        QMessageBox.information(self, "Информация", "Экспорт отменен, файл не изменен")
+
+    def _on_export_failed(self, message):
+        self.export_btn.setEnabled(True)
+        QMessageBox.critical(self, "Ошибка", f"Ошибка при экспорте: {message}")
+
+    def _exported_rows(self):
+        """Индексы строк данных, попадающих в выгрузку (исключенные строки - нет)"""
+        return self._report_data.active.nonzero()[0]
+
+    def _csv_export_args(self, file_path):
+        """
+        Аргументы export_report_csv. Шапка, заголовки и строки статистики берутся
+        из виджетов и модели здесь, в GUI-потоке; строки данных фоновая задача
+        форматирует сама из массивов отчета.
+        """
+        model = self.table_model
+        column_count = model.columnCount()
+
+        # Заголовки таблицы
+        headers = []
+        for col in range(column_count):
+            header = model.headerData(col, Qt.Horizontal)
+            headers.append(header if header else f"Column_{col}")
+
+        # Строки статистики и серая строка-разделитель
+        statistics_rows = []
+        for row in range(ReportTableModel.DATA_START_ROW):
+            row_data = []
+            for col in range(column_count):
+                text = model.data(model.index(row, col))
+                row_data.append(self.process_cell_text(text, row, col) if text is not None else "")
+            statistics_rows.append(row_data)
+
+        return (file_path, self.csv_title_rows(), headers, statistics_rows, self._report_data,
+                self._exported_rows(), len(model.elements))
+
+    def csv_title_rows(self) -> list:
+        """Заголовочная информация CSV: период, продукт, дата формирования"""
         try:
             # Информация о периоде
             dt_from = QDateTime(self.date_from.date(), self.time_from.time()).toString("dd.MM.yyyy HH:mm")
             dt_to = QDateTime(self.date_to.date(), self.time_to.time()).toString("dd.MM.yyyy HH:mm")
             selected_product = self.product_combo.currentText()
 
-            writer.writerow(["Отчет по химическим содержаниям"])
-            writer.writerow([f"Продукт: {selected_product}"])
-            writer.writerow([f"Период: с {dt_from} по {dt_to}"])
-            writer.writerow([f"Дата формирования: {QDateTime.currentDateTime().toString('dd.MM.yyyy HH:mm:ss')}"])
-            writer.writerow([])  # Пустая строка
+            return [
+                ["Отчет по химическим содержаниям"],
+                [f"Продукт: {selected_product}"],
+                [f"Период: с {dt_from} по {dt_to}"],
+                [f"Дата формирования: {QDateTime.currentDateTime().toString('dd.MM.yyyy HH:mm:ss')}"],
+                [],  # Пустая строка
+            ]
 
         except Exception as e:
-            print(f"Ошибка записи заголовка CSV: {str(e)}")
+            print(f"Ошибка формирования заголовка CSV: {str(e)}")
+            return []
 
     def process_cell_text(self, text, row, col):
         """Обрабатывает текст ячейки для корректного отображения в CSV"""
@@ -1048,11 +941,21 @@ class ReportPage(QWidget):
         self.export_btn.setFixedSize(150, 30)
         buttons_layout.addWidget(self.export_btn)
 
+        self.restore_rows_btn = QPushButton("Вернуть строки")
+        self.restore_rows_btn.setFixedSize(150, 30)
+        self.restore_rows_btn.setToolTip("Вернуть в отчет и статистику все исключенные строки")
+        self.restore_rows_btn.setEnabled(False)
+        buttons_layout.addWidget(self.restore_rows_btn)
+
         buttons_layout.addStretch()
         settings_layout.addLayout(buttons_layout)
 
         main_layout.addLayout(settings_layout)
 
+        # Индикатор фоновой загрузки
+        self.busy_indicator = BusyIndicator()
+        main_layout.addWidget(self.busy_indicator)
+
         # Основная таблица (теперь содержит и статистику и данные)
         self.table = self.init_table()
         self.configure_table()
@@ -1069,8 +972,9 @@ class ReportPage(QWidget):
         """Настройка соединений сигналов и слотов"""
         self.load_btn.clicked.connect(self.load_report_data)
         self.export_btn.clicked.connect(self.export_to_file)
+        self.restore_rows_btn.clicked.connect(self.restore_excluded_rows)
 
-        # Обработка двойного клика для удаления строк
+        # Обработка двойного клика для исключения строк
         self.table.doubleClicked.connect(self.delete_selected_row)
 
         # Валидация дат при изменении
@@ -1080,17 +984,25 @@ class ReportPage(QWidget):
         self.time_to.timeChanged.connect(self.validate_dates)
 
     def delete_selected_row(self, index):
-        """Удаляет выбранную строку при двойном клике"""
-        row = index.row()
+        """Исключает выбранные строки (двойной клик по одной из них) из отчета и статистики"""
+        if self._report_data is None:
+            return
 
-        # Не позволяем удалять строки статистики (первые 5 строк)
-        if row < 5:  # Среднее, СКО, Норматив, Вывод, пустая строка
+        # Не позволяем исключать строки статистики (первые 5 строк)
+        data_start_row = ReportTableModel.DATA_START_ROW  # Среднее, СКО, Норматив, Вывод, пустая строка
+        rows = {item.row() for item in self.table.selectionModel().selectedRows()}
+        rows.add(index.row())
+        rows = sorted(row for row in rows if row >= data_start_row and not self.table.isRowHidden(row))
+        if not rows:
             return
 
         # Создаем кастомное окно подтверждения с русскими кнопками
         msg_box = QMessageBox(self)
         msg_box.setWindowTitle("Подтверждение удаления")
-        msg_box.setText("Вы уверены, что хотите удалить эту строку?")
+        if len(rows) == 1:
+            msg_box.setText("Вы уверены, что хотите удалить эту строку?")
+        else:
+            msg_box.setText(f"Вы уверены, что хотите удалить выбранные строки ({len(rows)})?")
         msg_box.setIcon(QMessageBox.Question)
 
         # Создаем кнопки с русским текстом
@@ -1101,193 +1013,42 @@ class ReportPage(QWidget):
         msg_box.exec()
 
         if msg_box.clickedButton() == btn_yes:
-            self.table.removeRow(row)
-            # После удаления пересчитываем статистику
+            # Строки скрываются, а не удаляются: строка таблицы row - строка данных
+            # row - data_start_row, исключенные строки можно вернуть
+            for row in rows:
+                self.table.setRowHidden(row, True)
+            self._report_data.exclude([row - data_start_row for row in rows])
+            self.table.clearSelection()
+            self.restore_rows_btn.setEnabled(True)
+            # После исключения пересчитываем статистику
             self.recalculate_statistics_after_deletion()
 
-    def recalculate_statistics_after_deletion(self):
-        """Пересчитывает статистику после удаления строки"""
-        elements = self.get_configured_elements()
-        data_start_row = 5  # Строка, с которой начинаются данные (после статистики)
-
-        if self.table.rowCount() > data_start_row:
-            # Пересчитываем статистику из оставшихся данных
-            stats = self.calculate_statistics_from_table_data(elements, data_start_row)
-
-            # Получаем номер продукта для нормативов
-            selected_product = self.product_combo.currentText()
-            try:
-                pr_nmb = int(selected_product.split()[-1])
-                normatives = self.get_normatives_from_db(pr_nmb)
-            except:
-                normatives = {}
-
-            # Обновляем строки статистики
-            self.update_statistics_rows(stats, elements, normatives, pr_nmb, data_start_row, self.table.rowCount())
-
-    def update_statistics_rows(self, stats, elements, normatives, pr_nmb, data_start_row, total_rows):
-        """Обновляет строки статистики без изменения структуры таблицы"""
-        # Создаем жирный шрифт
-        bold_font = QFont()
-        bold_font.setBold(True)
-
-        # Цвета для подсветки
-        light_green = QColor(200, 255, 200)  # Светло-зеленый
-        light_red = QColor(255, 200, 200)  # Светло-красный
-
-        # Количество наблюдений для расчета F-критерия
-        n = total_rows - data_start_row  # количество наблюдений
-        if n < 2:
-            n = 2  # минимальное значение для расчета СКО
-
-        # Получаем табличное значение F
-        f_critical = self.get_f_critical_value(n)
-
-        for col_idx, element in enumerate(elements):
-            element_num = col_idx + 1  # Номер элемента (начинается с 1)
-
-            if element not in stats:
-                # Если элемента нет в статистике, ставим прочерки
-                col_base = 1 + col_idx * 4
-                self.table.setItem(0, col_base, QTableWidgetItem("-"))  # Ср.расч
-                self.table.setItem(0, col_base + 1, QTableWidgetItem("-"))  # С хим
-                self.table.setItem(0, col_base + 2, QTableWidgetItem("-"))  # ΔC
-                self.table.setItem(0, col_base + 3, QTableWidgetItem("-"))  # Отн.ΔC%
-
-                self.table.setItem(1, col_base, QTableWidgetItem(""))
-                self.table.setItem(1, col_base + 1, QTableWidgetItem(""))
-                self.table.setItem(1, col_base + 2, QTableWidgetItem("-"))  # СКО ΔC
-                self.table.setItem(1, col_base + 3, QTableWidgetItem("-"))  # СКО Отн.ΔC%
-
-                self.table.setItem(3, col_base, QTableWidgetItem(""))
-                self.table.setItem(3, col_base + 1, QTableWidgetItem(""))
-                self.table.setItem(3, col_base + 2, QTableWidgetItem("-"))  # Вывод ΔC
-                self.table.setItem(3, col_base + 3, QTableWidgetItem("-"))  # Вывод Отн.ΔC%
-                continue
-
-            element_stats = stats[element]
-            col_base = 1 + col_idx * 4  # 1 - потому что первый столбец "Время цикла"
-
-            # Получаем нормативы для текущего элемента и продукта
-            normative_delta_c_01 = 0.0  # значение по умолчанию
-            normative_delta_c_02 = 0.0  # значение по умолчанию
-
-            if element_num in normatives:
-                normative_delta_c_01, normative_delta_c_02 = normatives[element_num]
-
-            # Проверяем достаточно ли данных для статистики (минимум 5 ненулевых С хим)
-            if element_stats['valid_count'] < 5:
-                # Недостаточно данных - ставим прочерки ВО ВСЕХ полях статистики
-                self.table.setItem(0, col_base, QTableWidgetItem("-"))  # Ср.расч
-                self.table.setItem(0, col_base + 1, QTableWidgetItem("-"))  # С хим
-                self.table.setItem(0, col_base + 2, QTableWidgetItem("-"))  # ΔC
-                self.table.setItem(0, col_base + 3, QTableWidgetItem("-"))  # Отн.ΔC%
-
-                self.table.setItem(1, col_base, QTableWidgetItem(""))
-                self.table.setItem(1, col_base + 1, QTableWidgetItem(""))
-                self.table.setItem(1, col_base + 2, QTableWidgetItem("-"))  # СКО ΔC
-                self.table.setItem(1, col_base + 3, QTableWidgetItem("-"))  # СКО Отн.ΔC%
-
-                self.table.setItem(3, col_base, QTableWidgetItem(""))
-                self.table.setItem(3, col_base + 1, QTableWidgetItem(""))
-                self.table.setItem(3, col_base + 2, QTableWidgetItem("-"))  # Вывод ΔC
-                self.table.setItem(3, col_base + 3, QTableWidgetItem("-"))  # Вывод Отн.ΔC%
-                continue  # Переходим к следующему элементу
-
-            # Остальной код без изменений...
-            # Средние значения - считаем ТОЛЬКО по валидным данным (где С хим ≠ 0)
-            if element_stats['calculated'] and element_stats['chemical']:
-                avg_calc = statistics.mean(element_stats['calculated'])
-                avg_chem = statistics.mean(element_stats['chemical'])
-                avg_delta = statistics.mean(element_stats['deltas'])
-                avg_relative = statistics.mean(element_stats['relative_deltas'])
-            else:
-                # Если нет валидных данных, ставим прочерки
-                self.table.setItem(0, col_base, QTableWidgetItem("-"))
-                self.table.setItem(0, col_base + 1, QTableWidgetItem("-"))
-                self.table.setItem(0, col_base + 2, QTableWidgetItem("-"))
-                self.table.setItem(0, col_base + 3, QTableWidgetItem("-"))
-
-                self.table.setItem(1, col_base, QTableWidgetItem(""))
-                self.table.setItem(1, col_base + 1, QTableWidgetItem(""))
-                self.table.setItem(1, col_base + 2, QTableWidgetItem("-"))
-                self.table.setItem(1, col_base + 3, QTableWidgetItem("-"))
-
-                self.table.setItem(3, col_base, QTableWidgetItem(""))
-                self.table.setItem(3, col_base + 1, QTableWidgetItem(""))
-                self.table.setItem(3, col_base + 2, QTableWidgetItem("-"))
-                self.table.setItem(3, col_base + 3, QTableWidgetItem("-"))
-                continue
-
-            # СКО - считаем ТОЛЬКО если есть хотя бы 2 валидных значения
-            if len(element_stats['deltas']) > 1:
-                std_delta = statistics.stdev(element_stats['deltas'])
-                std_relative = statistics.stdev(element_stats['relative_deltas'])
-            else:
-                # Если недостаточно данных для СКО, ставим прочерки
-                std_delta = 0
-                std_relative = 0
-                self.table.setItem(1, col_base + 2, QTableWidgetItem("-"))
-                self.table.setItem(1, col_base + 3, QTableWidgetItem("-"))
-
-            # Обновляем строку "Среднее" (строка 0) - только если есть данные
-            self.table.setItem(0, col_base, QTableWidgetItem(f"{avg_calc:.6f}"))
-            self.table.setItem(0, col_base + 1, QTableWidgetItem(f"{avg_chem:.6f}"))
-            self.table.setItem(0, col_base + 2, QTableWidgetItem(f"{avg_delta:.6f}"))
-            self.table.setItem(0, col_base + 3, QTableWidgetItem(f"{avg_relative:.1f}%"))
-
-            # Обновляем строку "СКО" (строка 1) - только если рассчитано СКО
-            self.table.setItem(1, col_base, QTableWidgetItem(""))
-            self.table.setItem(1, col_base + 1, QTableWidgetItem(""))
-            if len(element_stats['deltas']) > 1:
-                self.table.setItem(1, col_base + 2, QTableWidgetItem(f"{std_delta:.6f}"))
-                self.table.setItem(1, col_base + 3, QTableWidgetItem(f"{std_relative:.1f}%"))
-            else:
-                self.table.setItem(1, col_base + 2, QTableWidgetItem("-"))
-                self.table.setItem(1, col_base + 3, QTableWidgetItem("-"))
-
-            # Обновляем строку "Вывод" (строка 3) - только если можно рассчитать
-            if len(element_stats['deltas']) <= 1 or normative_delta_c_01 == 0:
-                # Недостаточно данных для вывода или нет норматива
-                delta_status = "-"
-                is_delta_ok = True
-            else:
-                # Вычисляем F-расчетное как (СКО / Норматив delta C)
-                f_calculated = std_delta / normative_delta_c_01
-
-                # F-расчетное < F-табличное => Норма
-                if f_calculated < f_critical:
-                    delta_status = "Норма"
-                    is_delta_ok = True
-                else:
-                    delta_status = "Не норма"
-                    is_delta_ok = False
-
-            if len(element_stats['relative_deltas']) <= 1 or normative_delta_c_02 == 0:
-                relative_status = "-"
-                is_relative_ok = True
-            else:
-                is_relative_ok = std_relative <= normative_delta_c_02
-                relative_status = "Норма" if is_relative_ok else "Не норма"
+    def restore_excluded_rows(self):
+        """Возвращает в отчет и статистику все исключенные строки"""
+        if self._report_data is None:
+            return
 
-            delta_item = QTableWidgetItem(delta_status)
-            relative_item = QTableWidgetItem(relative_status)
+        data_start_row = ReportTableModel.DATA_START_ROW
+        for index in map(int, (~self._report_data.active).nonzero()[0]):
+            self.table.setRowHidden(data_start_row + index, False)
+        if self._report_data.include():
+            self.recalculate_statistics_after_deletion()
+        self.restore_rows_btn.setEnabled(False)
 
-            # Подсветка вывода
-            if is_delta_ok:
-                delta_item.setBackground(light_green)
-            else:
-                delta_item.setBackground(light_red)
+    def recalculate_statistics_after_deletion(self):
+        """
+        Обновляет статистику после исключения или возврата строк и после каждой загруженной пачки.
+        Суммы ReportData уже учитывают изменение, нормативы и элементы берутся из загруженного
+        отчета (элементы - из модели таблицы, без повторного чтения elements.json).
+        """
+        if self._report_data is None:
+            return
 
-            if is_relative_ok:
-                relative_item.setBackground(light_green)
-            else:
-                relative_item.setBackground(light_red)
+        elements = self.table_model.elements
+        stats = self.calculate_statistics(elements)
 
-            self.table.setItem(3, col_base, QTableWidgetItem(""))
-            self.table.setItem(3, col_base + 1, QTableWidgetItem(""))
-            self.table.setItem(3, col_base + 2, delta_item)
-            self.table.setItem(3, col_base + 3, relative_item)
+        # Обновляем строки статистики без изменения структуры таблицы
+        self._fill_statistics_rows(stats, elements, self._normatives, self._report_data.active_count)
 
     def showEvent(self, event):
         """Обработчик события показа виджета"""
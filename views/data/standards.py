@@ -43,9 +43,7 @@ class StandardsPage(QWidget):
     def _load_products_config(self) -> list:
         """Загружает конфигурацию продуктов из базы данных"""
         try:
-            query = "SELECT pr_nmb, pr_name, pr_desc FROM cfg02 ORDER BY pr_nmb"
-            results = self.db.fetch_all(query)
-            return results if results else []
+            return self.db.reference.rows("CFG02", columns=["pr_nmb", "pr_name", "pr_desc"], order_by="pr_nmb")
         except Exception as e:
             print(f"Ошибка загрузки конфигурации продуктов: {e}")
             return []
@@ -268,7 +266,7 @@ class StandardsPage(QWidget):
     def save_all_changes(self):
         """Сохраняет все изменения в базе данных"""
         try:
-            changes_made = False
+            param_rows = []
 
             for row in range(self.table_widget.rowCount()):
                 delta_c_item = self.table_widget.item(row, 1)
@@ -287,16 +285,14 @@ class StandardsPage(QWidget):
                 old_delta_c_02 = original_data.get('delta_c_02', 0)
 
                 if new_delta_c_01 != old_delta_c_01 or new_delta_c_02 != old_delta_c_02:
-                    changes_made = True
-
-                    id_value = original_data.get('id')
-                    query = """
-                    UPDATE set08 SET delta_c_01 = ?, delta_c_02 = ?
-                    WHERE id = ?
-                    """
-                    self.db.execute(query, [new_delta_c_01, new_delta_c_02, id_value])
-
-            if changes_made:
+                    param_rows.append([new_delta_c_01, new_delta_c_02, original_data.get('id')])
+
+            if param_rows:
+                query = """
+                UPDATE set08 SET delta_c_01 = ?, delta_c_02 = ?
+                WHERE id = ?
+                """
+                self.db.execute_many(query, param_rows)
                 QMessageBox.information(self, "Успех", "Изменения успешно сохранены!")
                 self.refresh_data()
             else:
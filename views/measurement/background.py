@@ -93,9 +93,7 @@ class BackgroundPage(QWidget):
             self.modified_data.clear()
 
             # 1. Загружаем метаданные из SET01
-            query_meta = f'SELECT ln_nmb, ln_name, ln_back FROM SET01'
-
-            meta_rows = self.db.fetch_all(query_meta)
+            meta_rows = self.db.reference.rows("SET01", columns=["ln_nmb", "ln_name", "ln_back"])
             self.ln_nmb_to_name = {row["ln_nmb"]: row["ln_name"] for row in meta_rows}
             self.ln_nmb_to_back = {row["ln_nmb"]: row["ln_back"] for row in meta_rows}
 
@@ -296,31 +294,20 @@ class BackgroundPage(QWidget):
 
             updated_count = 0
 
-            with self.db.connect() as conn:
-                cursor = conn.cursor()
-
-                try:
-                    cursor.execute("BEGIN TRANSACTION")
-
-                    for (source_sq, k_nmb), column_changes in changes_by_cell.items():
-                        for target_sq, new_value in column_changes.items():
-                            db_column = f"ln_{target_sq:02d}"
+            # Все изменения SET03 фиксируются одной транзакцией
+            with self.db.transaction() as session:
+                for (source_sq, k_nmb), column_changes in changes_by_cell.items():
+                    for target_sq, new_value in column_changes.items():
+                        db_column = f"ln_{target_sq:02d}"
 
-                            query = f"""
-                            UPDATE SET03 SET {db_column} = ? WHERE ac_nmb = ? AND sq_nmb = ? AND k_nmb = ?
-                            """
-                            updated_count += self.db.execute(query, (new_value, self.current_ac_nmb, source_sq, k_nmb))
+                        query = f"""
+                        UPDATE SET03 SET {db_column} = ? WHERE ac_nmb = ? AND sq_nmb = ? AND k_nmb = ?
+                        """
+                        updated_count += session.execute(query, (new_value, self.current_ac_nmb, source_sq, k_nmb))
 
-                    cursor.execute("COMMIT")
-                    conn.commit()
-
-                    self.modified_data.clear()
-                    QMessageBox.information(self, "Успех", f"Успешно сохранено {updated_count} изменений")
-                    self.load_data()
-
-                except Exception as e:
-                    cursor.execute("ROLLBACK")
-                    raise e
+            self.modified_data.clear()
+            QMessageBox.information(self, "Успех", f"Успешно сохранено {updated_count} изменений")
+            self.load_data()
 
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка при сохранении: {str(e)}")
@@ -9,6 +9,7 @@ from PySide6.QtCore import Qt
 from PySide6.QtGui import QColor
 from database.db import Database
 from utils.path_manager import get_config_path
+from utils.helpers import refresh_ln_names
 
 class LinesPage(QWidget):
     def __init__(self, db: Database):
@@ -130,6 +131,8 @@ class LinesPage(QWidget):
         """Сохраняет изменения в БД"""
         try:
             updated_count = 0
+            # Изменения группируются по набору полей: {SET-часть запроса: [(параметры, original, row)]}
+            pending_updates = {}
 
             # Обрабатываем существующие строки
             for row in range(self.table.rowCount()):
@@ -188,18 +191,29 @@ class LinesPage(QWidget):
                                 params.append(new_value)
 
                 if changes:
-                    try:
-                        query = f"UPDATE SET01 SET {', '.join(changes)} WHERE ID = ?"
-                        params.append(row_id)
-                        self.db.execute(query, params)
-                        # Обновляем оригинал
-                        for db_field, col in fields:
-                            item = self.table.item(row, col)
-                            if item:
-                                original[db_field] = "" if item.text().strip() == "" else item.text().strip()
-                        updated_count += 1
-                    except Exception as e:
-                        print(f"Ошибка при обновлении строки ID={row_id}: {e}")
+                    params.append(row_id)
+                    pending_updates.setdefault(", ".join(changes), []).append((params, original, row))
+
+            # Строки с одинаковым набором изменённых полей сохраняем одним пакетом
+            for set_clause, row_updates in pending_updates.items():
+                try:
+                    query = f"UPDATE SET01 SET {set_clause} WHERE ID = ?"
+                    self.db.execute_many(query, [params for params, _, _ in row_updates])
+                except Exception as e:
+                    print(f"Ошибка при обновлении строк SET01 ({set_clause}): {e}")
+                    continue
+
+                # Обновляем оригинал
+                for _, original, row in row_updates:
+                    for db_field, col in fields:
+                        item = self.table.item(row, col)
+                        if item:
+                            original[db_field] = "" if item.text().strip() == "" else item.text().strip()
+                updated_count += len(row_updates)
+
+            # Имена линий изменились - перечитываем общий индекс
+            if updated_count > 0:
+                refresh_ln_names()
 
             # После сохранения обновляем JSON
             self.export_to_json()
@@ -239,6 +253,7 @@ class LinesPage(QWidget):
                 VALUES (?, ?, ?, ?, ?, ?)
                 """
                 self.db.execute(query, [nmb, "", 0.0, "", 0, 0])
+                refresh_ln_names()
 
                 # После вставки перезагружаем данные, чтобы получить правильный ID
                 self.load_data()
@@ -308,6 +323,7 @@ class LinesPage(QWidget):
                     WHERE id = ?
                     """
                     self.db.execute(query, [row_id_to_delete])
+                    refresh_ln_names()
 
                     # Удаляем строку из таблицы
                     self.table.removeRow(row)
@@ -341,7 +341,8 @@ class RangesPage(QWidget):
                 except Exception as e:
                     print(f"Ошибка синхронизации для sq_nmb={sq_nmb}: {e}")
 
-            # Обновляем Min/Max значений для каждого прибора
+            # Собираем изменения Min/Max для каждого прибора
+            bound_changes = {"ln_ch_min": [], "ln_ch_max": []}
             for row in range(self.table.rowCount()):
                 item_sq_nmb = self.table.item(row, 0)
                 if not item_sq_nmb:
@@ -362,47 +363,40 @@ class RangesPage(QWidget):
 
                     col_offset = 2 + i * 2
 
-                    # Min
-                    item_min = self.table.item(row, col_offset)
-                    if item_min:
-                        new_min = item_min.text().strip()
-                        old_min = self.device_data[ac_nmb][target_id]["ln_ch_min"]
-                        if new_min != old_min:
-                            try:
-                                query = f"""
-                                UPDATE SET02
-                                SET ln_ch_min = ?
-                                WHERE id = ? AND ac_nmb = ?
-                                """
-                                if new_min == "":
-                                    self.db.execute(query, [None, target_id, ac_nmb])
-                                else:
-                                    self.db.execute(query, [float(new_min), target_id, ac_nmb])
-                                self.device_data[ac_nmb][target_id]["ln_ch_min"] = new_min
-                                updated_count_total += 1
-                            except Exception as e:
-                                print(f"Ошибка при обновлении ln_ch_min для ID={target_id}, ac_nmb={ac_nmb}: {e}")
-
-                    # Max
-                    item_max = self.table.item(row, col_offset + 1)
-                    if item_max:
-                        new_max = item_max.text().strip()
-                        old_max = self.device_data[ac_nmb][target_id]["ln_ch_max"]
-                        if new_max != old_max:
-                            try:
-                                query = f"""
-                                UPDATE SET02
-                                SET ln_ch_max = ?
-                                WHERE id = ? AND ac_nmb = ?
-                                """
-                                if new_max == "":
-                                    self.db.execute(query, [None, target_id, ac_nmb])
-                                else:
-                                    self.db.execute(query, [float(new_max), target_id, ac_nmb])
-                                self.device_data[ac_nmb][target_id]["ln_ch_max"] = new_max
-                                updated_count_total += 1
-                            except Exception as e:
-                                print(f"Ошибка при обновлении ln_ch_max для ID={target_id}, ac_nmb={ac_nmb}: {e}")
+                    for field, col in (("ln_ch_min", col_offset), ("ln_ch_max", col_offset + 1)):
+                        item = self.table.item(row, col)
+                        if not item:
+                            continue
+
+                        new_value = item.text().strip()
+                        if new_value == self.device_data[ac_nmb][target_id][field]:
+                            continue
+
+                        try:
+                            db_value = None if new_value == "" else float(new_value)
+                        except ValueError:
+                            print(f"Некорректное значение {field} для ID={target_id}, ac_nmb={ac_nmb}: {new_value}")
+                            continue
+
+                        bound_changes[field].append((db_value, target_id, ac_nmb, new_value))
+
+            # Записываем Min/Max пакетно: один запрос на столбец
+            for field, changes in bound_changes.items():
+                if not changes:
+                    continue
+
+                query = f"""
+                UPDATE SET02
+                SET {field} = ?
+                WHERE id = ? AND ac_nmb = ?
+                """
+                try:
+                    self.db.execute_many(query, [change[:3] for change in changes])
+                    for _, target_id, ac_nmb, new_value in changes:
+                        self.device_data[ac_nmb][target_id][field] = new_value
+                    updated_count_total += len(changes)
+                except Exception as e:
+                    print(f"Ошибка при обновлении {field}: {e}")
 
             if updated_count_total > 0:
                 QMessageBox.information(self, "Успех", f"Сохранено {updated_count_total} изменений")
@@ -471,42 +465,17 @@ class RangesPage(QWidget):
 
     def synchronize_line_changes(self, old_ln_nmb, new_ln_nmb, sq_nmb):
         """Синхронизирует изменения линий между SET02, SET03 и SET07 для всех записей с данным sq_nmb"""
-        with self.db.connect() as conn:
-            cursor = conn.cursor()
-            updated_count = 0
-
-            try:
-                # Подготавливаем запрос и параметры один раз (или для каждого — неважно, логика в _prepare)
-                # Обновляем SET02
-                query_set02 = "UPDATE SET02 SET ln_nmb = ? WHERE sq_nmb = ? AND ln_nmb = ?"
-                prepared_query, prepared_params = self.db._prepare_query_and_params(
-                    query_set02, (new_ln_nmb, sq_nmb, old_ln_nmb)
-                )
-                cursor.execute(prepared_query, prepared_params or ())
-                updated_count += cursor.rowcount
-
-                # Обновляем SET03
-                query_set03 = "UPDATE SET03 SET ln_nmb = ? WHERE sq_nmb = ? AND ln_nmb = ?"
-                prepared_query, prepared_params = self.db._prepare_query_and_params(
-                    query_set03, (new_ln_nmb, sq_nmb, old_ln_nmb)
-                )
-                cursor.execute(prepared_query, prepared_params or ())
-                updated_count += cursor.rowcount
-
-                # Обновляем SET07
-                query_set07 = "UPDATE SET07 SET ln_nmb = ? WHERE sq_nmb = ? AND ln_nmb = ?"
-                prepared_query, prepared_params = self.db._prepare_query_and_params(
-                    query_set07, (new_ln_nmb, sq_nmb, old_ln_nmb)
-                )
-                cursor.execute(prepared_query, prepared_params or ())
-                updated_count += cursor.rowcount
-
-                conn.commit()
+        try:
+            # Все три таблицы обновляются в одной транзакции на одном соединении
+            with self.db.transaction() as session:
+                updated_count = 0
+                for table_name in ("SET02", "SET03", "SET07"):
+                    query = f"UPDATE {table_name} SET ln_nmb = ? WHERE sq_nmb = ? AND ln_nmb = ?"
+                    updated_count += session.execute(query, (new_ln_nmb, sq_nmb, old_ln_nmb))
                 return updated_count
 
-            except Exception as e:
-                conn.rollback()
-                raise Exception(f"Ошибка синхронизации линий: {e}")
+        except Exception as e:
+            raise Exception(f"Ошибка синхронизации линий: {e}")
 
     def validate_cross_table_consistency(self):
         """Проверяет согласованность ln_nmb для каждого sq_nmb между SET02, SET03 и SET07"""
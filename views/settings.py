@@ -592,10 +592,9 @@ class SettingsPage(QWidget):
             VALUES (?, ?, ?, ?, ?)
             """
 
-            self.db.execute(insert_query, [1, 0, 0, 0.0, 0.0])
-
-            for sq_nmb in range(1, 21):
-                 self.db.execute(insert_query, [1, sq_nmb, -1, 0.0, 0.0])
+            param_rows = [[1, 0, 0, 0.0, 0.0]]
+            param_rows.extend([1, sq_nmb, -1, 0.0, 0.0] for sq_nmb in range(1, 21))
+            self.db.execute_many(insert_query, param_rows)
 
             print(f"Базовая группа (ac_nmb=1) успешно создана в SET02")
             return True
@@ -615,11 +614,11 @@ class SettingsPage(QWidget):
             VALUES (?, ?, ?, ?, ?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
             """
 
+            param_rows = []
             for sq_nmb in range(1, 21):
-                params_k1 = [1, sq_nmb, -1, 1] + [0.0] * 20
-                self.db.execute(insert_query, params_k1)
-                params_k2 = [1, sq_nmb, -1, 2] + [0.0] * 20
-                self.db.execute(insert_query, params_k2)
+                param_rows.append([1, sq_nmb, -1, 1] + [0.0] * 20)
+                param_rows.append([1, sq_nmb, -1, 2] + [0.0] * 20)
+            self.db.execute_many(insert_query, param_rows)
 
             print(f"Базовая группы (ac_nmb=1) успешно создана в SET03")
             return True
@@ -849,6 +848,7 @@ class SettingsPage(QWidget):
             VALUES {values_placeholder}
             """
 
+            param_rows = []
             for row in template_rows:
                 values_list = [group_nmb]  # Новый номер группы
 
@@ -977,7 +977,10 @@ class SettingsPage(QWidget):
                         get_value('e_operator', 0)
                     ])
 
-                self.db.execute(insert_query, values_list)
+                param_rows.append(values_list)
+
+            # Все строки группы вставляются одним пакетом в одной транзакции
+            self.db.execute_many(insert_query, param_rows)
 
             print(f"Группа ({group_field}={group_nmb}) успешно создана в [{table_name}] на основе шаблона ({group_field}={template_group_nmb})")
             return True